@@ -25,7 +25,20 @@ module.exports = {
         MODO_DETALLADO: process.env.MODO_DETALLADO,
         HF_TOKEN: process.env.HF_TOKEN,
         API_BASE_PATH: process.env.API_BASE_PATH,
-        PYTHON_CMD: process.env.PYTHON_CMD || 'python3'
+        PYTHON_CMD: process.env.PYTHON_CMD || 'python3',
+        TRANSCRIPTOR_PERSISTENTE: process.env.TRANSCRIPTOR_PERSISTENTE,
+        PROCESOS_TRANSCRIPCION: process.env.PROCESOS_TRANSCRIPCION,
+        AUDIO_MMAP: process.env.AUDIO_MMAP,
+        DIRECTORIO_PCM: process.env.DIRECTORIO_PCM,
+        DIARIZACION_PARALELA: process.env.DIARIZACION_PARALELA,
+        INDICE_HABLANTES: process.env.INDICE_HABLANTES,
+        UMBRAL_VOZ: process.env.UMBRAL_VOZ,
+        REGISTRO_HABLANTES: process.env.REGISTRO_HABLANTES,
+        PERFIL_HARDWARE: process.env.PERFIL_HARDWARE,
+        TRABAJOS_SIMULTANEOS: process.env.TRABAJOS_SIMULTANEOS,
+        RAM_POR_TRABAJO_MB: process.env.RAM_POR_TRABAJO_MB,
+        VRAM_POR_TRABAJO_MB: process.env.VRAM_POR_TRABAJO_MB,
+        INTERVALO_ADMISION_MS: process.env.INTERVALO_ADMISION_MS
       }
     }
   ]
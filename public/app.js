@@ -119,16 +119,23 @@ form.addEventListener('submit', (e) => {
         sse.onmessage = (event) => {
           try {
             const data = JSON.parse(event.data);
-            if (data.progreso !== undefined) {
+            if (data.segmento) {
+              addSegment(data.segmento);
+            }
+            if (data.etapa === 'en_cola') {
+              progressBar.style.width = '0%';
+              progressBar.textContent = `En cola: posición ${data.posicion} de ${data.total}`;
+            } else if (data.progreso !== undefined) {
               const percent = Number(data.progreso);
               if (!Number.isNaN(percent)) {
                 const limitado = Math.min(percent, 100);
                 progressBar.style.width = `${limitado}%`;
-                progressBar.textContent = `${limitado}%`;
+                progressBar.textContent = formatProgress(limitado, data.eta);
               }
             }
             if (data.final) {
               isProcessing = false;
+              clearProvisionalSegments();
               if (data.id) currentId = data.id;
               renderHistory();
               sse.close();
@@ -207,6 +214,67 @@ function addMessage(text, role) {
   messages.scrollTop = messages.scrollHeight;
 }
 
+function formatProgress(percent, eta) {
+  if (!eta || percent >= 100) return `${percent}%`;
+  const minutes = Math.floor(eta / 60);
+  const seconds = eta % 60;
+  const restante = minutes ? `${minutes} min ${seconds} s` : `${seconds} s`;
+  return `${percent}% · faltan ~${restante}`;
+}
+
+// Muestra la transcripción en vivo agrupando los segmentos seguidos del mismo hablante.
+// Los segmentos provisionales (sin hablante) llegan mientras Whisper transcribe;
+// cada segmento definitivo reemplaza a los provisionales que ya empezaron antes de su fin.
+let lastSegmentSpeaker = null;
+let lastSegmentDiv = null;
+let provisionalSegments = [];
+
+function addProvisionalSegment(segmento, texto) {
+  const div = document.createElement('div');
+  div.className = 'message bot segment provisional';
+  div.textContent = texto;
+  messages.appendChild(div);
+  provisionalSegments.push({ inicio: Number(segmento.inicio) || 0, div });
+}
+
+// Lo que quede provisional al terminar lo descartó la limpieza de la transcripción
+function clearProvisionalSegments() {
+  provisionalSegments.forEach(p => p.div.remove());
+  provisionalSegments = [];
+}
+
+function addSegment(segmento) {
+  const texto = (segmento.texto || '').trim();
+  if (!texto) return;
+  if (segmento.provisional) {
+    addProvisionalSegment(segmento, texto);
+    messages.scrollTop = messages.scrollHeight;
+    return;
+  }
+  const fin = Number(segmento.fin) || 0;
+  provisionalSegments = provisionalSegments.filter(p => {
+    if (p.inicio < fin) {
+      p.div.remove();
+      return false;
+    }
+    return true;
+  });
+  if (segmento.hablante !== lastSegmentSpeaker || !lastSegmentDiv || !lastSegmentDiv.isConnected) {
+    lastSegmentSpeaker = segmento.hablante;
+    lastSegmentDiv = document.createElement('div');
+    lastSegmentDiv.className = 'message bot segment';
+    const speaker = document.createElement('strong');
+    speaker.textContent = `${segmento.hablante}: `;
+    lastSegmentDiv.appendChild(speaker);
+    lastSegmentDiv.appendChild(document.createTextNode(texto));
+    // Los definitivos van antes de los provisionales que todavía no se reemplazaron
+    messages.insertBefore(lastSegmentDiv, provisionalSegments.length ? provisionalSegments[0].div : null);
+  } else {
+    lastSegmentDiv.appendChild(document.createTextNode(' ' + texto));
+  }
+  messages.scrollTop = messages.scrollHeight;
+}
+
 function showToast(text, type = 'success') {
   const div = document.createElement('div');
   div.className = `toast toast-${type}`;
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Mide el arranque de ``transcribir.py`` en los caminos que no usan modelos.
+
+Cada caso corre en un intérprete nuevo, varias veces, y se informa la
+mediana del tiempo total. Además se comprueba que ninguno importe torch,
+whisperx ni pyannote. Casos:
+
+- ``--help``;
+- un audio que no existe (debe fallar enseguida);
+- ``--render-only`` sobre segmentos guardados de una reunión sintética;
+- ``import transcribir`` (lo que paga ``transcribir_partes.py``).
+
+El script termina con código 1 si algún caso supera ``--limite-ms`` o
+importa una librería pesada, así que sirve como prueba de regresión.
+
+Uso:
+  python scripts/benchmark_arranque.py
+  python scripts/benchmark_arranque.py --repeticiones 10 --limite-ms 300 --detalle
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+DIRECTORIO_PYTHON = Path(__file__).resolve().parent.parent / "src" / "python"
+SCRIPT = DIRECTORIO_PYTHON / "transcribir.py"
+LIBRERIAS_PESADAS = ("torch", "whisperx", "pyannote")
+REPETICIONES_DEF = 5
+LIMITE_MS_DEF = 300
+
+# Se ejecuta al salir del intérprete medido e informa qué librerías pesadas cargó
+_INFORME_MODULOS = (
+    "import atexit, sys\n"
+    "atexit.register(lambda: sys.__stderr__.write('@@PESADAS ' + ','.join(sorted("
+    "{m.split('.')[0] for m in sys.modules} & set(%r))) + '\\n'))\n"
+) % (LIBRERIAS_PESADAS,)
+
+
+def preparar_segmentos(directorio: str) -> str:
+    """Guarda los segmentos de una reunión sintética y devuelve su audio."""
+
+    sys.path.insert(0, str(DIRECTORIO_PYTHON))
+    from segmentos_guardados import guardar_segmentos, ruta_segmentos
+
+    segmentos = [
+        {"start": i * 4.0, "end": i * 4.0 + 3.5, "text": f"intervención número {i}", "words": []}
+        for i in range(2000)
+    ]
+    audio = os.path.join(directorio, "reunion.wav")
+    guardar_segmentos({"segments": segmentos}, False, ruta_segmentos(audio.rsplit(".", 1)[0]))
+    return audio
+
+
+def casos(audio: str) -> Dict[str, List[str]]:
+    script = str(SCRIPT)
+
+    def comando(argv: List[str], codigo: str) -> List[str]:
+        preparar = f"sys.argv = {[script, *argv]!r}; sys.path.insert(0, {str(DIRECTORIO_PYTHON)!r})\n"
+        return [sys.executable, "-c", _INFORME_MODULOS + preparar + codigo]
+
+    correr = f"import runpy; runpy.run_path({script!r}, run_name='__main__')"
+    return {
+        "--help": comando(["--help"], correr),
+        "audio inexistente": comando(["no_existe.wav"], correr),
+        "--render-only": comando([audio, "--render-only", "--quiet"], correr),
+        "import transcribir": comando([], "import transcribir"),
+    }
+
+
+def medir(comando: List[str], directorio: str, detalle: bool) -> Tuple[float, str, str]:
+    """Devuelve el tiempo, las librerías pesadas cargadas y el detalle de -X importtime."""
+
+    if detalle:
+        comando = [comando[0], "-X", "importtime", *comando[1:]]
+    inicio = time.perf_counter()
+    salida = subprocess.run(comando, cwd=directorio, capture_output=True, text=True, check=False)
+    segundos = time.perf_counter() - inicio
+    pesadas = ""
+    for linea in salida.stderr.splitlines():
+        if linea.startswith("@@PESADAS "):
+            pesadas = linea.split(" ", 1)[1].strip()
+    return segundos, pesadas, salida.stderr
+
+
+def importaciones_mas_lentas(stderr: str, cantidad: int = 8) -> List[Tuple[int, str]]:
+    """Módulos con mayor tiempo acumulado según ``-X importtime``."""
+
+    tiempos = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _propio, acumulado, modulo = linea[len("import time:"):].split("|", 2)
+        tiempos.append((int(acumulado), modulo.strip()))
+    return sorted(tiempos, reverse=True)[:cantidad]
+
+
+def parse_args() -> argparse.Namespace:
+    """Define y analiza los argumentos de la línea de comandos."""
+
+    parser = argparse.ArgumentParser(description="Benchmark del arranque de transcribir.py")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES_DEF, help="Corridas por caso")
+    parser.add_argument(
+        "--limite-ms",
+        type=float,
+        default=LIMITE_MS_DEF,
+        help="Mediana máxima aceptada por caso, en milisegundos",
+    )
+    parser.add_argument(
+        "--detalle",
+        action="store_true",
+        help="Muestra las importaciones más lentas de cada caso (-X importtime)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    fallas = []
+    with tempfile.TemporaryDirectory() as directorio:
+        audio = preparar_segmentos(directorio)
+        print(f"{'caso':<20} {'mediana ms':>11} {'mínimo ms':>10}  librerías pesadas")
+        for nombre, comando in casos(audio).items():
+            tiempos = []
+            pesadas = ""
+            for _ in range(args.repeticiones):
+                segundos, pesadas_corrida, stderr = medir(comando, directorio, args.detalle)
+                tiempos.append(segundos * 1000)
+                pesadas = pesadas or pesadas_corrida
+            mediana = statistics.median(tiempos)
+            print(f"{nombre:<20} {mediana:11.0f} {min(tiempos):10.0f}  {pesadas or '-'}")
+            if args.detalle:
+                for microsegundos, modulo in importaciones_mas_lentas(stderr):
+                    print(f"{'':<20} {microsegundos / 1000:11.1f}  {modulo}")
+            if mediana > args.limite_ms:
+                fallas.append(f"{nombre}: {mediana:.0f} ms > {args.limite_ms:.0f} ms")
+            if pesadas:
+                fallas.append(f"{nombre}: importó {pesadas}")
+            sys.stdout.flush()
+
+    if fallas:
+        print("❌ " + "\n❌ ".join(fallas))
+        sys.exit(1)
+    print(f"✅ Todos los casos por debajo de {args.limite_ms:.0f} ms y sin librerías pesadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Mide el formateador de transcripciones con reuniones sintéticas.
+
+Genera listas de segmentos como las que entrega WhisperX (con cambios de
+hablante, errores sueltos de la diarización y muletillas repetidas) y mide
+el tiempo y la memoria pico de cada función de ``src/python/formateador.py``.
+No carga ningún modelo.
+
+Uso:
+  python scripts/benchmark_formateador.py
+  python scripts/benchmark_formateador.py --tamanos 1000 100000 1000000 --hablantes 12
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "python"))
+
+import formateador  # noqa: E402
+
+TAMANOS_DEF = [1_000, 10_000, 100_000, 1_000_000]
+
+PALABRAS = (
+    "el aprendiz la instructora comité ficha competencia resultado evaluación "
+    "proceso formativo reglamento artículo numeral falta académica disciplinaria "
+    "plan de mejoramiento asistencia coordinación centro de formación sena "
+    "entonces bueno listo vamos a revisar el caso del aprendiz que no entregó "
+    "las evidencias en la fecha acordada según el acta anterior"
+).split()
+
+MULETILLAS = [
+    "no no no no no no",
+    "eh eh eh eh eh",
+    "mm mm mm mm mm",
+    "sí sí sí sí sí",
+    "no, no, no, no, no, no",
+    ", , , ,",
+]
+
+
+def generar_segmentos(
+    cantidad: int,
+    hablantes: int = 8,
+    permanencia: float = 0.85,
+    ruido: float = 0.05,
+    muletillas: float = 0.1,
+    semilla: int = 0,
+) -> List[Dict[str, Any]]:
+    """Genera ``cantidad`` segmentos con el formato de ``resultado["segments"]``.
+
+    ``permanencia`` es la probabilidad de que siga hablando la misma persona,
+    ``ruido`` la de que la diarización asigne un segmento suelto a otro
+    hablante y ``muletillas`` la de insertar una repetición.
+    """
+
+    aleatorio = random.Random(semilla)
+    segmentos = []
+    hablante = 0
+    tiempo = 0.0
+    for _ in range(cantidad):
+        if aleatorio.random() > permanencia:
+            hablante = aleatorio.randrange(hablantes)
+        etiqueta = hablante
+        if aleatorio.random() < ruido:
+            etiqueta = aleatorio.randrange(hablantes)
+
+        palabras = aleatorio.choices(PALABRAS, k=aleatorio.randint(3, 25))
+        if aleatorio.random() < muletillas:
+            palabras.insert(aleatorio.randrange(len(palabras) + 1), aleatorio.choice(MULETILLAS))
+        duracion = round(0.3 * len(palabras) + aleatorio.random(), 2)
+
+        segmento = {
+            "start": round(tiempo, 2),
+            "end": round(tiempo + duracion, 2),
+            "text": " " + " ".join(palabras),
+        }
+        if aleatorio.random() > 0.01:
+            segmento["speaker"] = f"SPEAKER_{etiqueta:02d}"
+        segmentos.append(segmento)
+        tiempo += duracion + aleatorio.random()
+    return segmentos
+
+
+def medir(funcion: Callable[[], Any], memoria: bool) -> Tuple[float, int, Any]:
+    """Ejecuta ``funcion`` y devuelve segundos, bytes pico y resultado.
+
+    Los mensajes que imprime el formateador se descartan.
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        pico = 0
+        if memoria:
+            tracemalloc.start()
+            funcion()
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return segundos, pico, resultado
+
+
+def ejecutar(tamano: int, args: argparse.Namespace) -> List[Tuple[str, float, int]]:
+    """Mide cada función del formateador sobre ``tamano`` segmentos."""
+
+    resultado = {"segments": generar_segmentos(tamano, args.hablantes, semilla=args.semilla)}
+    memoria = not args.sin_memoria
+    filas = []
+
+    segundos, pico, texto = medir(
+        lambda: formateador.procesar_segmentos_con_hablantes(
+            resultado, formateador.MapeoHablantes()
+        ),
+        memoria,
+    )
+    filas.append(("procesar_segmentos_con_hablantes", segundos, pico))
+
+    segundos, pico, texto = medir(lambda: formateador.limpiar_texto_repetitivo(texto), memoria)
+    filas.append(("limpiar_texto_repetitivo", segundos, pico))
+
+    segundos, pico, _ = medir(lambda: formateador.formatear_texto_final(texto), memoria)
+    filas.append(("formatear_texto_final", segundos, pico))
+
+    with tempfile.TemporaryDirectory() as directorio:
+        nombre = os.path.join(directorio, "reunion")
+        segundos, pico, _ = medir(
+            lambda: formateador.formatear_salida(
+                resultado, [], nombre, mapeo=formateador.MapeoHablantes()
+            ),
+            memoria,
+        )
+    filas.append(("formatear_salida", segundos, pico))
+    return filas
+
+
+def parse_args() -> argparse.Namespace:
+    """Define y analiza los argumentos de la línea de comandos."""
+
+    parser = argparse.ArgumentParser(description="Benchmark del formateador de transcripciones")
+    parser.add_argument(
+        "--tamanos",
+        type=int,
+        nargs="+",
+        default=TAMANOS_DEF,
+        help="Cantidades de segmentos a generar",
+    )
+    parser.add_argument("--hablantes", type=int, default=8, help="Hablantes de la reunión")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador")
+    parser.add_argument(
+        "--sin-memoria",
+        action="store_true",
+        help="No medir la memoria pico (tracemalloc duplica el tiempo de cada corrida)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"{'segmentos':>10}  {'función':<34} {'segundos':>10} {'pico MiB':>10}")
+    for tamano in args.tamanos:
+        for funcion, segundos, pico in ejecutar(tamano, args):
+            memoria = f"{pico / 2**20:10.1f}" if not args.sin_memoria else f"{'-':>10}"
+            print(f"{tamano:>10}  {funcion:<34} {segundos:10.3f} {memoria}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Mide el rendimiento de la normalización de texto con entradas patológicas.
+
+Compara el recorrido por palabras de ``src/python/normalizacion.py`` con las
+cuatro expresiones regulares que usaba antes ``limpiar_texto_repetitivo``, sobre bucles alucinados de
+Whisper ("no no no ...", "eh, eh, eh, ...") y otros casos que hacen
+retroceder al motor de expresiones regulares.
+
+Uso:
+  python scripts/benchmark_normalizacion.py
+  python scripts/benchmark_normalizacion.py --tamanos 10000 100000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "python"))
+
+from normalizacion import normalizar_texto  # noqa: E402
+
+TAMANOS_DEF = [10_000, 100_000, 1_000_000]
+REPETICIONES = 3
+
+
+def normalizar_con_regex(texto: str) -> str:
+    """Implementación anterior, como referencia."""
+
+    texto = re.sub(r"\b(no|sí|ah|eh|mm|um)\s*(?:\1\s*){4,}", r"\1 ", texto, flags=re.IGNORECASE)
+    texto = re.sub(r"(?:no,?\s*){5,}", "no ", texto, flags=re.IGNORECASE)
+    texto = re.sub(r",\s*,\s*,+", ", ", texto)
+    texto = re.sub(r"\s+", " ", texto)
+    return texto.strip()
+
+
+# Cada caso genera un texto de aproximadamente ``tamano`` caracteres
+CASOS: Dict[str, Callable[[int], str]] = {
+    "bucle de 'no'": lambda n: "no " * (n // 3),
+    "bucle con comas": lambda n: "no, " * (n // 4),
+    "rachas con punto": lambda n: "No, no, no, no, no. Eh eh eh eh eh? " * (n // 36),
+    "cuatro repeticiones": lambda n: "eh eh eh eh bueno " * (n // 18),
+    "espacios largos": lambda n: ("no" + " " * 200) * (n // 202),
+    "comas sueltas": lambda n: ", " * (n // 2),
+    "texto normal": lambda n: "el aprendiz presentó las evidencias, sí, en la fecha " * (n // 53),
+}
+
+
+def medir(funcion: Callable[[str], str], texto: str, repeticiones: int = REPETICIONES) -> float:
+    """Devuelve el mejor tiempo de ``repeticiones`` llamadas, en segundos."""
+
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(texto)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def parse_args() -> argparse.Namespace:
+    """Define y analiza los argumentos de la línea de comandos."""
+
+    parser = argparse.ArgumentParser(description="Benchmark de la normalización de texto")
+    parser.add_argument(
+        "--tamanos",
+        type=int,
+        nargs="+",
+        default=TAMANOS_DEF,
+        help="Tamaños aproximados de los textos, en caracteres",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"{'caracteres':>10}  {'caso':<22} {'regex anterior MB/s':>20} {'recorrido MB/s':>15}")
+    for tamano in args.tamanos:
+        for nombre, generar in CASOS.items():
+            texto = generar(tamano)
+            megas = len(texto.encode("utf-8")) / 2**20
+            anterior = megas / max(medir(normalizar_con_regex, texto), 1e-9)
+            nuevo = megas / max(medir(normalizar_texto, texto), 1e-9)
+            print(f"{len(texto):>10}  {nombre:<22} {anterior:20.1f} {nuevo:15.1f}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,69 +3,370 @@
 
 Uso:
   python scripts/extraer_reglamento.py scripts/REGLAMENTO_DEL_APRENDIZ.docx config/reglamento.json
+  python scripts/extraer_reglamento.py --procesos 4 Reglamento.pdf config/reglamento.json
+  python scripts/extraer_reglamento.py --solo-indice config/reglamento.json
 
 El archivo JSON contendrá un objeto ``articulos`` cuyas claves siguen el formato
 "CAPITULO I - Articulo 1 - Numeral 1".
+
+El PDF se extrae página por página en varios procesos. El texto de cada
+página se guarda en ``CACHE_REGLAMENTO`` (por defecto
+``cache_reglamento.json``) según el hash de su contenido (instrucciones de
+dibujo, fuentes y demás recursos), así que al extraer una versión nueva
+del reglamento sólo se procesan las páginas que cambiaron. El capítulo y
+el artículo en curso se arrastran de una página a la siguiente, de modo
+que el JSON es el mismo que al extraer el documento de una vez.
+
+Junto al JSON se guarda ``reglamento_indice.json``: un índice invertido de
+los artículos con los pesos BM25 de cada término ya calculados, que
+``src/js/indice_reglamento.js`` usa para sugerir artículos a partir de una
+transcripción. Los términos se normalizan en español: minúsculas, sin
+tildes, sin palabras vacías y con un recorte de sufijos sencillo. La
+configuración de la normalización viaja dentro del índice para que la
+consulta la aplique igual. Con ``--solo-indice`` se regenera sólo el índice
+a partir de un ``reglamento.json`` existente.
 """
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
 import json
+import math
+import os
 import re
 import sys
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict
-
-try:
-    from pdfminer.high_level import extract_text
-except ImportError as exc:
-    print("Falta la dependencia pdfminer.six. Ejecuta 'pip install -r requirements.txt'")
-    raise SystemExit(1) from exc
-
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 CAPITULO_RE = re.compile(r"CAP[IÍ]TULO\s+([IVXLCDM]+|\d+)", re.IGNORECASE)
 ARTICULO_RE = re.compile(r"ART[IÍ]CULO\s+(\d+)", re.IGNORECASE)
-NUMERAL_RE = re.compile(r"^(\d+)[\.\u00BA\u00B0\u00B2]?")
+NUMERAL_RE = re.compile(r"^(\d+)[\.º°²]?")
 
+ARCHIVO_CACHE_DEF = os.getenv("CACHE_REGLAMENTO", "cache_reglamento.json")
+MAXIMO_CACHE = 5000
+PAGINAS_POR_TAREA = 8
+ARCHIVO_INDICE = "reglamento_indice.json"
+VERSION_INDICE = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+LONGITUD_MINIMA = 3
+RAIZ_MINIMA = 4
+PALABRAS_VACIAS = sorted(
+    """
+    a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bien cada como con contra cual
+    cuales cuando de del desde donde dos el ella ellas ellos en entre era eran es esa esas ese eso esos
+    esta estaba estan estar estas este esto estos fue fueron ha hace hacen hacer han hasta hay la las le
+    les lo los mas me mi mientras mis mucho muy nada ni no nos nosotros o otra otras otro otros para pero
+    poco por porque pues que se sea segun ser si sido siempre sin sobre solo son su sus tal tambien tan
+    tanto te tiene tienen todo todos tu un una unas uno unos usted ustedes va vamos y ya yo eh bueno
+    entonces digamos osea okay listo gracias
+    """.split()
+)
+# De más largo a más corto; se quita sólo uno y si queda una raíz de RAIZ_MINIMA letras
+SUFIJOS = sorted(
+    """
+    amientos imientos amiento imiento aciones iciones uciones adoras adores ancias encias mente
+    acion icion ucion ables ibles istas adora ador ancia encia able ible ista idad idades ivas ivos
+    iva ivo osos osas oso osa ados adas idos idas ado ada ido ida ando iendo ar er ir es as os a o e
+    """.split(),
+    key=lambda sufijo: (-len(sufijo), sufijo),
+)
+_TILDES_RE = re.compile("[\u0300-\u036f]")
+_SEPARADORES_RE = re.compile(r"[^a-z0-9]+")
 
-def analizar_texto(texto: str) -> Dict[str, str]:
-    """Devuelve un mapeo de claves de articulo a su texto."""
+
+def analizar_paginas(paginas: Iterable[str]) -> Dict[str, str]:
+    """Devuelve un mapeo de claves de articulo a su texto.
+
+    El capítulo y el artículo en curso pasan de una página a la siguiente,
+    porque un artículo suele continuar en la página de después.
+    """
     articulos: Dict[str, str] = {}
     capitulo = None
     articulo = None
-    for linea in texto.splitlines():
-        linea = linea.strip()
-        if not linea:
-            continue
-        m = CAPITULO_RE.match(linea)
-        if m:
-            capitulo = f"CAPITULO {m.group(1)}"
-            continue
-        m = ARTICULO_RE.match(linea)
-        if m:
-            articulo = f"Articulo {m.group(1)}"
-            continue
-        m = NUMERAL_RE.match(linea)
-        if m and capitulo and articulo:
-            numero = m.group(1)
-            contenido = linea[m.end():].strip()
-            clave = f"{capitulo} - {articulo} - Numeral {numero}"
-            articulos[clave] = contenido
+    for texto in paginas:
+        for linea in texto.splitlines():
+            linea = linea.strip()
+            if not linea:
+                continue
+            m = CAPITULO_RE.match(linea)
+            if m:
+                capitulo = f"CAPITULO {m.group(1)}"
+                continue
+            m = ARTICULO_RE.match(linea)
+            if m:
+                articulo = f"Articulo {m.group(1)}"
+                continue
+            m = NUMERAL_RE.match(linea)
+            if m and capitulo and articulo:
+                numero = m.group(1)
+                contenido = linea[m.end():].strip()
+                clave = f"{capitulo} - {articulo} - Numeral {numero}"
+                articulos[clave] = contenido
     return articulos
 
 
+def analizar_texto(texto: str) -> Dict[str, str]:
+    """Devuelve un mapeo de claves de articulo a su texto."""
+    return analizar_paginas([texto])
+
+
+def _huella_objeto(objeto: Any, hasher: Any, memoria: Dict[int, bytes]) -> None:
+    """Agrega a ``hasher`` el contenido de ``objeto`` y de lo que referencia.
+
+    Los objetos indirectos se resumen una sola vez por documento, así las
+    fuentes compartidas por todas las páginas no se vuelven a leer.
+    """
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+    from pdfminer.psparser import PSLiteral
+
+    if isinstance(objeto, PDFObjRef):
+        if objeto.objid not in memoria:
+            memoria[objeto.objid] = b""  # evita ciclos
+            parcial = hashlib.sha256()
+            _huella_objeto(objeto.resolve(), parcial, memoria)
+            memoria[objeto.objid] = parcial.digest()
+        hasher.update(b"R" + memoria[objeto.objid])
+    elif isinstance(objeto, PDFStream):
+        _huella_objeto(objeto.attrs, hasher, memoria)
+        hasher.update(b"S" + hashlib.sha256(objeto.get_data()).digest())
+    elif isinstance(objeto, dict):
+        hasher.update(b"{")
+        for clave in sorted(objeto, key=str):
+            if clave != "Parent":
+                hasher.update(repr(clave).encode("utf-8"))
+                _huella_objeto(objeto[clave], hasher, memoria)
+        hasher.update(b"}")
+    elif isinstance(objeto, (list, tuple)):
+        hasher.update(b"[")
+        for elemento in objeto:
+            _huella_objeto(elemento, hasher, memoria)
+        hasher.update(b"]")
+    elif isinstance(objeto, PSLiteral):
+        hasher.update(b"/" + repr(objeto.name).encode("utf-8"))
+    else:
+        hasher.update(repr(objeto).encode("utf-8"))
+
+
+def huellas_paginas(pdf_path: Path) -> List[str]:
+    """Devuelve el hash del contenido de cada página del PDF.
+
+    Incluye la versión de pdfminer, porque otra versión puede extraer un
+    texto distinto de la misma página.
+    """
+    import pdfminer
+    from pdfminer.pdfpage import PDFPage
+
+    memoria: Dict[int, bytes] = {}
+    huellas = []
+    with open(pdf_path, "rb") as fh:
+        for pagina in PDFPage.get_pages(fh):
+            hasher = hashlib.sha256(f"pdfminer {pdfminer.__version__}".encode("utf-8"))
+            _huella_objeto(
+                {
+                    "contenido": pagina.contents,
+                    "recursos": pagina.resources,
+                    "caja": pagina.mediabox,
+                    "rotacion": pagina.rotate,
+                },
+                hasher,
+                memoria,
+            )
+            huellas.append(hasher.hexdigest())
+    return huellas
+
+
+def _extraer_paginas(tarea: Tuple[str, Sequence[int]]) -> List[Tuple[int, str]]:
+    """Extrae el texto de algunas páginas, igual que ``extract_text`` con todo el PDF."""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    ruta, indices = tarea
+    recursos = PDFResourceManager(caching=True)
+    textos = []
+    with open(ruta, "rb") as fh:
+        paginas = PDFPage.get_pages(fh, pagenos=set(indices))
+        for indice, pagina in zip(sorted(indices), paginas):
+            with io.StringIO() as salida:
+                conversor = TextConverter(recursos, salida, laparams=LAParams())
+                PDFPageInterpreter(recursos, conversor).process_page(pagina)
+                conversor.close()
+                textos.append((indice, salida.getvalue()))
+    return textos
+
+
+def extraer_paginas(
+    pdf_path: Path,
+    procesos: Optional[int] = None,
+    archivo_cache: Optional[str] = ARCHIVO_CACHE_DEF,
+) -> List[str]:
+    """Devuelve el texto de cada página del PDF, en orden.
+
+    Las páginas que no están en la caché se reparten en tareas de
+    ``PAGINAS_POR_TAREA`` entre ``procesos`` procesos (por defecto, uno por
+    núcleo). Con ``archivo_cache=None`` no se usa caché en disco.
+    """
+    huellas = huellas_paginas(pdf_path)
+    cache: Dict[str, str] = {}
+    if archivo_cache and os.path.exists(archivo_cache):
+        try:
+            with open(archivo_cache, "r", encoding="utf-8") as fh:
+                cache = json.load(fh)
+        except (OSError, ValueError) as exc:
+            print(f"⚠️ No pude leer la caché de páginas {archivo_cache}: {exc}")
+
+    faltantes = sorted({huella: i for i, huella in enumerate(huellas) if huella not in cache}.values())
+    print(f"📄 {len(huellas)} páginas, {len(huellas) - len(faltantes)} en caché")
+    if faltantes:
+        tareas = [
+            (str(pdf_path), faltantes[i:i + PAGINAS_POR_TAREA])
+            for i in range(0, len(faltantes), PAGINAS_POR_TAREA)
+        ]
+        procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+        if procesos > 1:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                resultados = list(pool.map(_extraer_paginas, tareas))
+        else:
+            resultados = [_extraer_paginas(tarea) for tarea in tareas]
+        for resultado in resultados:
+            for indice, texto in resultado:
+                cache[huellas[indice]] = texto
+        if archivo_cache:
+            # Se conservan las páginas agregadas más recientemente
+            with open(archivo_cache, "w", encoding="utf-8") as fh:
+                json.dump(dict(list(cache.items())[-MAXIMO_CACHE:]), fh, ensure_ascii=False)
+
+    return [cache[huella] for huella in huellas]
+
+
+def raiz(token: str) -> str:
+    """Quita el sufijo más largo de ``SUFIJOS`` que deje una raíz suficiente."""
+    for sufijo in SUFIJOS:
+        if token.endswith(sufijo) and len(token) - len(sufijo) >= RAIZ_MINIMA:
+            return token[: -len(sufijo)]
+    return token
+
+
+def normalizar_tokens(texto: str) -> List[str]:
+    """Términos normalizados de ``texto``, igual que ``crearNormalizador`` en ``src/js/indice_reglamento.js``."""
+    plano = _TILDES_RE.sub("", unicodedata.normalize("NFD", texto)).lower()
+    vacias = set(PALABRAS_VACIAS)
+    return [
+        raiz(token)
+        for token in _SEPARADORES_RE.split(plano)
+        if len(token) >= LONGITUD_MINIMA and token not in vacias
+    ]
+
+
+def construir_indice(articulos: Dict[str, str], huella: str) -> Dict[str, Any]:
+    """Arma el índice invertido con el peso BM25 de cada término en cada artículo.
+
+    El puntaje de una consulta es la suma de los pesos de sus términos, así
+    que consultar no depende del tamaño del reglamento sino de cuántos
+    artículos contienen esos términos. Sólo se indexa el cuerpo de cada
+    artículo: las claves ("CAPITULO III - Articulo 8 - Numeral 6") se repiten
+    en todos y harían que una consulta con "artículo" puntuara el reglamento
+    entero.
+    """
+    codigos = list(articulos)
+    documentos = [Counter(normalizar_tokens(articulos[codigo])) for codigo in codigos]
+    longitudes = [sum(frecuencias.values()) for frecuencias in documentos]
+    promedio = sum(longitudes) / max(len(documentos), 1) or 1.0
+
+    apariciones: Dict[str, List[int]] = {}
+    for indice, frecuencias in enumerate(documentos):
+        for termino in frecuencias:
+            apariciones.setdefault(termino, []).append(indice)
+
+    total = len(documentos)
+    terminos = {}
+    for termino, indices in sorted(apariciones.items()):
+        idf = math.log(1 + (total - len(indices) + 0.5) / (len(indices) + 0.5))
+        terminos[termino] = [
+            [
+                indice,
+                round(
+                    idf
+                    * documentos[indice][termino]
+                    * (BM25_K1 + 1)
+                    / (
+                        documentos[indice][termino]
+                        + BM25_K1 * (1 - BM25_B + BM25_B * longitudes[indice] / promedio)
+                    ),
+                    4,
+                ),
+            ]
+            for indice in indices
+        ]
+    return {
+        "version": VERSION_INDICE,
+        "huella": huella,
+        "bm25": {"k1": BM25_K1, "b": BM25_B},
+        "normalizacion": {
+            "longitud_minima": LONGITUD_MINIMA,
+            "raiz_minima": RAIZ_MINIMA,
+            "palabras_vacias": PALABRAS_VACIAS,
+            "sufijos": SUFIJOS,
+        },
+        "codigos": codigos,
+        "terminos": terminos,
+    }
+
+
+def guardar_indice(json_path: Path) -> Path:
+    """Genera el índice de ``json_path`` y lo guarda a su lado."""
+    contenido = json_path.read_bytes()
+    articulos = json.loads(contenido.decode("utf-8")).get("articulos", {})
+    indice = construir_indice(articulos, hashlib.sha256(contenido).hexdigest())
+    ruta_indice = json_path.with_name(ARCHIVO_INDICE)
+    with open(ruta_indice, "w", encoding="utf-8") as fh:
+        json.dump(indice, fh, ensure_ascii=False, separators=(",", ":"))
+    print(f"Índice BM25 con {len(indice['terminos'])} términos de {len(articulos)} artículos: {ruta_indice}")
+    return ruta_indice
+
+
 def main() -> None:
-    if len(sys.argv) < 3:
-        print("Uso: python scripts/extraer_reglamento.py REG.pdf salida.json")
-        sys.exit(1)
-    pdf_path = Path(sys.argv[1])
-    json_path = Path(sys.argv[2])
+    parser = argparse.ArgumentParser(description="Extrae el Reglamento del Aprendiz y genera su índice")
+    parser.add_argument("entrada", nargs="?", help="PDF del reglamento (no se usa con --solo-indice)")
+    parser.add_argument("salida", help="Archivo JSON de artículos")
+    parser.add_argument(
+        "--solo-indice",
+        action="store_true",
+        help="Regenera sólo el índice a partir del JSON existente",
+    )
+    parser.add_argument("--procesos", type=int, help="Procesos para extraer páginas (por defecto, uno por núcleo)")
+    parser.add_argument(
+        "--cache",
+        default=ARCHIVO_CACHE_DEF,
+        help="Caché del texto de cada página (vacío para no usarla)",
+    )
+    args = parser.parse_args()
+    json_path = Path(args.salida)
+
+    if not args.solo_indice:
+        if not args.entrada:
+            print("Uso: python scripts/extraer_reglamento.py REG.pdf salida.json")
+            sys.exit(1)
+        try:
+            import pdfminer  # noqa: F401
+        except ImportError as exc:
+            print("Falta la dependencia pdfminer.six. Ejecuta 'pip install -r requirements.txt'")
+            raise SystemExit(1) from exc
+
+        paginas = extraer_paginas(Path(args.entrada), args.procesos, args.cache or None)
+        articulos = analizar_paginas(paginas)
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as fh:
+            json.dump({"articulos": articulos}, fh, ensure_ascii=False, indent=2)
 
-    texto = extract_text(str(pdf_path))
-    articulos = analizar_texto(texto)
-    json_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(json_path, "w", encoding="utf-8") as fh:
-        json.dump({"articulos": articulos}, fh, ensure_ascii=False, indent=2)
+    guardar_indice(json_path)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -11,7 +11,7 @@
     "\n",
     "1. Instala las dependencias.\n",
     "2. Monta tu Google Drive o sube manualmente los archivos `cosmetologia_parte_1.wav`, `cosmetologia_parte_2.wav` y `cosmetologia_parte_3.wav`.\n",
-    "3. Ejecuta la transcripción para cada archivo.\n",
+    "3. Ejecuta la transcripción de los tres archivos por lotes, con los modelos cargados una sola vez.\n",
     "4. Se unirán las tres transcripciones en un solo documento.\n",
     "5. Finalmente podrás ver o descargar el resultado combinado.\n"
    ]
@@ -56,12 +56,14 @@
     "    'cosmetologia_parte_3.wav'\n",
     "]\n",
     "\n",
-    "text_files = []\n",
     "for audio in audios:\n",
     "    if not os.path.exists(audio):\n",
     "        raise FileNotFoundError(f'No se encontró {audio}. Verifica la ruta.')\n",
-    "    !python src/python/transcribir.py \"{audio}\"\n",
-    "    text_files.append(f\"{os.path.splitext(audio)[0]}_transcripcion.txt\")\n"
+    "\n",
+    "# Un solo proceso: los modelos se cargan una vez y los lotes de la GPU se llenan con las tres partes\n",
+    "partes = ' '.join(f'\"{audio}\"' for audio in audios)\n",
+    "!python src/python/transcribir.py {partes}\n",
+    "text_files = [f\"{os.path.splitext(audio)[0]}_transcripcion.txt\" for audio in audios]\n"
    ]
   },
   {
@@ -0,0 +1,37 @@
+const PREFIJO_EVENTO = '@@';
+
+// Interpreta una línea emitida por los scripts de Python.
+// Los eventos llegan como `@@TIPO {json}`; cualquier otra línea es registro normal.
+function interpretarEvento(linea) {
+  const limpio = linea.trim();
+  if (!limpio.startsWith(PREFIJO_EVENTO)) return null;
+  const separador = limpio.indexOf(' ');
+  const tipo = limpio.slice(PREFIJO_EVENTO.length, separador === -1 ? undefined : separador);
+  const carga = separador === -1 ? '' : limpio.slice(separador + 1);
+  try {
+    return { tipo, datos: carga ? JSON.parse(carga) : {} };
+  } catch {
+    return null;
+  }
+}
+
+// Estima los segundos que faltan a partir de un evento @@PROGRESO.
+// Mientras haya audio por procesar uso el factor de tiempo real; si no, el porcentaje.
+function estimarSegundosRestantes(progreso = {}) {
+  const {
+    porcentaje,
+    transcurrido,
+    audio_procesado: procesado,
+    duracion_audio: duracion,
+    factor_tiempo_real: factor
+  } = progreso;
+  if (factor && duracion && procesado < duracion) {
+    return Math.round(factor * (duracion - procesado));
+  }
+  if (porcentaje > 0 && porcentaje < 100 && transcurrido) {
+    return Math.round((transcurrido * (100 - porcentaje)) / porcentaje);
+  }
+  return null;
+}
+
+module.exports = { PREFIJO_EVENTO, interpretarEvento, estimarSegundosRestantes };
@@ -8,6 +8,7 @@ const path = require("path");
 const { fusionarPartes } = require("./fusionar_partes");
 const { generarDocumentoWord } = require('./generador_documento');
 const { extraerInformacionDelAudio } = require('./metadatos');
+const { IndiceReglamento } = require('./indice_reglamento');
 
 // Cargo las variables de entorno 
 require('dotenv').config();
@@ -18,6 +19,7 @@ class GeneradorDeActasSENA {
         this.miClaveAPI = process.env.GEMINI_API_KEY;
         this.modeloIA = null;
         this.reglamento = {};
+        this.indiceReglamento = null;
     }
 
     async init() {
@@ -32,6 +34,10 @@ class GeneradorDeActasSENA {
             if (fs.existsSync(ruta)) {
                 const data = fs.readFileSync(ruta, 'utf-8');
                 this.reglamento = JSON.parse(data).articulos || {};
+                // El índice BM25 lo genera scripts/extraer_reglamento.py junto al JSON
+                this.indiceReglamento = IndiceReglamento.cargar(
+                    ruta, path.join(path.dirname(ruta), 'reglamento_indice.json')
+                );
                 console.log(`📚 Reglamento del Aprendiz cargado (${Object.keys(this.reglamento).length} artículos)`);
             } else {
                 console.log('ℹ️ No encontré config/reglamento.json');
@@ -39,6 +45,7 @@ class GeneradorDeActasSENA {
         } catch (e) {
             console.error('⚠️ No pude cargar el reglamento:', e.message);
             this.reglamento = {};
+            this.indiceReglamento = null;
         }
     }
 
@@ -51,25 +58,13 @@ class GeneradorDeActasSENA {
     }
 
     // Intento adivinar los artículos del reglamento que podrían aplicar
-    // comparando palabras clave de la transcripción con cada artículo
-    detectarArticulosDesdeTexto(texto = '') {
-        if (typeof texto !== 'string' || !texto.trim()) return [];
-
-        const palabras = new Set(
-            texto.toLowerCase().split(/\W+/).filter(p => p.length > 4)
-        );
-
-        const puntajes = Object.entries(this.reglamento).map(([codigo, cuerpo]) => {
-            const palabrasArticulo = new Set(cuerpo.toLowerCase().split(/\W+/));
-            let score = 0;
-            palabras.forEach(p => {
-                if (palabrasArticulo.has(p)) score++;
-            });
-            return { codigo, score };
-        }).filter(p => p.score > 0);
-
-        puntajes.sort((a, b) => b.score - a.score);
-        return puntajes.slice(0, 3).map(p => p.codigo);
+    // buscando la transcripción en el índice BM25 del reglamento
+    detectarArticulosDesdeTexto(texto = '', cantidad = 3) {
+        if (!this.indiceReglamento) {
+            if (Object.keys(this.reglamento).length === 0) return [];
+            this.indiceReglamento = IndiceReglamento.desdeArticulos(this.reglamento);
+        }
+        return this.indiceReglamento.buscar(texto, cantidad).map(r => r.codigo);
     }
 
     async configurarConexionConGemini() {
@@ -0,0 +1,131 @@
+const crypto = require('crypto');
+const fs = require('fs');
+
+// Deben coincidir con scripts/extraer_reglamento.py (lo comprueba
+// test/indice_reglamento.test.js): sólo se usan si el índice guardado falta o
+// no corresponde al reglamento.json actual.
+const NORMALIZACION_DEF = {
+  longitud_minima: 3,
+  raiz_minima: 4,
+  palabras_vacias: `
+    a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bien cada como con contra cual
+    cuales cuando de del desde donde dos el ella ellas ellos en entre era eran es esa esas ese eso esos
+    esta estaba estan estar estas este esto estos fue fueron ha hace hacen hacer han hasta hay la las le
+    les lo los mas me mi mientras mis mucho muy nada ni no nos nosotros o otra otras otro otros para pero
+    poco por porque pues que se sea segun ser si sido siempre sin sobre solo son su sus tal tambien tan
+    tanto te tiene tienen todo todos tu un una unas uno unos usted ustedes va vamos y ya yo eh bueno
+    entonces digamos osea okay listo gracias
+  `.split(/\s+/).filter(Boolean).sort(),
+  sufijos: `
+    amientos imientos amiento imiento aciones iciones uciones adoras adores ancias encias mente
+    acion icion ucion ables ibles istas adora ador ancia encia able ible ista idad idades ivas ivos
+    iva ivo osos osas oso osa ados adas idos idas ado ada ido ida ando iendo ar er ir es as os a o e
+  `.split(/\s+/).filter(Boolean).sort((a, b) => b.length - a.length || (a < b ? -1 : 1)),
+};
+const BM25_DEF = { k1: 1.2, b: 0.75 };
+
+// Igual que normalizar_tokens() en Python: sin tildes, minúsculas, sin palabras
+// vacías y sin el sufijo más largo que deje una raíz suficiente.
+function crearNormalizador(config = NORMALIZACION_DEF) {
+  const vacias = new Set(config.palabras_vacias);
+  const sufijos = config.sufijos;
+  const raiz = (token) => {
+    for (const sufijo of sufijos) {
+      if (token.endsWith(sufijo) && token.length - sufijo.length >= config.raiz_minima) {
+        return token.slice(0, -sufijo.length);
+      }
+    }
+    return token;
+  };
+  return (texto) => texto
+    .normalize('NFD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .split(/[^a-z0-9]+/)
+    .filter(token => token.length >= config.longitud_minima && !vacias.has(token))
+    .map(raiz);
+}
+
+function contarTerminos(tokens) {
+  const conteo = new Map();
+  tokens.forEach(t => conteo.set(t, (conteo.get(t) || 0) + 1));
+  return conteo;
+}
+
+// Arma en memoria el mismo índice que genera scripts/extraer_reglamento.py,
+// sólo con el cuerpo de cada artículo (sin la clave capítulo/artículo/numeral).
+function construirIndice(articulos, { k1, b } = BM25_DEF, normalizacion = NORMALIZACION_DEF) {
+  const normalizar = crearNormalizador(normalizacion);
+  const codigos = Object.keys(articulos);
+  const documentos = codigos.map(c => contarTerminos(normalizar(articulos[c])));
+  const longitudes = documentos.map(d => [...d.values()].reduce((s, n) => s + n, 0));
+  const promedio = longitudes.reduce((s, n) => s + n, 0) / Math.max(documentos.length, 1) || 1;
+
+  const apariciones = new Map();
+  documentos.forEach((doc, i) => doc.forEach((_n, termino) => {
+    if (!apariciones.has(termino)) apariciones.set(termino, []);
+    apariciones.get(termino).push(i);
+  }));
+
+  const terminos = {};
+  apariciones.forEach((indices, termino) => {
+    const idf = Math.log(1 + (codigos.length - indices.length + 0.5) / (indices.length + 0.5));
+    terminos[termino] = indices.map(i => {
+      const tf = documentos[i].get(termino);
+      return [i, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * longitudes[i] / promedio))];
+    });
+  });
+  return { bm25: { k1, b }, normalizacion, codigos, terminos };
+}
+
+class IndiceReglamento {
+  constructor(indice) {
+    this.codigos = indice.codigos;
+    this.terminos = indice.terminos;
+    this.normalizar = crearNormalizador(indice.normalizacion);
+  }
+
+  // Usa el índice guardado junto a reglamento.json si corresponde a su
+  // contenido; si falta o quedó viejo, lo arma en memoria.
+  static cargar(rutaReglamento, rutaIndice) {
+    const contenido = fs.readFileSync(rutaReglamento);
+    const huella = crypto.createHash('sha256').update(contenido).digest('hex');
+    if (fs.existsSync(rutaIndice)) {
+      try {
+        const indice = JSON.parse(fs.readFileSync(rutaIndice, 'utf-8'));
+        if (indice.version === 2 && indice.huella === huella) {
+          return new IndiceReglamento(indice);
+        }
+        console.log('ℹ️ El índice del reglamento no corresponde a reglamento.json, lo armo en memoria');
+      } catch (e) {
+        console.error('⚠️ No pude leer el índice del reglamento:', e.message);
+      }
+    }
+    return IndiceReglamento.desdeArticulos(JSON.parse(contenido.toString('utf-8')).articulos || {});
+  }
+
+  static desdeArticulos(articulos) {
+    return new IndiceReglamento(construirIndice(articulos));
+  }
+
+  // Devuelve los k artículos con mayor puntaje BM25 para el texto.
+  // Cada término de la consulta pesa 1 + ln(veces que aparece), para que una
+  // palabra repetida en una transcripción larga no domine el resultado.
+  buscar(texto = '', k = 3) {
+    if (typeof texto !== 'string' || !texto.trim()) return [];
+    const puntajes = new Map();
+    contarTerminos(this.normalizar(texto)).forEach((veces, termino) => {
+      if (!Object.prototype.hasOwnProperty.call(this.terminos, termino)) return;
+      const peso = 1 + Math.log(veces);
+      for (const [i, w] of this.terminos[termino]) {
+        puntajes.set(i, (puntajes.get(i) || 0) + peso * w);
+      }
+    });
+    return [...puntajes.entries()]
+      .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+      .slice(0, k)
+      .map(([i, puntaje]) => ({ codigo: this.codigos[i], puntaje }));
+  }
+}
+
+module.exports = { IndiceReglamento, construirIndice, crearNormalizador, NORMALIZACION_DEF };
@@ -11,6 +11,7 @@ const nombreBase = path.basename(audioFile, path.extname(audioFile));
 
 // Configuración
 const outputDir = "audio_procesado";
+const scriptSegmentar = path.join(__dirname, "..", "python", "segmentar_audio.py");
 const audioLimpio = path.join(outputDir, `${nombreBase}_limpio.wav`);
 const prefijoParte = path.join(outputDir, `${nombreBase}_parte`);
 
@@ -56,9 +57,34 @@ async function limpiarAudio() {
     }
 }
 
-// Función para dividir audio en partes
+// Función para dividir audio en partes cortadas en silencios (segmentar_audio.py).
+// La duración de cada parte se ajusta con DURACION_PARTE y el solape con SOLAPE_PARTE.
 async function dividirAudio(duracionTotal) {
-    console.log("✂️  Dividiendo audio en 3 partes...");
+    const comandoPython = process.env.PYTHON_CMD || "python3";
+    const comando = `${comandoPython} "${scriptSegmentar}" "${audioLimpio}" --salida "${outputDir}" --nombre "${nombreBase}"`;
+
+    console.log("✂️  Dividiendo audio en los silencios...");
+    try {
+        const { stdout } = await execAsync(comando, { maxBuffer: 10 * 1024 * 1024 });
+        process.stdout.write(stdout);
+        const manifiesto = JSON.parse(
+            fs.readFileSync(path.join(outputDir, `${nombreBase}_partes.json`), "utf-8")
+        );
+        return manifiesto.partes.map(parte => path.join(outputDir, parte.archivo));
+    } catch (error) {
+        console.warn("⚠️  No pude dividir en los silencios:", error.message);
+        console.log("🔄 Dividiendo en 3 partes iguales...");
+        return dividirAudioEnTercios(duracionTotal);
+    }
+}
+
+// División anterior en 3 partes iguales, como respaldo
+async function dividirAudioEnTercios(duracionTotal) {
+    const manifiesto = path.join(outputDir, `${nombreBase}_partes.json`);
+    if (fs.existsSync(manifiesto)) fs.unlinkSync(manifiesto);
+    fs.readdirSync(outputDir)
+        .filter(archivo => archivo.startsWith(`${nombreBase}_parte_`) && archivo.endsWith(".wav"))
+        .forEach(archivo => fs.unlinkSync(path.join(outputDir, archivo)));
 
     const duracionParte = duracionTotal / 3;
     const archivosGenerados = [];
@@ -0,0 +1,138 @@
+const readline = require('readline');
+const { spawn } = require('child_process');
+const { interpretarEvento } = require('./eventos_python');
+
+// Mantiene vivo un único `transcribir.py --serve` con los modelos ya cargados
+// y le envía los trabajos uno a uno por stdin (una línea JSON por trabajo).
+class TrabajadorTranscripcion {
+  constructor(scriptPython, directorioDelProyecto, argumentosExtra = []) {
+    this.scriptPython = scriptPython;
+    this.directorioDelProyecto = directorioDelProyecto;
+    this.argumentosExtra = argumentosExtra;
+    this.proceso = null;
+    this.pendientes = [];
+    this.actual = null;
+    this.contador = 0;
+  }
+
+  iniciar() {
+    if (this.proceso) return;
+    const comandoPython = process.env.PYTHON_CMD || 'python3';
+    console.log('🚀 Iniciando trabajador persistente de transcripción...');
+    const proceso = spawn(
+      comandoPython,
+      ['-u', this.scriptPython, '--serve', ...this.argumentosExtra],
+      {
+        cwd: this.directorioDelProyecto,
+        stdio: ['pipe', 'pipe', 'pipe'],
+        env: { ...process.env, HF_TOKEN: process.env.HF_TOKEN, PYTHONIOENCODING: 'utf-8' }
+      }
+    );
+    this.proceso = proceso;
+    this.listo = false;
+
+    readline.createInterface({ input: proceso.stdout }).on('line', linea => this.procesarLinea(linea));
+    readline.createInterface({ input: proceso.stderr }).on('line', linea => {
+      if (!linea.trim()) return;
+      if (this.actual) this.actual.errores.push(linea);
+      process.stderr.write(linea + '\n');
+    });
+
+    proceso.on('close', codigo => {
+      if (this.proceso !== proceso) return;
+      this.proceso = null;
+      const error = new Error(`El trabajador de transcripción terminó con código ${codigo}`);
+      if (this.actual) this.actual.rechazar(error);
+      this.actual = null;
+      if (this.listo) {
+        // Los trabajos en espera se atienden con un trabajador nuevo
+        this.siguiente();
+      } else {
+        // Si ni siquiera llegó a cargar los modelos, reiniciarlo fallaría igual
+        this.pendientes.splice(0).forEach(trabajo => trabajo.rechazar(error));
+      }
+    });
+    proceso.on('error', error => {
+      console.error('❌ No pude iniciar el trabajador de transcripción:', error.message);
+    });
+    // Si el trabajador murió entre trabajos, escribirle da EPIPE antes del 'close';
+    // sin este manejador el error del stream tumbaría todo el servidor
+    proceso.stdin.on('error', error => {
+      if (this.proceso !== proceso) return;
+      console.error('⚠️ El trabajador de transcripción dejó de recibir trabajos:', error.message);
+      this.proceso = null;
+      proceso.kill();
+      const fallo = new Error(`No pude enviar el trabajo al trabajador de transcripción: ${error.message}`);
+      if (this.actual) this.actual.rechazar(fallo);
+      this.actual = null;
+      if (this.listo) {
+        this.siguiente();
+      } else {
+        this.pendientes.splice(0).forEach(trabajo => trabajo.rechazar(fallo));
+      }
+    });
+  }
+
+  procesarLinea(linea) {
+    const limpio = linea.trim();
+    if (!limpio) return;
+    const evento = interpretarEvento(limpio);
+    if (!evento) {
+      process.stdout.write(linea + '\n');
+      return;
+    }
+    if (evento.tipo === 'LISTO') {
+      this.listo = true;
+      console.log(`✅ Trabajador listo (${evento.datos.device}, ${evento.datos.compute_type})`);
+    } else if (evento.tipo === 'PROGRESO') {
+      this.actual && this.actual.onProgress && this.actual.onProgress(evento.datos);
+    } else if (evento.tipo === 'SEGMENTO') {
+      this.actual && this.actual.onSegmento && this.actual.onSegmento(evento.datos);
+    } else if (evento.tipo === 'FIN' && this.actual && evento.datos.id === this.actual.id) {
+      const trabajo = this.actual;
+      this.actual = null;
+      if (evento.datos.ok) {
+        trabajo.onProgress && trabajo.onProgress({ etapa: 'fin', porcentaje: 100 });
+        trabajo.resolver(evento.datos);
+      } else {
+        const detalle = trabajo.errores.slice(-10).join('\n');
+        trabajo.rechazar(new Error(`${evento.datos.error}${detalle ? `\n\nSTDERR:\n${detalle}` : ''}`));
+      }
+      this.siguiente();
+    }
+  }
+
+  transcribir(rutaAudio, onProgress, onSegmento) {
+    return new Promise((resolver, rechazar) => {
+      this.contador += 1;
+      this.pendientes.push({
+        id: `${process.pid}-${this.contador}`,
+        rutaAudio,
+        onProgress,
+        onSegmento,
+        resolver,
+        rechazar,
+        errores: []
+      });
+      this.siguiente();
+    });
+  }
+
+  siguiente() {
+    if (this.actual || !this.pendientes.length) return;
+    this.iniciar();
+    this.actual = this.pendientes.shift();
+    this.actual.onProgress && this.actual.onProgress({ etapa: 'inicio', porcentaje: 0 });
+    const trabajo = { id: this.actual.id, audio_file: this.actual.rutaAudio, stream: Boolean(this.actual.onSegmento) };
+    this.proceso.stdin.write(JSON.stringify(trabajo) + '\n');
+  }
+
+  detener() {
+    if (!this.proceso) return;
+    const proceso = this.proceso;
+    this.proceso = null;
+    proceso.stdin.end();
+  }
+}
+
+module.exports = { TrabajadorTranscripcion };
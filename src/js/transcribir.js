@@ -1,5 +1,6 @@
 const fs = require('fs');
 const path = require('path');
+const readline = require('readline');
 const { spawn } = require('child_process');
 
 try { require('dotenv').config(); } 
@@ -10,6 +11,8 @@ const { combinarTodasLasTranscripciones, verificarSiHablantesEstanRegistrados }
 const { generarDocumentoWord } = require('./generador_documento');
 const { extraerInformacionDelAudio } = require('./metadatos');
 const { generarActaDesdeArchivos } = require('./generar_acta');
+const { TrabajadorTranscripcion } = require('./trabajador_transcripcion');
+const { interpretarEvento } = require('./eventos_python');
 const puedeUsarGemini = Boolean(process.env.GEMINI_API_KEY);
 
 try {
@@ -30,130 +33,171 @@ const directorioDelProyecto = path.resolve(__dirname, '../../'),
   carpetaAudioProcesado = path.join(directorioDelProyecto, 'audio_procesado'),
   archivoPlantillaWord = path.join(directorioDelProyecto, 'config/plantilla.docx'),
   archivoHablantes = path.join(directorioDelProyecto, 'config/hablantes.json'),
-  scriptPythonTranscribir = path.join(directorioDelProyecto, 'src/python/transcribir.py');
+  scriptPythonTranscribir = path.join(directorioDelProyecto, 'src/python/transcribir.py'),
+  scriptPythonPartes = path.join(directorioDelProyecto, 'src/python/transcribir_partes.py');
 
 const modoSilencioso = process.argv.includes('--quiet');
 if (modoSilencioso) process.argv = process.argv.filter(argumento => argumento !== '--quiet');
 const argumentosExtraPython = modoSilencioso ? ['--quiet'] : [];
 
-async function transcribirUnaParte(
-  archivoParteInfo,
+// Con TRANSCRIPTOR_PERSISTENTE=1 los trabajos van a un único transcribir.py --serve
+// que mantiene WhisperX, la alineación y la diarización cargados en memoria.
+const usarTrabajadorPersistente = ['1', 'true', 'si', 'sí'].includes(
+  String(process.env.TRANSCRIPTOR_PERSISTENTE || '').toLowerCase()
+);
+let trabajadorPersistente = null;
+
+// Con PROCESOS_TRANSCRIPCION > 1 las partes se transcriben a la vez con transcribir_partes.py
+const procesosParalelos = parseInt(process.env.PROCESOS_TRANSCRIPCION, 10) || 1;
+
+function obtenerTrabajadorPersistente(scriptPython, directorio, argumentosExtra) {
+  if (!trabajadorPersistente) {
+    trabajadorPersistente = new TrabajadorTranscripcion(scriptPython, directorio, argumentosExtra);
+  }
+  return trabajadorPersistente;
+}
+
+function detenerTrabajadorPersistente() {
+  if (trabajadorPersistente) trabajadorPersistente.detener();
+}
+
+function ejecutarTranscriptorPython(
+  argumentosScript,
   scriptPythonTranscribir,
   directorioDelProyecto,
   argumentosExtraPython = [],
-  onProgress
+  onProgress,
+  onSegmento
 ) {
-  console.log(`🔊 Transcribiendo ${archivoParteInfo.nombreArchivo}...`);
+  return new Promise((resolver, rechazar) => {
+    const comandoPython = process.env.PYTHON_CMD || 'python3';
+    const argumentosStream = onSegmento ? ['--stream'] : [];
+    const subproceso = spawn(
+      comandoPython,
+      ['-u', scriptPythonTranscribir, ...argumentosScript, ...argumentosStream, ...argumentosExtraPython],
+      {
+        cwd: directorioDelProyecto,
+        stdio: ['ignore', 'pipe', 'pipe'],
+        env: {
+          ...process.env,  // Heredar todas las variables de entorno de Node.js
+          HF_TOKEN: process.env.HF_TOKEN,  // Asegurar que HF_TOKEN se pasa
+          PYTHONIOENCODING: 'utf-8'
+        }
+      }
+    );
 
-  try {
-    await new Promise((resolver, rechazar) => {
-      const comandoPython = process.env.PYTHON_CMD || 'python3';
-      const subproceso = spawn(
-        comandoPython,
-        ['-u', scriptPythonTranscribir, archivoParteInfo.rutaCompleta, ...argumentosExtraPython],
-        {
-          cwd: directorioDelProyecto,
-          stdio: ['ignore', 'pipe', 'pipe'],
-          env: {
-            ...process.env,  // Heredar todas las variables de entorno de Node.js
-            HF_TOKEN: process.env.HF_TOKEN,  // Asegurar que HF_TOKEN se pasa
-            PYTHONIOENCODING: 'utf-8'
-          }
+    if (onProgress) onProgress({ etapa: 'inicio', porcentaje: 0 });
+
+    // Sólo guardo las últimas líneas para el mensaje de error
+    const ultimasLineas = { stdout: [], stderr: [] };
+    const recordar = (canal, linea) => {
+      ultimasLineas[canal].push(linea);
+      if (ultimasLineas[canal].length > 20) ultimasLineas[canal].shift();
+    };
+
+    readline.createInterface({ input: subproceso.stdout }).on('line', linea => {
+      const limpio = linea.trim();
+      if (!limpio) return;
+      const evento = interpretarEvento(limpio);
+      if (evento) {
+        if (evento.tipo === 'SEGMENTO') onSegmento && onSegmento(evento.datos);
+        if (evento.tipo === 'PROGRESO') onProgress && onProgress(evento.datos);
+        return;
+      }
+      recordar('stdout', linea);
+      process.stdout.write(linea + '\n');
+    });
+
+    readline.createInterface({ input: subproceso.stderr }).on('line', linea => {
+      const limpio = linea.trim();
+      if (!limpio) return;
+      recordar('stderr', linea);
+      process.stderr.write(linea + '\n');
+    });
+
+    subproceso.on('close', codigo => {
+      if (codigo === 0) {
+        onProgress && onProgress({ etapa: 'fin', porcentaje: 100 });
+        resolver();
+      } else {
+        // Capturar tanto stderr como las últimas líneas de stdout
+        const ultimasLineasStdout = ultimasLineas.stdout.slice(-10).join('\n');
+        const ultimasLineasStderr = ultimasLineas.stderr.join('\n').slice(-500);
+
+        let errorMsg = `${path.basename(scriptPythonTranscribir)} terminó con código ${codigo}`;
+
+        if (ultimasLineasStderr) {
+          errorMsg += `\n\nSTDERR:\n${ultimasLineasStderr}`;
         }
-      );
 
-      if (onProgress) onProgress('0');
-
-      let errorOutput = '';
-      let stdoutOutput = '';
-
-      subproceso.stdout.on('data', data => {
-        const texto = data.toString();
-        stdoutOutput += texto;
-        texto.split(/\r?\n/).forEach(linea => {
-          const limpio = linea.trim();
-          if (!limpio) return;
-          if (/^\d+$/.test(limpio)) {
-            onProgress && onProgress(limpio);
-          } else {
-            process.stdout.write(linea + '\n');
-          }
-        });
-      });
-
-      subproceso.stderr.on('data', data => {
-        const texto = data.toString();
-        errorOutput += texto;
-        texto.split(/\r?\n/).forEach(linea => {
-          const limpio = linea.trim();
-          if (!limpio) return;
-          if (/^\d+$/.test(limpio)) {
-            onProgress && onProgress(limpio);
-          } else {
-            process.stderr.write(linea + '\n');
-          }
-        });
-      });
-
-      subproceso.on('close', codigo => {
-        if (codigo === 0) {
-          onProgress && onProgress('100');
-          resolver();
-        } else {
-          // Capturar tanto stderr como las últimas líneas de stdout
-          const ultimasLineasStdout = stdoutOutput.trim().split('\n').slice(-10).join('\n');
-          const ultimasLineasStderr = errorOutput.trim().slice(-500);
-
-          let errorMsg = `transcribir.py terminó con código ${codigo}`;
-
-          if (ultimasLineasStderr) {
-            errorMsg += `\n\nSTDERR:\n${ultimasLineasStderr}`;
-          }
-
-          if (ultimasLineasStdout && !ultimasLineasStdout.match(/^\d+$/)) {
-            errorMsg += `\n\nÚltimas líneas de STDOUT:\n${ultimasLineasStdout}`;
-          }
-
-          rechazar(new Error(errorMsg));
+        if (ultimasLineasStdout) {
+          errorMsg += `\n\nÚltimas líneas de STDOUT:\n${ultimasLineasStdout}`;
         }
-      });
-      subproceso.on('error', rechazar);
+
+        rechazar(new Error(errorMsg));
+      }
     });
+    subproceso.on('error', rechazar);
+  });
+}
 
-    const nombreBase = path.basename(
-      archivoParteInfo.rutaCompleta,
-      path.extname(archivoParteInfo.rutaCompleta)
-    );
-    const archivoTranscripcionEsperado = path.join(
-      path.dirname(archivoParteInfo.rutaCompleta),
-      `${nombreBase}_transcripcion.txt`
-    );
+function leerTranscripcionDeParte(archivoParteInfo) {
+  const nombreBase = path.basename(
+    archivoParteInfo.rutaCompleta,
+    path.extname(archivoParteInfo.rutaCompleta)
+  );
+  const archivoTranscripcionEsperado = path.join(
+    path.dirname(archivoParteInfo.rutaCompleta),
+    `${nombreBase}_transcripcion.txt`
+  );
+
+  if (!fs.existsSync(archivoTranscripcionEsperado)) {
+    throw new Error(`No encontré la transcripción: ${archivoTranscripcionEsperado}`);
+  }
 
-    if (!fs.existsSync(archivoTranscripcionEsperado)) {
-      throw new Error(`No encontré la transcripción: ${archivoTranscripcionEsperado}`);
+  return {
+    parte: archivoParteInfo.numeroParte,
+    archivo: archivoTranscripcionEsperado,
+    contenido: fs.readFileSync(archivoTranscripcionEsperado, 'utf-8')
+  };
+}
+
+async function transcribirUnaParte(
+  archivoParteInfo,
+  scriptPythonTranscribir,
+  directorioDelProyecto,
+  argumentosExtraPython = [],
+  onProgress,
+  onSegmento
+) {
+  console.log(`🔊 Transcribiendo ${archivoParteInfo.nombreArchivo}...`);
+
+  try {
+    if (usarTrabajadorPersistente) {
+      await obtenerTrabajadorPersistente(scriptPythonTranscribir, directorioDelProyecto, argumentosExtraPython)
+        .transcribir(archivoParteInfo.rutaCompleta, onProgress, onSegmento);
+    } else {
+      await ejecutarTranscriptorPython(
+        [archivoParteInfo.rutaCompleta],
+        scriptPythonTranscribir,
+        directorioDelProyecto,
+        argumentosExtraPython,
+        onProgress,
+        onSegmento
+      );
     }
 
-    return {
-      parte: archivoParteInfo.numeroParte,
-      archivo: archivoTranscripcionEsperado,
-      contenido: fs.readFileSync(archivoTranscripcionEsperado, 'utf-8')
-    };
+    return leerTranscripcionDeParte(archivoParteInfo);
   } catch (error) {
     console.error(`❌ Error transcribiendo ${archivoParteInfo.nombreArchivo}:`, error.message);
     throw error;
   }
 }
 
-async function transcribirAudioCompletoPorPartes() {
-  const archivosParaProcesar = buscarArchivosDeAudioProcesado(carpetaAudioProcesado);
-  if (!archivosParaProcesar.length) {
-    console.error('❌ No encontré archivos de audio procesados.');
-    console.log('💡 Ejecuta primero el preprocesador de audio');
-    return;
+async function transcribirPartesEnSerie(archivosParaProcesar) {
+  if (!usarTrabajadorPersistente && archivosParaProcesar.length > 1) {
+    return transcribirPartesPorLotes(archivosParaProcesar);
   }
-  console.log(`📋 Encontré ${archivosParaProcesar.length} partes para transcribir:`);
-  archivosParaProcesar.forEach(parte => console.log(`   - Parte ${parte.numeroParte}: ${parte.nombreArchivo}`));
-
   const transcripciones = [];
   for (const parte of archivosParaProcesar) {
     try {
@@ -166,6 +210,71 @@ async function transcribirAudioCompletoPorPartes() {
       console.error(`❌ Problemas con la parte ${parte.numeroParte}:`, error.message);
     }
   }
+  return transcripciones;
+}
+
+// Un solo proceso de transcribir.py para todas las partes: los modelos se
+// cargan una vez y los lotes de la GPU se llenan con ventanas de varias partes.
+async function transcribirPartesPorLotes(archivosParaProcesar) {
+  console.log(`\n📦 Transcribiendo ${archivosParaProcesar.length} partes por lotes en un solo proceso`);
+  const inicio = Date.now();
+  try {
+    await ejecutarTranscriptorPython(
+      archivosParaProcesar.map(parte => parte.rutaCompleta),
+      scriptPythonTranscribir,
+      directorioDelProyecto,
+      argumentosExtraPython
+    );
+    console.log(`✅ Partes completadas en ${((Date.now() - inicio) / 1000).toFixed(1)}s`);
+  } catch (error) {
+    console.error('❌ Problemas con la transcripción por lotes:', error.message);
+  }
+  return leerTranscripcionesDePartes(archivosParaProcesar);
+}
+
+function leerTranscripcionesDePartes(archivosParaProcesar) {
+  const transcripciones = [];
+  for (const parte of archivosParaProcesar) {
+    try {
+      transcripciones.push(leerTranscripcionDeParte(parte));
+    } catch (error) {
+      console.error(`❌ Problemas con la parte ${parte.numeroParte}:`, error.message);
+    }
+  }
+  return transcripciones;
+}
+
+async function transcribirPartesEnParalelo(archivosParaProcesar) {
+  console.log(`\n🚀 Transcribiendo ${archivosParaProcesar.length} partes con hasta ${procesosParalelos} procesos en paralelo`);
+  const inicio = Date.now();
+  try {
+    await ejecutarTranscriptorPython(
+      [...archivosParaProcesar.map(parte => parte.rutaCompleta), '--procesos', String(procesosParalelos)],
+      scriptPythonPartes,
+      directorioDelProyecto,
+      argumentosExtraPython
+    );
+    console.log(`✅ Partes completadas en ${((Date.now() - inicio) / 1000).toFixed(1)}s`);
+  } catch (error) {
+    console.error('❌ Problemas con la transcripción en paralelo:', error.message);
+  }
+  return leerTranscripcionesDePartes(archivosParaProcesar);
+}
+
+async function transcribirAudioCompletoPorPartes() {
+  const archivosParaProcesar = buscarArchivosDeAudioProcesado(carpetaAudioProcesado);
+  if (!archivosParaProcesar.length) {
+    console.error('❌ No encontré archivos de audio procesados.');
+    console.log('💡 Ejecuta primero el preprocesador de audio');
+    return;
+  }
+  console.log(`📋 Encontré ${archivosParaProcesar.length} partes para transcribir:`);
+  archivosParaProcesar.forEach(parte => console.log(`   - Parte ${parte.numeroParte}: ${parte.nombreArchivo}`));
+
+  const enParalelo = procesosParalelos > 1 && archivosParaProcesar.length > 1;
+  const transcripciones = enParalelo
+    ? await transcribirPartesEnParalelo(archivosParaProcesar)
+    : await transcribirPartesEnSerie(archivosParaProcesar);
   if (!transcripciones.length) return console.error('❌ No pude transcribir ninguna parte.');
 
   const combinado = combinarTodasLasTranscripciones(transcripciones);
@@ -193,7 +302,7 @@ async function transcribirAudioCompletoPorPartes() {
   }
 }
 
-async function transcribirUnSoloArchivo(rutaCompletaDelAudio, onProgress) {
+async function transcribirUnSoloArchivo(rutaCompletaDelAudio, onProgress, onSegmento) {
   const carpetaDelArchivo = path.dirname(rutaCompletaDelAudio);
   const nombreDelArchivo = path.basename(rutaCompletaDelAudio, path.extname(rutaCompletaDelAudio));
   const archivoTranscripcionEsperado = path.join(carpetaDelArchivo, `${nombreDelArchivo}_transcripcion.txt`);
@@ -204,7 +313,8 @@ async function transcribirUnSoloArchivo(rutaCompletaDelAudio, onProgress) {
       scriptPythonTranscribir,
       directorioDelProyecto,
       argumentosExtraPython,
-      onProgress
+      onProgress,
+      onSegmento
     );
 
     let archivoEncontrado = archivoTranscripcionEsperado;
@@ -254,10 +364,14 @@ if (require.main === module) {
   if (process.argv.length > 2) {
     const archivoDeAudio = process.argv[2];
     console.log(`📁 Voy a procesar el archivo: ${archivoDeAudio}`);
-    transcribirUnSoloArchivo(archivoDeAudio).catch(error => { console.error('❌ Error:', error.message); process.exit(1); });
+    transcribirUnSoloArchivo(archivoDeAudio)
+      .catch(error => { console.error('❌ Error:', error.message); process.exitCode = 1; })
+      .finally(detenerTrabajadorPersistente);
   } else {
-    transcribirAudioCompletoPorPartes().catch(error => { console.error('❌ Error:', error.message); process.exit(1); });
+    transcribirAudioCompletoPorPartes()
+      .catch(error => { console.error('❌ Error:', error.message); process.exitCode = 1; })
+      .finally(detenerTrabajadorPersistente);
   }
 }
 
-module.exports = { transcribirAudioCompletoPorPartes, transcribirUnSoloArchivo };
\ No newline at end of file
+module.exports = { transcribirAudioCompletoPorPartes, transcribirUnSoloArchivo, detenerTrabajadorPersistente };
\ No newline at end of file
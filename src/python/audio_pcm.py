@@ -0,0 +1,113 @@
+"""Decodificación única del audio a un arreglo PCM compartido.
+
+WhisperX, el modelo de alineación y la diarización aceptan la forma de
+onda ya decodificada (16 kHz, mono, ``float32``) en lugar de la ruta del
+archivo. Decodificar una sola vez con ffmpeg y pasar el mismo arreglo a
+las tres etapas evita invocar ffmpeg tres veces por trabajo; torch y
+pyannote lo envuelven con ``torch.from_numpy``, sin copiarlo.
+
+Para sesiones de varias horas, :func:`decodificar_a_disco` deja el PCM en
+un archivo local y devuelve un ``np.memmap``: cada etapa lee sólo las
+ventanas que procesa y el kernel puede descartar las páginas ya leídas,
+de modo que la memoria residente no crece con la duración de la reunión.
+
+Este módulo no depende de torch ni de whisperx.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+FRECUENCIA_MUESTREO = 16000
+MUESTRAS_POR_BLOQUE = 1 << 22
+AUDIO_EN_DISCO_DEF = os.getenv("AUDIO_MMAP", "").lower() in ("1", "true", "si", "sí")
+
+
+def decodificar_audio(audio_file: str) -> np.ndarray:
+    """Decodifica ``audio_file`` a PCM de 16 kHz mono en ``float32``.
+
+    Produce los mismos valores que ``whisperx.load_audio``.
+
+    Raises
+    ------
+    RuntimeError
+        Si ffmpeg no está disponible o no pudo decodificar el archivo.
+    """
+
+    salida = _ejecutar_ffmpeg(audio_file, "-")
+    audio = np.frombuffer(salida, dtype=np.int16).astype(np.float32)
+    audio *= 1 / 32768.0
+    return audio
+
+
+def decodificar_a_disco(audio_file: str, directorio: Optional[str] = None) -> np.ndarray:
+    """Como :func:`decodificar_audio`, pero respaldado por un archivo en disco.
+
+    ffmpeg escribe el PCM de 16 bits en ``directorio`` (por defecto
+    ``DIRECTORIO_PCM`` o el temporal del sistema) y se convierte a
+    ``float32`` por bloques en otro archivo, que se mapea en memoria en
+    modo copia al escribir. Los valores son idénticos a los de
+    :func:`decodificar_audio`, así que la huella de la caché no cambia.
+
+    Los archivos se borran en cuanto están mapeados; en Linux el mapa sigue
+    siendo válido hasta que el arreglo se libera.
+    """
+
+    directorio = directorio or os.getenv("DIRECTORIO_PCM") or tempfile.gettempdir()
+    os.makedirs(directorio, exist_ok=True)
+    ruta_enteros = _ruta_temporal(directorio, ".s16")
+    ruta_flotantes = _ruta_temporal(directorio, ".f32")
+    try:
+        _ejecutar_ffmpeg(audio_file, ruta_enteros)
+        muestras = os.path.getsize(ruta_enteros) // 2
+        if not muestras:
+            return np.zeros(0, dtype=np.float32)
+
+        enteros = np.memmap(ruta_enteros, dtype=np.int16, mode="r", shape=(muestras,))
+        flotantes = np.memmap(ruta_flotantes, dtype=np.float32, mode="w+", shape=(muestras,))
+        for inicio in range(0, muestras, MUESTRAS_POR_BLOQUE):
+            bloque = flotantes[inicio:inicio + MUESTRAS_POR_BLOQUE]
+            np.multiply(enteros[inicio:inicio + MUESTRAS_POR_BLOQUE], 1 / 32768.0, out=bloque, dtype=np.float32)
+        flotantes.flush()
+        del enteros, flotantes
+        return np.memmap(ruta_flotantes, dtype=np.float32, mode="c", shape=(muestras,))
+    finally:
+        for ruta in (ruta_enteros, ruta_flotantes):
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+
+def _ruta_temporal(directorio: str, sufijo: str) -> str:
+    descriptor, ruta = tempfile.mkstemp(prefix="pcm_", suffix=sufijo, dir=directorio)
+    os.close(descriptor)
+    return ruta
+
+
+def _ejecutar_ffmpeg(audio_file: str, destino: str) -> bytes:
+    """Decodifica con ffmpeg a PCM de 16 bits en ``destino`` (``"-"`` = stdout)."""
+
+    comando = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-y", "-i", audio_file,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+        "-ar", str(FRECUENCIA_MUESTREO), destino,
+    ]
+    try:
+        return subprocess.run(comando, capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as exc:
+        detalle = (getattr(exc, "stderr", b"") or b"").decode(errors="replace")[-300:]
+        raise RuntimeError(f"No pude decodificar {audio_file}: {detalle or exc}") from exc
+
+
+__all__ = [
+    "AUDIO_EN_DISCO_DEF",
+    "FRECUENCIA_MUESTREO",
+    "decodificar_a_disco",
+    "decodificar_audio",
+]
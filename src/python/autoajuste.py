@@ -0,0 +1,218 @@
+"""Calibración del tamaño de lote, el ``compute_type`` y los hilos de CPU.
+
+``transcribir.py --autotune referencia.wav`` transcribe un fragmento corto
+de ``referencia.wav`` con cada combinación candidata y guarda en
+``PERFIL_HARDWARE`` (por defecto ``perfil_hardware.json``) la más rápida
+para este equipo:
+
+1. Con el lote base se prueba cada ``compute_type`` (y en CPU cada
+   cantidad de hilos) y se elige el que transcribe más rápido.
+2. Con ese modelo se prueban lotes cada vez más grandes, sobre un audio
+   con tantas ventanas de voz como el lote, hasta que la memoria se agota
+   o el lote deja de ser más rápido. Se queda el mayor lote que cabe y no
+   es más lento que el mejor.
+
+El archivo guarda un perfil por equipo (dispositivo, modelo de GPU o de CPU
+y memoria); las ejecuciones siguientes en el mismo equipo lo usan para lo
+que no se indique con argumentos o variables de entorno.
+
+Este módulo no depende de torch ni de whisperx: el modelo lo carga quien
+llama y torch sólo se consulta para describir la GPU.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import platform
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_pcm import FRECUENCIA_MUESTREO
+from utilidades_nombres import cargar_json, guardar_json
+
+ARCHIVO_PERFIL_DEF = os.getenv("PERFIL_HARDWARE", "perfil_hardware.json")
+SEGUNDOS_CALIBRACION = 30
+DURACION_VENTANA = 30
+LOTE_BASE = 8
+TIPOS_CANDIDATOS = {
+    "cuda": ("float16", "int8_float16", "int8"),
+    "cpu": ("int8", "int8_float32", "float32"),
+}
+LOTES_CANDIDATOS = {
+    "cuda": (4, 8, 16, 24, 32, 48, 64),
+    "cpu": (1, 2, 4, 8),
+}
+# Un lote más grande sólo se prefiere si no es más lento que esto respecto del mejor
+TOLERANCIA_VELOCIDAD = 0.97
+
+
+def describir_equipo(device: str) -> str:
+    """Identifica el equipo para no aplicar el perfil de otra máquina."""
+
+    if device == "cuda":
+        try:
+            import torch
+
+            propiedades = torch.cuda.get_device_properties(0)
+            return f"cuda|{propiedades.name}|{propiedades.total_memory // 2 ** 20}MiB"
+        except Exception:  # noqa: WPS440 - sin torch o sin GPU visible
+            return "cuda|desconocida"
+    procesador = platform.processor() or platform.machine()
+    return f"cpu|{procesador}|{os.cpu_count()}"
+
+
+def cargar_perfil(device: str, ruta: str = ARCHIVO_PERFIL_DEF) -> Optional[Dict[str, Any]]:
+    """Devuelve el perfil calibrado para este equipo, o ``None`` si no hay."""
+
+    perfiles = (cargar_json(ruta, {}) or {}).get("perfiles", {})
+    return perfiles.get(describir_equipo(device))
+
+
+def guardar_perfil(device: str, perfil: Dict[str, Any], ruta: str = ARCHIVO_PERFIL_DEF) -> bool:
+    """Guarda ``perfil`` como el de este equipo, sin tocar los de otros."""
+
+    datos = cargar_json(ruta, {}) or {}
+    datos.setdefault("perfiles", {})[describir_equipo(device)] = perfil
+    return guardar_json(ruta, datos)
+
+
+def hilos_candidatos(device: str) -> List[Optional[int]]:
+    """Cantidades de hilos de CPU a probar; en GPU se deja la de CTranslate2."""
+
+    if device != "cpu":
+        return [None]
+    nucleos = os.cpu_count() or 1
+    return sorted({nucleos, max(1, nucleos // 2), max(1, nucleos // 4)}, reverse=True)
+
+
+def _sin_memoria(exc: BaseException) -> bool:
+    return isinstance(exc, MemoryError) or "out of memory" in str(exc).lower()
+
+
+def _liberar() -> None:
+    gc.collect()
+    try:
+        import torch
+
+        torch.cuda.empty_cache()
+    except Exception:  # noqa: WPS440
+        pass
+
+
+def _medir(modelo: Any, audio: np.ndarray, batch_size: int, idioma: str) -> float:
+    """Devuelve los segundos de audio transcritos por segundo."""
+
+    inicio = time.perf_counter()
+    modelo.transcribe(audio, language=idioma, batch_size=batch_size)
+    return len(audio) / FRECUENCIA_MUESTREO / (time.perf_counter() - inicio)
+
+
+def _audio_con_ventanas(fragmento: np.ndarray, ventanas: int) -> np.ndarray:
+    """Repite ``fragmento`` hasta cubrir ``ventanas`` ventanas de voz completas."""
+
+    muestras = ventanas * DURACION_VENTANA * FRECUENCIA_MUESTREO
+    return np.resize(fragmento, muestras)
+
+
+def calibrar(
+    audio: np.ndarray,
+    device: str,
+    cargar_modelo: Callable[[str, Optional[int]], Any],
+    idioma: str,
+) -> Dict[str, Any]:
+    """Busca la combinación más rápida para ``device`` transcribiendo ``audio``.
+
+    ``cargar_modelo(compute_type, hilos)`` debe devolver un modelo de
+    WhisperX nuevo; los que fallan al cargar (``compute_type`` no
+    soportado) se saltan.
+
+    Returns
+    -------
+    dict
+        Perfil con ``batch_size``, ``compute_type``, ``hilos``, la
+        velocidad medida (segundos de audio por segundo) y todas las
+        mediciones.
+    """
+
+    fragmento = np.ascontiguousarray(audio[: SEGUNDOS_CALIBRACION * FRECUENCIA_MUESTREO])
+    if len(fragmento) < FRECUENCIA_MUESTREO * 5:
+        raise ValueError("El audio de referencia debe durar al menos 5 segundos")
+    calentamiento = fragmento[: FRECUENCIA_MUESTREO * 5]
+    mediciones: List[Dict[str, Any]] = []
+
+    mejor: Optional[Tuple[float, str, Optional[int]]] = None
+    for compute_type in TIPOS_CANDIDATOS.get(device, TIPOS_CANDIDATOS["cuda"]):
+        for hilos in hilos_candidatos(device):
+            etiqueta = f"{compute_type}" + (f", {hilos} hilos" if hilos else "")
+            try:
+                modelo = cargar_modelo(compute_type, hilos)
+                modelo.transcribe(calentamiento, language=idioma, batch_size=1)
+                velocidad = _medir(modelo, fragmento, LOTE_BASE, idioma)
+            except (RuntimeError, ValueError, MemoryError) as exc:
+                print(f"⚠️ {etiqueta}: no disponible ({exc})")
+                continue
+            finally:
+                modelo = None
+                _liberar()
+            print(f"⏱️ {etiqueta}: {velocidad:.1f}x tiempo real")
+            mediciones.append(
+                {"compute_type": compute_type, "hilos": hilos, "batch_size": LOTE_BASE, "velocidad": round(velocidad, 3)}
+            )
+            if mejor is None or velocidad > mejor[0]:
+                mejor = (velocidad, compute_type, hilos)
+    if mejor is None:
+        raise RuntimeError("Ninguna combinación de compute_type pudo cargar el modelo")
+    _velocidad, compute_type, hilos = mejor
+
+    print(f"📏 Buscando el lote más grande con {compute_type}...")
+    velocidades: Dict[int, float] = {}
+    modelo = cargar_modelo(compute_type, hilos)
+    try:
+        modelo.transcribe(calentamiento, language=idioma, batch_size=1)
+        for batch_size in LOTES_CANDIDATOS.get(device, LOTES_CANDIDATOS["cuda"]):
+            try:
+                velocidad = _medir(modelo, _audio_con_ventanas(fragmento, batch_size), batch_size, idioma)
+            except (RuntimeError, MemoryError) as exc:
+                if not _sin_memoria(exc):
+                    raise
+                print(f"💥 Lote {batch_size}: sin memoria")
+                break
+            finally:
+                _liberar()
+            print(f"⏱️ Lote {batch_size}: {velocidad:.1f}x tiempo real")
+            mediciones.append(
+                {"compute_type": compute_type, "hilos": hilos, "batch_size": batch_size, "velocidad": round(velocidad, 3)}
+            )
+            velocidades[batch_size] = velocidad
+            if velocidad < max(velocidades.values()) * TOLERANCIA_VELOCIDAD:
+                break
+    finally:
+        modelo = None
+        _liberar()
+    if not velocidades:
+        raise RuntimeError("Ni el lote más chico cupo en memoria")
+
+    mas_rapido = max(velocidades.values())
+    batch_size = max(lote for lote, velocidad in velocidades.items() if velocidad >= mas_rapido * TOLERANCIA_VELOCIDAD)
+    return {
+        "dispositivo": device,
+        "batch_size": batch_size,
+        "compute_type": compute_type,
+        "hilos": hilos,
+        "velocidad": round(velocidades[batch_size], 3),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "mediciones": mediciones,
+    }
+
+
+__all__ = [
+    "ARCHIVO_PERFIL_DEF",
+    "calibrar",
+    "cargar_perfil",
+    "describir_equipo",
+    "guardar_perfil",
+]
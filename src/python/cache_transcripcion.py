@@ -0,0 +1,198 @@
+"""Caché en disco de transcripciones, direccionado por contenido.
+
+La clave de cada entrada combina la huella del audio decodificado (el
+arreglo PCM de :mod:`audio_pcm`, de modo que el mismo audio en otro
+contenedor o con otro nombre coincide) con los parámetros que cambian el resultado: modelo,
+``compute_type``, idioma y la configuración de la diarización (modelo de
+pyannote y cantidad de hablantes). Cada entrada guarda los
+segmentos alineados y diarizados en el formato de
+:mod:`segmentos_guardados`.
+
+El tamaño total se limita con ``CACHE_TRANSCRIPCION_MB``; al superarlo se
+descartan las entradas usadas hace más tiempo (la fecha de modificación
+de cada archivo se renueva en cada acierto). Los aciertos y fallos se
+acumulan en ``estadisticas.db`` (SQLite) dentro del directorio de la caché:
+cada conteo se suma dentro de una transacción ``IMMEDIATE``, así que
+las partes en paralelo y los trabajos simultáneos de la cola no pierden
+conteos de los otros.
+
+Este módulo no depende de torch ni de whisperx.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from segmentos_guardados import cargar_segmentos, guardar_segmentos
+from utilidades_nombres import cargar_json
+
+DIRECTORIO_DEF = "cache_transcripcion"
+LIMITE_MB_DEF = 2048
+EXTENSION = ".npz"
+MUESTRAS_POR_BLOQUE = 1 << 22
+ARCHIVO_ESTADISTICAS = "estadisticas.db"
+# Estadísticas de versiones anteriores; se importan al crear la base
+ARCHIVO_ESTADISTICAS_JSON = "estadisticas.json"
+ESPERA_BLOQUEO_S = 30.0
+
+
+def huella_audio(audio: np.ndarray) -> str:
+    """Devuelve el SHA-256 de la forma de onda decodificada ``audio``.
+
+    Se recorre por bloques para que un ``np.memmap`` no se lea entero a la
+    vez.
+    """
+
+    huella = hashlib.sha256()
+    for inicio in range(0, len(audio), MUESTRAS_POR_BLOQUE):
+        huella.update(np.ascontiguousarray(audio[inicio:inicio + MUESTRAS_POR_BLOQUE]).data)
+    return huella.hexdigest()
+
+
+def clave_cache(huella: str, parametros: Dict[str, Any]) -> str:
+    """Combina la huella del audio y los parámetros del modelo en una clave."""
+
+    texto = json.dumps({"audio": huella, **parametros}, sort_keys=True)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class CacheTranscripciones:
+    """Entradas ``<clave>.npz`` en ``directorio`` con desalojo LRU por tamaño."""
+
+    def __init__(self, directorio: str = DIRECTORIO_DEF, limite_bytes: int = LIMITE_MB_DEF << 20) -> None:
+        self.directorio = directorio
+        self.limite_bytes = limite_bytes
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave + EXTENSION)
+
+    def obtener(self, clave: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """Devuelve ``(resultado, diarizado)`` guardado en ``clave`` o ``None``."""
+
+        ruta = self._ruta(clave)
+        try:
+            guardado = cargar_segmentos(ruta)
+            os.utime(ruta)
+        except (OSError, ValueError, KeyError):
+            self._contar(acierto=False)
+            return None
+        self._contar(acierto=True)
+        return guardado
+
+    def guardar(self, clave: str, resultado: Any, diarizado: bool) -> None:
+        """Guarda ``resultado`` en ``clave`` y desaloja lo que sobre."""
+
+        os.makedirs(self.directorio, exist_ok=True)
+        guardar_segmentos(resultado, diarizado, self._ruta(clave))
+        self.desalojar()
+
+    def desalojar(self) -> int:
+        """Borra las entradas menos usadas hasta respetar el límite.
+
+        Returns
+        -------
+        int
+            Cantidad de entradas borradas.
+        """
+
+        entradas = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith(EXTENSION) and entrada.is_file():
+                estado = entrada.stat()
+                entradas.append((estado.st_mtime, estado.st_size, entrada.path))
+        total = sum(tamano for _, tamano, _ in entradas)
+        borradas = 0
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.limite_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+            total -= tamano
+            borradas += 1
+        if borradas:
+            print(f"🧹 Caché: {borradas} entradas antiguas eliminadas")
+        return borradas
+
+    def _contar(self, acierto: bool) -> None:
+        if acierto:
+            self.aciertos += 1
+        else:
+            self.fallos += 1
+        campo = "aciertos" if acierto else "fallos"
+        try:
+            estadisticas = self._incrementar(campo)
+        except (OSError, sqlite3.Error) as exc:
+            print(f"⚠️ No pude actualizar las estadísticas de la caché: {exc}")
+            return
+        print(
+            f"🗄️ Caché {'acertada' if acierto else 'sin coincidencia'} "
+            f"({estadisticas.get('aciertos', 0)} aciertos, {estadisticas.get('fallos', 0)} fallos)"
+        )
+
+    def _incrementar(self, campo: str) -> Dict[str, int]:
+        """Suma uno a ``campo`` y devuelve los contadores, en una transacción."""
+
+        os.makedirs(self.directorio, exist_ok=True)
+        conexion = sqlite3.connect(
+            os.path.join(self.directorio, ARCHIVO_ESTADISTICAS),
+            timeout=ESPERA_BLOQUEO_S,
+            isolation_level=None,
+        )
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                nueva = not conexion.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'contadores'"
+                ).fetchone()
+                if nueva:
+                    conexion.execute(
+                        "CREATE TABLE contadores (campo TEXT PRIMARY KEY, valor INTEGER NOT NULL)"
+                    )
+                    anteriores = cargar_json(
+                        os.path.join(self.directorio, ARCHIVO_ESTADISTICAS_JSON), {}
+                    ) or {}
+                    conexion.executemany(
+                        "INSERT INTO contadores VALUES (?, ?)",
+                        [(nombre, int(anteriores.get(nombre, 0))) for nombre in ("aciertos", "fallos")],
+                    )
+                conexion.execute(
+                    "INSERT INTO contadores VALUES (?, 1) "
+                    "ON CONFLICT (campo) DO UPDATE SET valor = valor + 1",
+                    (campo,),
+                )
+                estadisticas = dict(conexion.execute("SELECT campo, valor FROM contadores"))
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+            conexion.execute("COMMIT")
+        finally:
+            conexion.close()
+        return estadisticas
+
+
+def cache_configurada() -> Optional[CacheTranscripciones]:
+    """Crea la caché según el entorno; ``CACHE_TRANSCRIPCION_MB=0`` la desactiva."""
+
+    limite_mb = int(os.getenv("CACHE_TRANSCRIPCION_MB", str(LIMITE_MB_DEF)))
+    if limite_mb <= 0:
+        return None
+    return CacheTranscripciones(os.getenv("CACHE_TRANSCRIPCION", DIRECTORIO_DEF), limite_mb << 20)
+
+
+__all__ = [
+    "CacheTranscripciones",
+    "cache_configurada",
+    "clave_cache",
+    "huella_audio",
+]
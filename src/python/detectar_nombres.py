@@ -3,34 +3,71 @@
 Este módulo analiza un archivo de transcripción y busca nombres propios
 cerca de cada marca "INTERVIENE HABLANTE X:". Si spaCy está disponible
 se utiliza su modelo en español, de lo contrario se aplica una heurística
-básica con expresiones regulares.
+básica con expresiones regulares. Las sugerencias se guardan en el
+registro de hablantes (:mod:`registro_hablantes`).
+
+Primero se juntan los fragmentos de todas las intervenciones y después se
+pasan por ``nlp.pipe`` en lotes de ``LOTE_SPACY`` (con ``PROCESOS_SPACY``
+procesos), con el modelo cargado sólo con el reconocedor de entidades y
+recién cuando hace falta. Los nombres de cada fragmento se guardan en
+``CACHE_NOMBRES`` según el hash de su contenido, así que los fragmentos
+repetidos, dentro de una transcripción o entre corridas, no se vuelven a
+analizar.
+
+Además se mantiene en el registro un índice de las menciones de todas las
+transcripciones analizadas: ``indexar_transcripciones`` sólo analiza las
+nuevas o modificadas (según el hash de su contenido) y las sugerencias se
+eligen con la evidencia acumulada de todas las reuniones.
+
+Uso:
+  python src/python/detectar_nombres.py transcripciones/ uploads/
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import os
 import re
-from typing import Dict, List
-
-try:
-    import spacy
-    try:
-        _nlp = spacy.load("es_core_news_sm")
-    except Exception:
-        _nlp = None
-except ImportError:  # pragma: no cover - spaCy opcional
-    _nlp = None
-
-
-def _extraer_nombres_fragmento(texto: str) -> List[str]:
-    """Devuelve una lista de nombres detectados en el fragmento."""
-    nombres: List[str] = []
-    if _nlp:
-        doc = _nlp(texto)
-        nombres = [ent.text for ent in doc.ents if ent.label_ == "PER"]
-    else:
-        patron = re.compile(r"\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+(?:\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+)+")
-        nombres = patron.findall(texto)
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from registro_hablantes import RegistroHablantes
+from utilidades_nombres import cargar_json, guardar_json
+
+MODELO_SPACY = os.getenv("MODELO_SPACY", "es_core_news_sm")
+LOTE_SPACY = int(os.getenv("LOTE_SPACY", "256"))
+PROCESOS_SPACY = int(os.getenv("PROCESOS_SPACY", "1"))
+ARCHIVO_CACHE_DEF = os.getenv("CACHE_NOMBRES", "cache_nombres.json")
+MAXIMO_CACHE = 50_000
+VENTANA_PALABRAS_DEF = 40
+# Al indexar un directorio: las transcripciones por audio, no las combinadas (repetirían menciones)
+PATRON_TRANSCRIPCIONES = "*_transcripcion.txt"
+# Sólo se usan las entidades: el resto del pipeline no se ejecuta
+COMPONENTES_SIN_USO = ("tagger", "morphologizer", "parser", "attribute_ruler", "lemmatizer", "senter")
+
+_PATRON_NOMBRE = re.compile(r"\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+(?:\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+)+")
+
+_nlp = None
+_nlp_cargado = False
+
+
+def _cargar_nlp():
+    """Carga el modelo de spaCy la primera vez (``None`` si no está)."""
+
+    global _nlp, _nlp_cargado  # noqa: WPS420
+    if not _nlp_cargado:
+        _nlp_cargado = True
+        try:
+            import spacy
+
+            _nlp = spacy.load(MODELO_SPACY, disable=list(COMPONENTES_SIN_USO))
+        except Exception:  # pragma: no cover - spaCy o el modelo son opcionales
+            _nlp = None
+    return _nlp
+
+
+def _sin_duplicados(nombres: Sequence[str]) -> List[str]:
     # Elimino duplicados manteniendo el orden
     vistos = set()
     resultado = []
@@ -41,7 +78,59 @@ def _extraer_nombres_fragmento(texto: str) -> List[str]:
     return resultado
 
 
-def detectar_nombres(archivo: str, ventana_palabras: int = 40) -> Dict[str, str]:
+def _clave_fragmento(motor: str, fragmento: str) -> str:
+    return hashlib.sha1(f"{motor}\0{fragmento}".encode("utf-8")).hexdigest()
+
+
+def extraer_nombres(fragmentos: Sequence[str], archivo_cache: Optional[str] = ARCHIVO_CACHE_DEF) -> List[List[str]]:
+    """Devuelve los nombres detectados en cada uno de ``fragmentos``.
+
+    Los fragmentos que no están en la caché se analizan juntos, una sola
+    vez cada texto distinto. Con ``archivo_cache=None`` no se usa caché
+    en disco.
+    """
+
+    nlp = _cargar_nlp()
+    motor = f"spacy:{MODELO_SPACY}" if nlp else "regex"
+    claves = [_clave_fragmento(motor, fragmento) for fragmento in fragmentos]
+    cache: Dict[str, List[str]] = (cargar_json(archivo_cache, {}) or {}) if archivo_cache else {}
+
+    faltantes = {clave: fragmento for clave, fragmento in zip(claves, fragmentos) if clave not in cache}
+    if faltantes:
+        if nlp:
+            documentos = nlp.pipe(faltantes.values(), batch_size=LOTE_SPACY, n_process=PROCESOS_SPACY)
+            nuevos = [[ent.text for ent in doc.ents if ent.label_ == "PER"] for doc in documentos]
+        else:
+            nuevos = [_PATRON_NOMBRE.findall(fragmento) for fragmento in faltantes.values()]
+        cache.update(zip(faltantes, (_sin_duplicados(nombres) for nombres in nuevos)))
+        if archivo_cache:
+            # Se conservan las entradas agregadas más recientemente
+            guardar_json(archivo_cache, dict(list(cache.items())[-MAXIMO_CACHE:]))
+
+    return [cache[clave] for clave in claves]
+
+
+def _fragmentos(texto: str, ventana_palabras: int) -> List[Tuple[str, int, str]]:
+    """Devuelve ``(hablante, posición, fragmento)`` de cada intervención con hablante conocido."""
+
+    patron = re.compile(r"INTERVIENE HABLANTE ([^:]+):", re.IGNORECASE)
+    coincidencias = list(patron.finditer(texto))
+    fragmentos = []
+
+    for i, match in enumerate(coincidencias):
+        identificador = match.group(1).strip()
+        if not identificador or "DESCONOCIDO" in identificador.upper():
+            continue
+
+        inicio = match.end()
+        fin = coincidencias[i + 1].start() if i + 1 < len(coincidencias) else len(texto)
+        # Tomo sólo las primeras palabras para evitar textos muy largos
+        palabras = texto[inicio:fin].split(None, ventana_palabras)
+        fragmentos.append((f"HABLANTE_{identificador}", match.start(), " ".join(palabras[:ventana_palabras])))
+    return fragmentos
+
+
+def detectar_nombres(archivo: str, ventana_palabras: int = VENTANA_PALABRAS_DEF) -> Dict[str, str]:
     """Analiza un archivo de transcripción y sugiere nombres.
 
     Parameters
@@ -62,28 +151,145 @@ def detectar_nombres(archivo: str, ventana_palabras: int = 40) -> Dict[str, str]
     with open(archivo, "r", encoding="utf-8") as f:
         texto = f.read()
 
-    patron = re.compile(r"INTERVIENE HABLANTE ([^:]+):", re.IGNORECASE)
-    coincidencias = list(patron.finditer(texto))
+    fragmentos = _fragmentos(texto, ventana_palabras)
     sugerencias: Dict[str, str] = {}
+    for (clave, _posicion, _fragmento), nombres in zip(
+        fragmentos, extraer_nombres([fragmento for _clave, _posicion, fragmento in fragmentos])
+    ):
+        if nombres and clave not in sugerencias:
+            sugerencias[clave] = nombres[0]
 
-    for i, match in enumerate(coincidencias):
-        identificador = match.group(1).strip()
-        if not identificador or "DESCONOCIDO" in identificador.upper():
+    return sugerencias
+
+
+def expandir_transcripciones(rutas: Iterable[str], patron: str = PATRON_TRANSCRIPCIONES) -> List[str]:
+    """Reemplaza cada directorio de ``rutas`` por sus transcripciones (recursivamente)."""
+
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(str(archivo) for archivo in sorted(Path(ruta).rglob(patron)))
+        else:
+            archivos.append(ruta)
+    return archivos
+
+
+def indexar_transcripciones(
+    rutas: Iterable[str],
+    registro: RegistroHablantes,
+    ventana_palabras: int = VENTANA_PALABRAS_DEF,
+) -> int:
+    """Agrega al índice de menciones las transcripciones nuevas o modificadas.
+
+    Las que ya están indexadas con el mismo contenido no se leen dos
+    veces; los fragmentos de todas las demás se analizan juntos.
+
+    Returns
+    -------
+    int
+        Cantidad de transcripciones analizadas.
+    """
+
+    textos: Dict[str, Tuple[str, str]] = {}
+    for ruta in rutas:
+        try:
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+        except OSError as exc:
+            print(f"⚠️ No pude leer {ruta}: {exc}")
             continue
-        clave = f"HABLANTE_{identificador}"
+        huella = hashlib.sha256(contenido).hexdigest()
+        textos.setdefault(huella, (os.path.abspath(ruta), contenido.decode("utf-8", errors="replace")))
 
-        inicio = match.end()
-        fin = coincidencias[i + 1].start() if i + 1 < len(coincidencias) else len(texto)
-        fragmento = texto[inicio:fin]
-        # Tomo sólo las primeras palabras para evitar textos muy largos
-        palabras = fragmento.split()
-        fragmento = " ".join(palabras[:ventana_palabras])
+    indexadas = registro.transcripciones_indexadas(textos)
+    nuevas = {huella: datos for huella, datos in textos.items() if huella not in indexadas}
+    if not nuevas:
+        return 0
 
-        nombres = _extraer_nombres_fragmento(fragmento)
-        if nombres and clave not in sugerencias:
-            sugerencias[clave] = nombres[0]
+    fragmentos = {huella: _fragmentos(texto, ventana_palabras) for huella, (_ruta, texto) in nuevas.items()}
+    nombres = iter(extraer_nombres([fragmento for lista in fragmentos.values() for _clave, _posicion, fragmento in lista]))
+    menciones = {}
+    for huella, lista in fragmentos.items():
+        por_hablante: Dict[str, Dict[str, List[int]]] = {}
+        for (clave, posicion, _fragmento), encontrados in zip(lista, nombres):
+            for nombre in encontrados:
+                por_hablante.setdefault(clave, {}).setdefault(nombre, []).append(posicion)
+        menciones[huella] = (nuevas[huella][0], por_hablante)
+    registro.guardar_menciones(menciones)
+    return len(nuevas)
+
+
+def actualizar_sugerencias(registro: RegistroHablantes, rutas: Iterable[str] = ()) -> Dict[str, str]:
+    """Indexa ``rutas`` y vuelve a elegir la sugerencia de cada hablante.
+
+    Se sugiere el nombre con más evidencia en todas las reuniones
+    indexadas, salvo los ya confirmados para otro hablante.
 
+    Returns
+    -------
+    Dict[str, str]
+        Las sugerencias guardadas.
+    """
+
+    indexar_transcripciones(rutas, registro)
+    confirmados = registro.nombres()
+    sugerencias = {}
+    for hablante, candidatos in registro.evidencia_nombres().items():
+        ajenos = {nombre for otro, nombre in confirmados.items() if otro != hablante}
+        elegido = next((nombre for nombre, _reuniones, _total in candidatos if nombre not in ajenos), None)
+        if elegido:
+            sugerencias[hablante] = elegido
+    if sugerencias:
+        registro.guardar_sugerencias(sugerencias)
     return sugerencias
 
 
-__all__ = ["detectar_nombres"]
\ No newline at end of file
+def registrar_sugerencias(archivo: str, registro: RegistroHablantes) -> Dict[str, str]:
+    """Indexa ``archivo`` y guarda en ``registro`` las sugerencias actualizadas.
+
+    Todas las sugerencias se escriben en una sola transacción.
+
+    Returns
+    -------
+    Dict[str, str]
+        Las sugerencias de todos los hablantes con evidencia.
+    """
+    if not os.path.isfile(archivo):
+        raise FileNotFoundError(archivo)
+    return actualizar_sugerencias(registro, [archivo])
+
+
+def main() -> None:
+    """Indexa las transcripciones indicadas y muestra las sugerencias."""
+
+    parser = argparse.ArgumentParser(description="Índice de nombres mencionados en las transcripciones")
+    parser.add_argument("rutas", nargs="*", help="Transcripciones o directorios a indexar")
+    parser.add_argument(
+        "--patron",
+        default=PATRON_TRANSCRIPCIONES,
+        help="Archivos a indexar dentro de los directorios",
+    )
+    args = parser.parse_args()
+
+    with RegistroHablantes() as registro:
+        archivos = expandir_transcripciones(args.rutas, args.patron)
+        analizadas = indexar_transcripciones(archivos, registro)
+        print(f"📚 {analizadas} de {len(archivos)} transcripciones analizadas (el resto ya estaba indexado)")
+        sugerencias = actualizar_sugerencias(registro)
+        evidencia = registro.evidencia_nombres()
+    for hablante, nombre in sugerencias.items():
+        _nombre, reuniones, total = next(c for c in evidencia[hablante] if c[0] == nombre)
+        print(f"💡 {hablante}: {nombre} ({total} menciones en {reuniones} transcripciones)")
+
+
+__all__ = [
+    "actualizar_sugerencias",
+    "detectar_nombres",
+    "extraer_nombres",
+    "indexar_transcripciones",
+    "registrar_sugerencias",
+]
+
+
+if __name__ == "__main__":
+    main()
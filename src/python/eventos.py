@@ -0,0 +1,85 @@
+"""Canal de eventos estructurados entre los scripts de Python y Node.
+
+Cada evento se escribe en una sola línea con el formato ``@@TIPO {json}``
+directamente sobre ``sys.stdout``. Así Node puede distinguirlos de los
+mensajes normales del registro y no se pierden cuando el modo silencioso
+reemplaza ``print``.
+
+El avance de un trabajo se publica con eventos ``@@PROGRESO`` que incluyen
+la etapa, el porcentaje, los segundos transcurridos, los segundos de audio
+ya procesados y el factor de tiempo real (segundos de cómputo por segundo
+de audio; menor que 1 significa más rápido que el tiempo real).
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Any, Dict, Optional
+
+PREFIJO_EVENTO = "@@"
+
+# Estado del trabajo en curso
+_progreso: Dict[str, Any] = {
+    "porcentaje": 0,
+    "inicio": time.time(),
+    "duracion_audio": None,
+    "audio_procesado": 0.0,
+}
+
+
+def emitir_evento(tipo: str, datos: Optional[Dict[str, Any]] = None) -> None:
+    """Escribe un evento ``tipo`` con ``datos`` serializados a JSON."""
+
+    linea = f"{PREFIJO_EVENTO}{tipo} {json.dumps(datos or {}, ensure_ascii=False)}\n"
+    sys.stdout.write(linea)
+    sys.stdout.flush()
+
+
+def iniciar_progreso(porcentaje: int = 0, duracion_audio: Optional[float] = None) -> None:
+    """Reinicia el avance para un trabajo nuevo."""
+
+    _progreso.update(
+        porcentaje=porcentaje,
+        inicio=time.time(),
+        duracion_audio=duracion_audio,
+        audio_procesado=0.0,
+    )
+
+
+def fijar_duracion_audio(duracion_audio: Optional[float]) -> None:
+    """Registra la duración total del audio del trabajo en curso."""
+
+    _progreso["duracion_audio"] = duracion_audio
+
+
+def avanzar(paso: int, etapa: str, audio_procesado: Optional[float] = None) -> None:
+    """Incrementa el avance y lo publica como evento ``@@PROGRESO``."""
+
+    _progreso["porcentaje"] = min(100, _progreso["porcentaje"] + paso)
+    if audio_procesado is not None:
+        _progreso["audio_procesado"] = float(audio_procesado)
+
+    transcurrido = time.time() - _progreso["inicio"]
+    procesado = _progreso["audio_procesado"]
+    emitir_evento(
+        "PROGRESO",
+        {
+            "etapa": etapa,
+            "porcentaje": _progreso["porcentaje"],
+            "transcurrido": round(transcurrido, 2),
+            "audio_procesado": round(procesado, 2),
+            "duracion_audio": _progreso["duracion_audio"],
+            "factor_tiempo_real": round(transcurrido / procesado, 3) if procesado else None,
+        },
+    )
+
+
+__all__ = [
+    "PREFIJO_EVENTO",
+    "avanzar",
+    "emitir_evento",
+    "fijar_duracion_audio",
+    "iniciar_progreso",
+]
@@ -0,0 +1,538 @@
+"""Formateo de la transcripción: hablantes globales, limpieza y texto final.
+
+Este módulo no depende de torch ni de whisperx para poder usarse (y
+medirse) sin cargar los modelos.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from eventos import avanzar
+from indice_hablantes import HUELLAS_POR_HABLANTE, UMBRAL_DEF, IndiceHablantes
+from normalizacion import normalizador
+from registro_hablantes import RegistroHablantes
+from suavizado_hablantes import suavizar_hablantes
+
+ENCABEZADO = "INTERVIENE HABLANTE"
+PATRON_INTERVENCION = re.compile(r"(INTERVIENE HABLANTE \w+:)")
+
+
+class MapeoHablantes:
+    """Traduce los hablantes de la diarización a ``HABLANTE_N`` y a nombres.
+
+    Con ``registro=None`` el mapeo sólo vive en memoria. Los hablantes
+    reconocidos por voz se guardan con la clave
+    ``<grabacion>:<hablante local>``, que tiene prioridad sobre la etiqueta
+    local sola. ``grabacion`` es la huella del audio decodificado (ver
+    :func:`_clave_de_grabacion`).
+    """
+
+    def __init__(
+        self,
+        hablantes_globales: Optional[Dict[str, str]] = None,
+        mapeo_nombres: Optional[Dict[str, str]] = None,
+        registro: Optional[RegistroHablantes] = None,
+    ) -> None:
+        self.hablantes_globales = hablantes_globales or {}
+        self.mapeo_nombres = mapeo_nombres or {}
+        self.registro = registro
+        self.indice_voces = IndiceHablantes()
+        self.grabacion: Optional[str] = None
+        self.contador_global = (
+            max(
+                [
+                    int(h.split("_")[1])
+                    for h in self.hablantes_globales.values()
+                    if h.startswith("HABLANTE_")
+                ],
+                default=0,
+            )
+            + 1
+        )
+
+    @classmethod
+    def desde_registro(cls, registro: Optional[RegistroHablantes] = None) -> "MapeoHablantes":
+        """Usa el registro de hablantes en SQLite (por defecto, ``REGISTRO_HABLANTES``).
+
+        El mapeo se consulta en el registro a medida que aparecen hablantes,
+        así que refleja también lo que registren otras transcripciones.
+        """
+
+        registro = registro or RegistroHablantes()
+        return cls({}, registro.nombres(), registro)
+
+    def _clave_grabacion(self, speaker_local: str) -> str:
+        return f"{self.grabacion}:{speaker_local}"
+
+    def registrar(
+        self, claves: Iterable[str], conocidos: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """Asigna ``HABLANTE_N`` a ``claves`` de una vez.
+
+        Las claves ya registradas conservan su número, las de ``conocidos``
+        reciben el indicado y el resto, números nuevos.
+        """
+
+        if self.registro is not None:
+            asignados, nuevos = self.registro.asignar(claves, conocidos)
+        else:
+            conocidos = conocidos or {}
+            asignados, nuevos = {}, []
+            for clave in dict.fromkeys(chain(claves, conocidos)):
+                if clave in self.hablantes_globales:
+                    asignados[clave] = self.hablantes_globales[clave]
+                elif clave in conocidos:
+                    asignados[clave] = conocidos[clave]
+                else:
+                    asignados[clave] = f"HABLANTE_{self.contador_global}"
+                    self.contador_global += 1
+                    nuevos.append(clave)
+        self.hablantes_globales.update(asignados)
+        for clave in nuevos:
+            print(f"🆕 Nuevo hablante detectado: {clave} → {asignados[clave]}")
+        return asignados
+
+    def preparar(self, locales: Iterable[str]) -> None:
+        """Resuelve el ``HABLANTE_N`` de todos ``locales`` con una consulta y una transacción."""
+
+        locales = [
+            local for local in dict.fromkeys(locales) if local and local != "DESCONOCIDO"
+        ]
+        if self.grabacion and self.registro is not None:
+            self.hablantes_globales.update(
+                self.registro.buscar(self._clave_grabacion(local) for local in locales)
+            )
+        self.registrar(
+            local
+            for local in locales
+            if not (self.grabacion and self._clave_grabacion(local) in self.hablantes_globales)
+            and local not in self.hablantes_globales
+        )
+
+    def asignar_hablante_global(self, speaker_local: str) -> str:
+        if not speaker_local or speaker_local == "DESCONOCIDO":
+            return "DESCONOCIDO"
+        if self.grabacion and self._clave_grabacion(speaker_local) in self.hablantes_globales:
+            return self.hablantes_globales[self._clave_grabacion(speaker_local)]
+        if speaker_local in self.hablantes_globales:
+            return self.hablantes_globales[speaker_local]
+        return self.registrar([speaker_local])[speaker_local]
+
+    def identificar_por_voz(
+        self,
+        huellas: Dict[str, List[float]],
+        umbral: float = UMBRAL_DEF,
+    ) -> None:
+        """Asigna ``HABLANTE_N`` a los hablantes de ``grabacion`` por su voz.
+
+        Cada hablante local se compara con las voces guardadas en el
+        registro: si se parece lo suficiente a un hablante ya conocido,
+        hereda su ``HABLANTE_N`` (y su nombre); si no, recibe uno nuevo. Las
+        huellas se agregan al registro para las próximas grabaciones. Una
+        grabación ya identificada no se vuelve a procesar, así que rearmarla
+        con ``--render-only`` no duplica huellas. Sin registro, las voces
+        sólo se recuerdan en memoria.
+        """
+
+        if not self.grabacion:
+            return
+        if self.registro is not None:
+            self.hablantes_globales.update(
+                self.registro.buscar(self._clave_grabacion(local) for local in huellas)
+            )
+        pendientes = {
+            local: huella
+            for local, huella in huellas.items()
+            if self._clave_grabacion(local) not in self.hablantes_globales
+        }
+        if not pendientes:
+            return
+
+        if self.registro is not None:
+            indice = IndiceHablantes.desde_registro(self.registro)
+        else:
+            indice = self.indice_voces
+        try:
+            reconocidos = indice.identificar(pendientes, umbral)
+        except ValueError as exc:
+            print(f"⚠️ No pude comparar las voces: {exc}")
+            return
+        locales = sorted(pendientes)
+        asignados = self.registrar(
+            [self._clave_grabacion(local) for local in locales if reconocidos[local] is None],
+            {
+                self._clave_grabacion(local): reconocidos[local]
+                for local in locales
+                if reconocidos[local] is not None
+            },
+        )
+        nuevas = []
+        for local in locales:
+            hablante = asignados[self._clave_grabacion(local)]
+            if reconocidos[local] is not None:
+                print(f"🔊 {local} reconocido por su voz: {self.obtener_nombre_final(hablante)}")
+            nuevas.append((hablante, indice.agregar(hablante, pendientes[local])))
+        if self.registro is not None:
+            self.registro.guardar_voces(nuevas, HUELLAS_POR_HABLANTE)
+
+    def obtener_nombre_final(self, hablante_global: str) -> str:
+        if not hablante_global or hablante_global == "DESCONOCIDO":
+            return "HABLANTE DESCONOCIDO"
+        if hablante_global in self.mapeo_nombres:
+            return self.mapeo_nombres[hablante_global]
+        try:
+            if "_" in hablante_global:
+                numero = hablante_global.split("_")[1]
+                return f"HABLANTE {numero}"
+            return f"HABLANTE {hablante_global}"
+        except (IndexError, ValueError):
+            return f"HABLANTE {hablante_global}"
+
+
+def limpiar_texto_repetitivo(texto: str) -> str:
+    """Reduce muletillas repetidas ("no no no no", "eh eh eh") y espacios."""
+
+    return normalizador.normalizar(texto)
+
+
+def limpiar_en_flujo(piezas: Iterable[str]) -> Iterator[str]:
+    """Aplica :func:`limpiar_texto_repetitivo` a un texto que llega por piezas.
+
+    Cada pieza debe empezar sin espacios y terminar en espacio. Las piezas
+    se limpian juntas mientras una repetición o un encabezado pueda cruzar
+    el corte entre ellas, así que el resultado coincide con limpiar el
+    texto completo (salvo el recorte final de espacios).
+    """
+
+    pendiente: List[str] = []
+    for pieza in piezas:
+        if pendiente and not normalizador.puede_continuar(pieza):
+            limpio = normalizador.normalizar("".join(pendiente))
+            if not limpio.endswith(("INTERVIENE", "INTERVIENE HABLANTE")):
+                yield limpio + " "
+                pendiente = []
+        pendiente.append(pieza)
+    if pendiente:
+        yield normalizador.normalizar("".join(pendiente)) + " "
+
+
+def _recortar(piezas: Iterable[str]) -> Iterator[str]:
+    """Equivale a ``"".join(piezas).strip()`` sin juntar las piezas."""
+
+    pendiente = None
+    for pieza in piezas:
+        if pendiente is None:
+            pieza = pieza.lstrip()
+            if not pieza:
+                continue
+            pendiente = ""
+        cuerpo = pieza.rstrip()
+        if cuerpo:
+            yield pendiente + cuerpo
+            pendiente = pieza[len(cuerpo):]
+        else:
+            pendiente += pieza
+
+
+def _normalizar_espacios(piezas: Iterable[str]) -> Iterator[str]:
+    """Equivale a ``re.sub(r"\\s+", " ", "".join(piezas)).strip()`` por piezas."""
+
+    hay_texto = False
+    espacio = False
+    for pieza in piezas:
+        palabras = pieza.split()
+        if not palabras:
+            espacio = espacio or bool(pieza)
+            continue
+        salida = " ".join(palabras)
+        if hay_texto and (espacio or pieza[0].isspace()):
+            salida = " " + salida
+        yield salida
+        hay_texto = True
+        espacio = pieza[-1].isspace()
+
+
+def _asomar(piezas: Iterable[str], largo: int) -> Tuple[str, Iterator[str]]:
+    """Lee al menos ``largo`` caracteres y devuelve ese prefijo y el texto completo."""
+
+    piezas = iter(piezas)
+    prefijo = ""
+    for pieza in piezas:
+        prefijo += pieza
+        if len(prefijo) >= largo:
+            break
+    return prefijo, chain([prefijo], piezas)
+
+
+def _dividir_partes(piezas: Iterable[str]) -> Iterator[Iterator[str]]:
+    """Equivale a ``PATRON_INTERVENCION.split(texto)`` con cada parte como iterador."""
+
+    def eventos():
+        for pieza in piezas:
+            for indice, parte in enumerate(PATRON_INTERVENCION.split(pieza)):
+                yield indice % 2, parte
+
+    for _es_encabezado, grupo in groupby(eventos(), key=itemgetter(0)):
+        yield map(itemgetter(1), grupo)
+
+
+def formatear_en_flujo(piezas: Iterable[str]) -> Iterator[str]:
+    """Versión por piezas de :func:`formatear_texto_final`.
+
+    Los encabezados ``INTERVIENE HABLANTE N:`` no deben quedar partidos
+    entre dos piezas, como ocurre con la salida de :func:`limpiar_en_flujo`.
+    """
+
+    def formatear() -> Iterator[str]:
+        partes = _dividir_partes(piezas)
+        escrito = False
+        actual = next(partes, None)
+        while actual is not None:
+            prefijo, contenido = _asomar(_recortar(actual), len(ENCABEZADO))
+            if prefijo.startswith(ENCABEZADO):
+                parte = "".join(contenido)
+                siguiente = next(partes, None)
+                if siguiente is None:
+                    break
+                if escrito:
+                    yield "\n\n"
+                yield parte + " "
+                yield from _normalizar_espacios(siguiente)
+                escrito = True
+            elif prefijo and not prefijo.startswith("---"):
+                if escrito and not prefijo.startswith("INTERVIENE"):
+                    yield " "
+                    yield from contenido
+            elif prefijo.startswith("---"):
+                yield "\n\n"
+                yield from contenido
+                yield "\n\n"
+                escrito = True
+            actual = next(partes, None)
+
+    return _recortar(formatear())
+
+
+def formatear_texto_final(texto_final: str) -> str:
+    """Separa el texto en un párrafo por intervención."""
+
+    print("🎨 Aplicando formato final al texto...")
+    return "".join(formatear_en_flujo([texto_final]))
+
+
+def intervenciones_con_hablantes(
+    resultado_proc: dict,
+    mapeo: MapeoHablantes,
+    al_terminar_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Iterator[str]:
+    """Agrupa los segmentos por hablante y genera una intervención por grupo.
+
+    Los hablantes se asignan y suavizan de inmediato; el texto de cada
+    intervención se arma recién cuando se pide.
+    """
+
+    segmentos = (
+        resultado_proc["segments"] if isinstance(resultado_proc, dict) else resultado_proc
+    )
+    print(f"🎯 Procesando {len(segmentos)} segmentos de audio...")
+    mapeo.preparar(seg.get("speaker") for seg in segmentos if seg.get("text", "").strip())
+    etiquetas = []
+    for seg in segmentos:
+        if not seg.get("text", "").strip():
+            continue
+        hablante_local = seg.get("speaker") or "DESCONOCIDO"
+        if hablante_local != "DESCONOCIDO":
+            etiquetas.append(mapeo.asignar_hablante_global(hablante_local))
+        else:
+            etiquetas.append("DESCONOCIDO")
+    hablantes = suavizar_hablantes(etiquetas)
+    return _armar_intervenciones(segmentos, hablantes, mapeo, al_terminar_segmento)
+
+
+def _armar_intervenciones(
+    segmentos: List[dict],
+    hablantes: List[str],
+    mapeo: MapeoHablantes,
+    al_terminar_segmento: Optional[Callable[[Dict[str, Any]], None]],
+) -> Iterator[str]:
+    def segmentos_con_hablante() -> Iterator[Tuple[str, str]]:
+        pendientes = iter(hablantes)
+        for seg in segmentos:
+            texto_segmento = seg.get("text", "").strip()
+            if not texto_segmento:
+                continue
+            texto_segmento = re.sub(r"\s+", " ", texto_segmento)
+            hablante = next(pendientes)
+            if al_terminar_segmento:
+                tiempo_inicio = seg.get("start", 0)
+                al_terminar_segmento(
+                    {
+                        "inicio": tiempo_inicio,
+                        "fin": seg.get("end", tiempo_inicio),
+                        "hablante": mapeo.obtener_nombre_final(hablante),
+                        "texto": texto_segmento,
+                    }
+                )
+            yield hablante, texto_segmento
+
+    hubo_intervenciones = False
+    for hablante, grupo in groupby(segmentos_con_hablante(), key=itemgetter(0)):
+        texto_del_grupo = limpiar_texto_repetitivo(" ".join(texto for _, texto in grupo))
+        if len(texto_del_grupo) > 3:
+            hubo_intervenciones = True
+            yield f"INTERVIENE {mapeo.obtener_nombre_final(hablante)}: {texto_del_grupo} "
+    if not hubo_intervenciones:
+        print("⚠️ No se pudo asignar hablantes, usando método de respaldo...")
+        yield "INTERVIENE HABLANTE DESCONOCIDO: "
+        for seg in segmentos:
+            texto_seg = seg.get("text", "").strip()
+            if texto_seg:
+                yield texto_seg + " "
+
+
+def procesar_segmentos_con_hablantes(
+    resultado_proc: dict,
+    mapeo: MapeoHablantes,
+    al_terminar_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> str:
+    """Agrupa los segmentos por hablante y arma las intervenciones."""
+
+    return "".join(intervenciones_con_hablantes(resultado_proc, mapeo, al_terminar_segmento)).strip()
+
+
+def intervenciones_hablante_unico(
+    resultado_alineado: dict,
+    al_terminar_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Iterator[str]:
+    """Genera una sola intervención cuando no hubo separación de hablantes."""
+
+    print("📝 Sin separación de hablantes, procesando como hablante único...")
+    segmentos = (
+        resultado_alineado["segments"] if isinstance(resultado_alineado, dict) else resultado_alineado
+    )
+    yield "INTERVIENE HABLANTE DESCONOCIDO: "
+    for seg in segmentos:
+        texto_seg = seg.get("text", "").strip()
+        if texto_seg:
+            texto_seg = limpiar_texto_repetitivo(texto_seg)
+            if texto_seg.strip():
+                if al_terminar_segmento:
+                    al_terminar_segmento(
+                        {
+                            "inicio": seg.get("start", 0),
+                            "fin": seg.get("end", 0),
+                            "hablante": "HABLANTE DESCONOCIDO",
+                            "texto": texto_seg,
+                        }
+                    )
+                yield texto_seg + " "
+
+
+def procesar_hablante_unico(
+    resultado_alineado: dict,
+    al_terminar_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> str:
+    """Arma una sola intervención cuando no hubo separación de hablantes."""
+
+    return "".join(intervenciones_hablante_unico(resultado_alineado, al_terminar_segmento))
+
+
+def escribir_en_flujo(piezas: Iterable[str], handle: TextIO) -> int:
+    """Escribe ``piezas`` en ``handle`` y cuenta las líneas de intervención."""
+
+    intervenciones = 0
+    inicio_linea = ""
+    for pieza in piezas:
+        handle.write(pieza)
+        for indice, trozo in enumerate(pieza.split("\n")):
+            if indice:
+                intervenciones += inicio_linea.startswith("INTERVIENE")
+                inicio_linea = ""
+            if len(inicio_linea) < len("INTERVIENE"):
+                inicio_linea = (inicio_linea + trozo).lstrip()[: len("INTERVIENE")]
+    return intervenciones + inicio_linea.startswith("INTERVIENE")
+
+
+def _clave_de_grabacion(resultado_alineado: Any, nombre_sin_extension: str) -> str:
+    """Identifica la grabación en el registro por la huella de su audio.
+
+    El nombre del archivo se repite entre reuniones (``reunion.wav``,
+    ``audio_limpio_parte_01.wav``), así que sólo se usa para los segmentos
+    guardados antes de que se registrara la huella.
+    """
+
+    if isinstance(resultado_alineado, dict) and resultado_alineado.get("huella_audio"):
+        return resultado_alineado["huella_audio"]
+    return os.path.basename(nombre_sin_extension)
+
+
+def formatear_salida(
+    resultado_alineado: dict,
+    segmentos_hablantes: Optional[dict],
+    nombre_sin_extension: str,
+    al_terminar_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
+    mapeo: Optional[MapeoHablantes] = None,
+) -> Tuple[str, int]:
+    """Procesa el resultado y guarda la transcripción en disco.
+
+    El texto pasa por piezas de los segmentos a los grupos de hablante, de
+    ahí a las intervenciones limpias y al archivo, sin armar nunca la
+    transcripción completa en memoria.
+
+    Si se indica ``al_terminar_segmento``, se llama con cada segmento
+    (``inicio``, ``fin``, ``hablante``, ``texto``) en cuanto tiene su
+    hablante definitivo. Sin ``mapeo`` se usa el registro de hablantes de
+    :mod:`registro_hablantes`. Si el resultado trae las huellas de
+    voz de la diarización (``speaker_embeddings``), los hablantes se
+    reconocen contra las voces del registro antes de asignarles número.
+
+    Returns
+    -------
+    Tuple[str, int]
+        Ruta del archivo generado y cantidad de intervenciones escritas.
+    """
+
+    registro_propio = None
+    if mapeo is None and segmentos_hablantes is not None:
+        registro_propio = RegistroHablantes()
+        mapeo = MapeoHablantes.desde_registro(registro_propio)
+
+    try:
+        if segmentos_hablantes is not None:
+            mapeo.grabacion = _clave_de_grabacion(resultado_alineado, nombre_sin_extension)
+            if isinstance(resultado_alineado, dict) and resultado_alineado.get("speaker_embeddings"):
+                mapeo.identificar_por_voz(resultado_alineado["speaker_embeddings"])
+            piezas = intervenciones_con_hablantes(resultado_alineado, mapeo, al_terminar_segmento)
+        else:
+            piezas = intervenciones_hablante_unico(resultado_alineado, al_terminar_segmento)
+
+        print("🎨 Aplicando formato final al texto...")
+        archivo_salida = f"{nombre_sin_extension}_transcripcion.txt"
+        with open(archivo_salida, "w", encoding="utf-8") as handle:
+            intervenciones = escribir_en_flujo(formatear_en_flujo(limpiar_en_flujo(piezas)), handle)
+    finally:
+        if registro_propio is not None:
+            registro_propio.cerrar()
+    avanzar(10, "formato")
+    avanzar(5, "guardado")
+    return archivo_salida, intervenciones
+
+
+__all__ = [
+    "MapeoHablantes",
+    "escribir_en_flujo",
+    "formatear_en_flujo",
+    "formatear_salida",
+    "formatear_texto_final",
+    "intervenciones_con_hablantes",
+    "intervenciones_hablante_unico",
+    "limpiar_en_flujo",
+    "limpiar_texto_repetitivo",
+    "procesar_hablante_unico",
+    "procesar_segmentos_con_hablantes",
+]
@@ -7,49 +7,33 @@ Script para gestionar nombres de hablantes de forma interactiva
 from __future__ import annotations
 
 import os
+import sqlite3
 import sys
 from typing import Optional
 
-from utilidades_nombres import cargar_json, guardar_json
+from registro_hablantes import RegistroHablantes, numero_hablante
 
-def cargar_mapeo_global():
-    """Carga el mapeo global de hablantes"""
-    return cargar_json("mapeo_hablantes_global.json", {})
-
-def cargar_nombres():
-    """Carga los nombres personalizados"""
-    return cargar_json("hablantes.json", {})
-
-def cargar_sugerencias():
-    """Carga sugerencias de nombres si existen"""
-    return cargar_json("sugerencias.json", {})
-
-def guardar_nombres(nombres):
-    """Guarda los nombres personalizados"""
-    return guardar_json("hablantes.json", nombres)
+def abrir_registro():
+    """Abre el registro de hablantes (``REGISTRO_HABLANTES``)"""
+    return RegistroHablantes()
 
 def mostrar_hablantes_detectados():
     """Muestra todos los hablantes que han sido detectados"""
-    mapeo_global = cargar_mapeo_global()
-    nombres = cargar_nombres()
+    with abrir_registro() as registro:
+        locales_por_hablante = registro.locales_por_hablante()
+        nombres = registro.nombres()
     
-    if not mapeo_global:
+    if not locales_por_hablante:
         print("No hay hablantes detectados aún. Ejecuta primero una transcripción.")
         return
     
     print("\nHABLANTES DETECTADOS:")
     print("=" * 50)
     
-    # Obtener todos los hablantes globales únicos
-    hablantes_globales = sorted(set(mapeo_global.values()), key=lambda x: int(x.split('_')[1]))
-    
-    for hablante_global in hablantes_globales:
-        numero = hablante_global.split('_')[1]
+    for hablante_global, speakers_locales in locales_por_hablante.items():
+        numero = numero_hablante(hablante_global)
         nombre_actual = nombres.get(hablante_global, f"HABLANTE {numero}")
         
-        # Mostrar qué speakers locales mapean a este global
-        speakers_locales = [k for k, v in mapeo_global.items() if v == hablante_global]
-        
         print(f"\n{hablante_global} -> {nombre_actual}")
         print(f"   Detectado como: {', '.join(speakers_locales)}")
 
@@ -59,24 +43,27 @@ def asignar_nombres_interactivo(archivo_transcripcion: Optional[str] = None) ->
     Parameters
     ----------
     archivo_transcripcion : Optional[str], optional
-        Ruta al archivo de transcripción. Si se especifica y no existe
-        ``sugerencias.json``, se generarán sugerencias automáticamente.
+        Ruta al archivo de transcripción. Si se especifica, se agrega al
+        índice de menciones antes de recalcular las sugerencias.
     """
-    mapeo_global = cargar_mapeo_global()
-    nombres = cargar_nombres()
-    sugerencias = cargar_sugerencias()
-
-    if archivo_transcripcion and not sugerencias:
-        try:
-            from detectar_nombres import detectar_nombres
-            sugerencias = detectar_nombres(archivo_transcripcion)
-            guardar_json("sugerencias.json", sugerencias)
-            if sugerencias:
-                print("\n✓ Sugerencias generadas automáticamente")
-        except Exception as e:  # pragma: no cover - detección es best-effort
-            print(f"Error al generar sugerencias: {e}")
-
-    if not mapeo_global:
+    with abrir_registro() as registro:
+        _asignar_nombres(registro, archivo_transcripcion)
+
+def _asignar_nombres(registro: RegistroHablantes, archivo_transcripcion: Optional[str]) -> None:
+    locales_por_hablante = registro.locales_por_hablante()
+    nombres = registro.nombres()
+
+    # Las sugerencias se recalculan siempre con las menciones de todas las reuniones
+    try:
+        from detectar_nombres import actualizar_sugerencias
+        if actualizar_sugerencias(registro, [archivo_transcripcion] if archivo_transcripcion else []):
+            print("\n✓ Sugerencias actualizadas con las menciones de todas las transcripciones")
+    except Exception as e:  # pragma: no cover - detección es best-effort
+        print(f"Error al generar sugerencias: {e}")
+    sugerencias = registro.sugerencias()
+    evidencia = registro.evidencia_nombres()
+
+    if not locales_por_hablante:
         print("No hay hablantes detectados aún. Ejecuta primero una transcripción.")
         return
     
@@ -85,21 +72,20 @@ def asignar_nombres_interactivo(archivo_transcripcion: Optional[str] = None) ->
     print("Presiona Enter para mantener el nombre actual")
     print("Escribe 'salir' para terminar")
     
-    # Obtener todos los hablantes globales únicos
-    hablantes_globales = sorted(set(mapeo_global.values()), key=lambda x: int(x.split('_')[1]))
-    
-    cambios_realizados = False
+    cambios = {}
 
-    for hablante_global in hablantes_globales:
-        numero = hablante_global.split('_')[1]
+    for hablante_global, speakers_locales in locales_por_hablante.items():
+        numero = numero_hablante(hablante_global)
         nombre_actual = nombres.get(hablante_global, f"HABLANTE {numero}")
         sugerencia = sugerencias.get(hablante_global)
         
         # Mostrar contexto
-        speakers_locales = [k for k, v in mapeo_global.items() if v == hablante_global]
         print(f"\n{hablante_global}")
         print(f"Detectado como: {', '.join(speakers_locales)}")
         print(f"Nombre actual: {nombre_actual}")
+        otros = [c for c in evidencia.get(hablante_global, []) if c[0] != sugerencia][:3]
+        if otros:
+            print("Otras menciones: " + ", ".join(f"{nombre} ({reuniones} reuniones)" for nombre, reuniones, _total in otros))
 
         if sugerencia:
             prompt = f"Nuevo nombre [{sugerencia}]: "
@@ -111,49 +97,45 @@ def asignar_nombres_interactivo(archivo_transcripcion: Optional[str] = None) ->
         if nuevo_nombre.lower() == "salir":
             break
         elif nuevo_nombre:
-            nombres[hablante_global] = nuevo_nombre
-            cambios_realizados = True
+            cambios[hablante_global] = nuevo_nombre
             print(f"✓ {hablante_global} -> {nuevo_nombre}")
         elif sugerencia:
-            nombres[hablante_global] = sugerencia
-            cambios_realizados = True
+            cambios[hablante_global] = sugerencia
             print(f"✓ {hablante_global} -> {sugerencia}")
     
-    if cambios_realizados:
-        if guardar_nombres(nombres):
+    if cambios:
+        try:
+            registro.guardar_nombres(cambios)
             print("\n✓ Nombres guardados correctamente")
-        else:
-            print("\n✗ Error al guardar nombres")
+            print("💡 Para aplicarlos sin volver a transcribir: python src/python/transcribir.py <audio> --render-only")
+        except sqlite3.Error as e:
+            print(f"\n✗ Error al guardar nombres: {e}")
     else:
         print("\nNo se realizaron cambios")
 
 def mostrar_estadisticas():
     """Muestra estadísticas de los hablantes"""
-    mapeo_global = cargar_mapeo_global()
-    nombres = cargar_nombres()
+    with abrir_registro() as registro:
+        locales_por_hablante = registro.locales_por_hablante()
+        nombres = registro.nombres()
     
-    if not mapeo_global:
+    if not locales_por_hablante:
         print("No hay datos de hablantes disponibles")
         return
     
     print("\nESTADÍSTICAS DE HABLANTES")
     print("=" * 50)
     
-    # Contar hablantes únicos
-    hablantes_globales = set(mapeo_global.values())
-    speakers_locales = set(mapeo_global.keys())
-    
-    print(f"Hablantes únicos detectados: {len(hablantes_globales)}")
-    print(f"Total de detecciones locales: {len(speakers_locales)}")
+    print(f"Hablantes únicos detectados: {len(locales_por_hablante)}")
+    print(f"Total de detecciones locales: {sum(map(len, locales_por_hablante.values()))}")
     print(f"Hablantes con nombres personalizados: {len(nombres)}")
     
     # Mostrar distribución
     print("\nDistribución por hablante:")
-    for hablante_global in sorted(hablantes_globales, key=lambda x: int(x.split('_')[1])):
-        count = sum(1 for v in mapeo_global.values() if v == hablante_global)
-        numero = hablante_global.split('_')[1]
+    for hablante_global, speakers_locales in locales_por_hablante.items():
+        numero = numero_hablante(hablante_global)
         nombre = nombres.get(hablante_global, f"HABLANTE {numero}")
-        print(f"  {nombre}: {count} detecciones")
+        print(f"  {nombre}: {len(speakers_locales)} detecciones")
 
 def limpiar_mapeo():
     """Permite limpiar el mapeo global (CUIDADO)"""
@@ -165,10 +147,11 @@ def limpiar_mapeo():
     
     if confirmacion == "CONFIRMAR":
         try:
-            if os.path.exists("mapeo_hablantes_global.json"):
-                os.remove("mapeo_hablantes_global.json")
-            if os.path.exists("hablantes.json"):
-                os.remove("hablantes.json")
+            with abrir_registro() as registro:
+                registro.limpiar()
+            indice_voces = os.getenv("INDICE_HABLANTES", "indice_hablantes.npz")
+            if os.path.exists(indice_voces):
+                os.remove(indice_voces)
             print("✓ Mapeo eliminado. El próximo audio empezará con HABLANTE 1")
         except Exception as e:
             print(f"Error al eliminar archivos: {e}")
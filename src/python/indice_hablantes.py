@@ -0,0 +1,154 @@
+"""Índice persistente de voces para reconocer hablantes entre grabaciones.
+
+La diarización etiqueta a los hablantes de cada grabación por separado
+(``SPEAKER_00``, ``SPEAKER_04``...), así que la misma etiqueta en dos
+reuniones no es la misma persona. Con la huella de voz (embedding) de cada
+hablante diarizado, este índice busca al hablante conocido más parecido
+por similitud coseno y reutiliza su ``HABLANTE_N`` (y con él su nombre de
+la tabla ``nombres`` del registro de hablantes, ``registro_hablantes.db``).
+Los hablantes que no superan ``UMBRAL_VOZ`` se registran como nuevos.
+
+Las huellas se guardan normalizadas (``float32``) en la tabla ``voces`` del
+registro de hablantes, que sólo agrega filas dentro de una transacción:
+varias transcripciones simultáneas no pisan las voces de las otras. Para
+buscar se cargan como una matriz y la búsqueda es un único producto de
+matrices, lo que alcanza para miles de voces guardadas. Un
+``indice_hablantes.npz`` de versiones anteriores (``INDICE_HABLANTES``) se
+importa al registro la primera vez.
+
+Este módulo no depende de torch ni de whisperx.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from registro_hablantes import RegistroHablantes
+
+ARCHIVO_INDICE_DEF = os.getenv("INDICE_HABLANTES", "indice_hablantes.npz")
+UMBRAL_DEF = float(os.getenv("UMBRAL_VOZ", "0.7"))
+HUELLAS_POR_HABLANTE = 50
+
+
+def _normalizar(vectores: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+    return (vectores / np.maximum(normas, 1e-12)).astype(np.float32)
+
+
+class IndiceHablantes:
+    """Huellas de voz normalizadas y el ``HABLANTE_N`` de cada una."""
+
+    def __init__(self, huellas: Optional[np.ndarray] = None, hablantes: Sequence[str] = ()) -> None:
+        self.huellas = huellas if huellas is not None else np.empty((0, 0), dtype=np.float32)
+        self.hablantes: List[str] = list(hablantes)
+
+    @classmethod
+    def cargar(cls, ruta: str = ARCHIVO_INDICE_DEF) -> "IndiceHablantes":
+        """Lee un índice ``.npz``; si no existe o no se puede leer, empieza vacío."""
+
+        try:
+            with np.load(ruta, allow_pickle=False) as datos:
+                return cls(datos["huellas"], datos["hablantes"].tolist())
+        except (OSError, KeyError, ValueError):
+            return cls()
+
+    @classmethod
+    def desde_registro(
+        cls, registro: RegistroHablantes, archivo_anterior: str = ARCHIVO_INDICE_DEF
+    ) -> "IndiceHablantes":
+        """Carga las voces de ``registro``, importando antes ``archivo_anterior`` si hace falta."""
+
+        voces = registro.voces()
+        if not voces and os.path.exists(archivo_anterior):
+            anterior = cls.cargar(archivo_anterior)
+            if len(anterior) and registro.importar_voces(anterior.filas()):
+                print(f"📥 {len(anterior)} huellas de voz importadas de {archivo_anterior}")
+            voces = registro.voces()
+        if not voces:
+            return cls()
+        hablantes = [hablante for hablante, _huella in voces]
+        return cls(np.stack([np.frombuffer(huella, dtype=np.float32) for _hablante, huella in voces]), hablantes)
+
+    def filas(self) -> List[Tuple[str, bytes]]:
+        """Devuelve ``(HABLANTE_N, huella)`` como se guardan en el registro."""
+
+        return [(hablante, self.huellas[i].tobytes()) for i, hablante in enumerate(self.hablantes)]
+
+    def __len__(self) -> int:
+        return len(self.hablantes)
+
+    def agregar(self, hablante: str, huella: Sequence[float]) -> bytes:
+        """Agrega ``huella`` a ``hablante``, conservando sus huellas más recientes.
+
+        Returns
+        -------
+        bytes
+            La huella normalizada, como se guarda en el registro.
+        """
+
+        vector = _normalizar(np.asarray(huella, dtype=np.float32).reshape(1, -1))
+        if len(self) and self.huellas.shape[1] != vector.shape[1]:
+            raise ValueError("La huella no tiene la dimensión de las del índice")
+        self.huellas = vector if not len(self) else np.vstack([self.huellas, vector])
+        self.hablantes.append(hablante)
+
+        propias = [i for i, h in enumerate(self.hablantes) if h == hablante]
+        if len(propias) > HUELLAS_POR_HABLANTE:
+            sobrantes = set(propias[: len(propias) - HUELLAS_POR_HABLANTE])
+            conservar = [i for i in range(len(self)) if i not in sobrantes]
+            self.huellas = self.huellas[conservar]
+            self.hablantes = [self.hablantes[i] for i in conservar]
+        return vector.tobytes()
+
+    def identificar(
+        self, huellas: Mapping[str, Sequence[float]], umbral: float = UMBRAL_DEF
+    ) -> Dict[str, Optional[str]]:
+        """Asigna a cada hablante local el hablante conocido más parecido.
+
+        Cada hablante conocido se asigna a lo sumo a un hablante local de la
+        grabación, empezando por los pares más parecidos. Los hablantes sin
+        un parecido mayor o igual a ``umbral`` quedan en ``None``.
+
+        Raises
+        ------
+        ValueError
+            Si las huellas no tienen la dimensión de las del índice (por
+            ejemplo, tras cambiar el modelo de diarización).
+        """
+
+        locales = list(huellas)
+        asignados: Dict[str, Optional[str]] = dict.fromkeys(locales)
+        if not locales or not len(self):
+            return asignados
+
+        consultas = _normalizar(np.asarray([huellas[h] for h in locales], dtype=np.float32))
+        if consultas.shape[1] != self.huellas.shape[1]:
+            raise ValueError("Las huellas no tienen la dimensión de las del índice")
+        conocidos, ids = np.unique(np.array(self.hablantes), return_inverse=True)
+
+        # Mejor similitud de cada hablante local contra cada hablante conocido
+        similitudes = consultas @ self.huellas.T
+        mejores = np.full((len(locales), len(conocidos)), -np.inf, dtype=np.float32)
+        filas = np.repeat(np.arange(len(locales)), len(ids))
+        np.maximum.at(mejores, (filas, np.tile(ids, len(locales))), similitudes.ravel())
+
+        usados = set()
+        for posicion in np.argsort(mejores, axis=None)[::-1]:
+            local, conocido = np.unravel_index(posicion, mejores.shape)
+            if mejores[local, conocido] < umbral:
+                break
+            if asignados[locales[local]] is None and conocido not in usados:
+                asignados[locales[local]] = str(conocidos[conocido])
+                usados.add(conocido)
+        return asignados
+
+
+__all__ = [
+    "ARCHIVO_INDICE_DEF",
+    "HUELLAS_POR_HABLANTE",
+    "IndiceHablantes",
+    "UMBRAL_DEF",
+]
@@ -0,0 +1,146 @@
+"""Transcripción de varios audios con lotes de GPU compartidos entre archivos.
+
+``FasterWhisperPipeline.transcribe`` de WhisperX corta cada audio en
+ventanas de voz (VAD) de hasta 30 s y las pasa a Whisper de a
+``batch_size``. Con un archivo por llamada el último lote de cada archivo
+queda a medio llenar, y en un archivo corto puede que ni el primero se
+llene. Aquí se hace el VAD de todos los archivos primero y sus ventanas se
+encadenan en un solo flujo, de modo que todos los lotes (salvo el último
+de todo el grupo) van llenos.
+
+Los resultados se entregan archivo por archivo en cuanto llega la última
+ventana de cada uno, con la misma forma que devuelve ``transcribe``. Con
+``al_terminar_ventana`` además se avisa cada ventana en cuanto sale de su
+lote, lo que permite mostrar texto provisional de un solo archivo largo.
+
+Si la versión instalada de WhisperX no expone las piezas necesarias
+(``vad_model``, ``merge_chunks``, el tokenizador), se transcribe cada
+archivo por separado con ``transcribe``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from audio_pcm import FRECUENCIA_MUESTREO
+
+DURACION_VENTANA = 30
+
+
+def ventanas_de_voz(modelo: Any, audio: np.ndarray) -> List[Dict[str, Any]]:
+    """Aplica el VAD del modelo como lo hace ``transcribe``.
+
+    Devuelve las ventanas (``start``/``end`` en segundos) ya unidas hasta
+    ``DURACION_VENTANA`` segundos.
+    """
+
+    vad = modelo.vad_model
+    parametros = modelo._vad_params  # noqa: WPS437 - mismos umbrales que transcribe()
+    if hasattr(vad, "preprocess_audio"):  # WhisperX >= 3.3
+        forma_onda = vad.preprocess_audio(audio)
+        unir = vad.merge_chunks
+    else:
+        import torch
+        from whisperx.vad import merge_chunks as unir
+
+        forma_onda = torch.from_numpy(np.ascontiguousarray(audio)).unsqueeze(0)
+    segmentos = vad({"waveform": forma_onda, "sample_rate": FRECUENCIA_MUESTREO})
+    return unir(
+        segmentos,
+        DURACION_VENTANA,
+        onset=parametros["vad_onset"],
+        offset=parametros["vad_offset"],
+    )
+
+
+def _fijar_idioma(modelo: Any, idioma: str) -> None:
+    """Crea el tokenizador de ``idioma`` como haría ``transcribe(language=...)``."""
+
+    tokenizador = modelo.tokenizer
+    if tokenizador is not None and getattr(tokenizador, "language_code", idioma) == idioma:
+        return
+    import faster_whisper.tokenizer
+
+    modelo.tokenizer = faster_whisper.tokenizer.Tokenizer(
+        modelo.model.hf_tokenizer,
+        modelo.model.model.is_multilingual,
+        task="transcribe",
+        language=idioma,
+    )
+
+
+def transcribir_empaquetado(
+    modelo: Any,
+    audios: Sequence[np.ndarray],
+    batch_size: int,
+    idioma: str,
+    al_terminar_ventana: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Transcribe ``audios`` llenando cada lote con ventanas de varios archivos.
+
+    ``al_terminar_ventana(indice, segmento)`` se llama con cada segmento
+    apenas se transcribe, antes de que termine su archivo.
+
+    Yields
+    ------
+    Tuple[int, dict]
+        Índice del audio en ``audios`` y su resultado
+        (``{"segments": [...], "language": idioma}``), en orden.
+    """
+
+    try:
+        ventanas = [ventanas_de_voz(modelo, audio) for audio in audios]
+        _fijar_idioma(modelo, idioma)
+    except (AttributeError, ImportError, KeyError, TypeError) as exc:
+        print(f"⚠️ No pude juntar los lotes de varios archivos ({exc}); transcribo uno por uno")
+        for indice, audio in enumerate(audios):
+            resultado = modelo.transcribe(audio, language=idioma, batch_size=batch_size)
+            if al_terminar_ventana:
+                for segmento in resultado["segments"]:
+                    al_terminar_ventana(indice, segmento)
+            yield indice, resultado
+        return
+
+    def entradas() -> Iterator[Dict[str, np.ndarray]]:
+        for audio, propias in zip(audios, ventanas):
+            for ventana in propias:
+                inicio = int(ventana["start"] * FRECUENCIA_MUESTREO)
+                fin = int(ventana["end"] * FRECUENCIA_MUESTREO)
+                yield {"inputs": audio[inicio:fin]}
+
+    # Orden de las ventanas en el flujo: (archivo, ventana)
+    orden = [(indice, ventana) for indice, propias in enumerate(ventanas) for ventana in propias]
+    total = len(orden)
+    print(f"📦 {len(audios)} archivos, {total} ventanas de voz en {-(-total // max(batch_size, 1))} lotes")
+
+    pendiente = 0
+    segmentos: List[Dict[str, Any]] = []
+
+    def terminados(hasta: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # Entrega los archivos anteriores a ``hasta`` (incluidos los que no tienen voz)
+        nonlocal pendiente, segmentos
+        while pendiente < hasta:
+            yield pendiente, {"segments": segmentos, "language": idioma}
+            pendiente += 1
+            segmentos = []
+
+    salidas = modelo(entradas(), batch_size=batch_size, num_workers=0) if total else []
+    for posicion, salida in enumerate(salidas):
+        indice, ventana = orden[posicion]
+        yield from terminados(indice)
+        texto = salida["text"]
+        if batch_size in (0, 1, None):
+            texto = texto[0]
+        segmento = {"text": texto, "start": round(ventana["start"], 3), "end": round(ventana["end"], 3)}
+        segmentos.append(segmento)
+        if al_terminar_ventana:
+            al_terminar_ventana(indice, segmento)
+    yield from terminados(len(audios))
+
+
+__all__ = [
+    "transcribir_empaquetado",
+    "ventanas_de_voz",
+]
@@ -0,0 +1,276 @@
+"""Medición por etapas del pipeline de transcripción.
+
+Cada etapa registra su duración, la memoria residente pico (RSS), la VRAM
+pico cuando hay CUDA y su factor de tiempo real (segundos de cómputo por
+segundo de audio). Al terminar un trabajo las métricas se guardan en
+``<nombre>_metricas.json`` y en un archivo ``.prom`` por trabajo dentro de
+``METRICAS_PROMETHEUS``, en el formato que lee el colector de archivos de
+texto de node_exporter.
+
+El pico de VRAM de CUDA es del proceso entero: sólo se reinicia al empezar
+una etapa si no hay otra en curso (la diarización corre en un hilo junto a
+la transcripción). Las etapas que se solapan con otra informan el pico del
+proceso durante la etapa y quedan marcadas con ``vram_compartida``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil es opcional
+    psutil = None
+
+DIRECTORIO_PROMETHEUS_DEF = "metricas"
+INTERVALO_MUESTREO = 0.05
+_CARACTERES_ARCHIVO = re.compile(r"[^\w.-]")
+
+_METRICAS_PROMETHEUS = {
+    "segundos": ("gauge", "Duración de la etapa en segundos"),
+    "rss_pico_bytes": ("gauge", "Memoria residente pico durante la etapa"),
+    "vram_pico_bytes": ("gauge", "Memoria de GPU pico durante la etapa"),
+    "factor_tiempo_real": ("gauge", "Segundos de cómputo por segundo de audio"),
+}
+
+
+# Etapas en curso en todo el proceso; cada una es su marca de ``vram_compartida``
+_etapas_en_curso: List[Dict[str, bool]] = []
+_bloqueo_etapas = threading.Lock()
+
+
+def _rss_actual() -> int:
+    """Devuelve la memoria residente del proceso en bytes."""
+
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+
+        # En Linux ``ru_maxrss`` está en KiB y es el pico del proceso
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):  # pragma: no cover - Windows
+        return 0
+
+
+def _torch_cuda():
+    """Devuelve ``torch.cuda`` si torch ya está importado y hay GPU."""
+
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return None
+    try:
+        return torch.cuda if torch.cuda.is_available() else None
+    except Exception:
+        return None
+
+
+class _MuestreadorRSS:
+    """Hilo que muestrea la RSS para obtener el pico de una etapa."""
+
+    def __init__(self) -> None:
+        self.pico = _rss_actual()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self) -> None:
+        while not self._detener.wait(INTERVALO_MUESTREO):
+            self.pico = max(self.pico, _rss_actual())
+
+    def __enter__(self) -> "_MuestreadorRSS":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._detener.set()
+        self._hilo.join()
+        self.pico = max(self.pico, _rss_actual())
+
+
+class MedidorEtapas:
+    """Acumula las métricas de las etapas de un trabajo."""
+
+    def __init__(self, trabajo: str, duracion_audio: Optional[float] = None) -> None:
+        self.trabajo = trabajo
+        self.duracion_audio = duracion_audio
+        self.etapas: List[Dict[str, Any]] = []
+        self.inicio = time.time()
+
+    def registrar(
+        self,
+        nombre: str,
+        segundos: float,
+        rss_pico_bytes: Optional[int] = None,
+        vram_pico_bytes: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Agrega una etapa ya medida."""
+
+        etapa = {
+            "etapa": nombre,
+            "segundos": round(segundos, 3),
+            "rss_pico_bytes": rss_pico_bytes,
+            "vram_pico_bytes": vram_pico_bytes,
+            "factor_tiempo_real": (
+                round(segundos / self.duracion_audio, 4) if self.duracion_audio else None
+            ),
+        }
+        self.etapas.append(etapa)
+        return etapa
+
+    @contextmanager
+    def etapa(self, nombre: str) -> Iterator[None]:
+        """Mide el bloque ``with`` como la etapa ``nombre``."""
+
+        cuda = _torch_cuda()
+        marca = {"compartida": False}
+        with _bloqueo_etapas:
+            if _etapas_en_curso:
+                # Reiniciar el pico borraría el de las etapas en curso
+                marca["compartida"] = True
+                for otra in _etapas_en_curso:
+                    otra["compartida"] = True
+            elif cuda is not None:
+                cuda.reset_peak_memory_stats()
+            _etapas_en_curso.append(marca)
+        muestreador = _MuestreadorRSS()
+        inicio = time.perf_counter()
+        try:
+            with muestreador:
+                yield
+        finally:
+            with _bloqueo_etapas:
+                _etapas_en_curso.remove(marca)
+            # También se registra la etapa que falla: es la que más interesa
+            medida = self.registrar(
+                nombre,
+                time.perf_counter() - inicio,
+                muestreador.pico,
+                cuda.max_memory_allocated() if cuda is not None else None,
+            )
+            if cuda is not None and marca["compartida"]:
+                medida["vram_compartida"] = True
+
+    def resumen(self) -> Dict[str, Any]:
+        """Devuelve las métricas del trabajo como diccionario."""
+
+        return {
+            "trabajo": self.trabajo,
+            "inicio": self.inicio,
+            "duracion_audio": self.duracion_audio,
+            "segundos_totales": round(sum(e["segundos"] for e in self.etapas), 3),
+            "etapas": self.etapas,
+        }
+
+    def guardar_json(self, ruta: str) -> None:
+        """Escribe el resumen del trabajo en ``ruta``."""
+
+        with open(ruta, "w", encoding="utf-8") as handle:
+            json.dump(self.resumen(), handle, indent=2, ensure_ascii=False)
+
+    def guardar_prometheus(self, directorio: str) -> str:
+        """Escribe las métricas del trabajo en su propio archivo ``.prom``.
+
+        El archivo se reemplaza de forma atómica, sin marcas de tiempo y con
+        un solo valor por combinación de etiquetas: las etapas repetidas
+        suman su duración y su factor de tiempo real y conservan el mayor
+        pico de memoria. Repetir un trabajo con el mismo nombre reemplaza
+        sus valores anteriores.
+
+        Returns
+        -------
+        str
+            Ruta del archivo escrito.
+        """
+
+        os.makedirs(directorio, exist_ok=True)
+        nombre = os.path.basename(self.trabajo)
+        ruta = os.path.join(directorio, f"transcripcion_{_CARACTERES_ARCHIVO.sub('_', nombre)}.prom")
+
+        por_etapa: Dict[str, Dict[str, Any]] = {}
+        for medida in self.etapas:
+            acumulada = por_etapa.setdefault(medida["etapa"], {})
+            for sufijo in _METRICAS_PROMETHEUS:
+                valor = medida.get(sufijo)
+                if valor is None:
+                    continue
+                if sufijo in ("segundos", "factor_tiempo_real"):
+                    acumulada[sufijo] = round(acumulada.get(sufijo, 0) + valor, 4)
+                else:
+                    acumulada[sufijo] = max(acumulada.get(sufijo, 0), valor)
+
+        trabajo = _escapar_etiqueta(nombre)
+        lineas = []
+        for sufijo, (tipo, ayuda) in _METRICAS_PROMETHEUS.items():
+            lineas.append(f"# HELP transcripcion_etapa_{sufijo} {ayuda}")
+            lineas.append(f"# TYPE transcripcion_etapa_{sufijo} {tipo}")
+            for nombre_etapa, valores in por_etapa.items():
+                if sufijo in valores:
+                    etiquetas = f'trabajo="{trabajo}",etapa="{_escapar_etiqueta(nombre_etapa)}"'
+                    lineas.append(f"transcripcion_etapa_{sufijo}{{{etiquetas}}} {valores[sufijo]}")
+
+        # El colector sólo lee ``*.prom``: el temporal no se ve a medio escribir
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as handle:
+            handle.write("\n".join(lineas) + "\n")
+        os.replace(temporal, ruta)
+        return ruta
+
+
+def _escapar_etiqueta(valor: str) -> str:
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus."""
+
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_medidor_actual = MedidorEtapas("proceso")
+
+
+def iniciar_medicion(trabajo: str, duracion_audio: Optional[float] = None) -> MedidorEtapas:
+    """Crea el medidor del trabajo en curso y lo deja como activo."""
+
+    global _medidor_actual
+    _medidor_actual = MedidorEtapas(trabajo, duracion_audio)
+    return _medidor_actual
+
+
+def etapa(nombre: str):
+    """Mide un bloque ``with`` como etapa del trabajo en curso."""
+
+    return _medidor_actual.etapa(nombre)
+
+
+def medidor_actual() -> MedidorEtapas:
+    """Devuelve el medidor del trabajo en curso."""
+
+    return _medidor_actual
+
+
+def exportar_metricas(medidor: MedidorEtapas, ruta_json: str) -> None:
+    """Guarda las métricas en JSON y en el archivo de Prometheus."""
+
+    print("📊 Tiempo por etapa:")
+    for etapa_medida in medidor.etapas:
+        factor = etapa_medida["factor_tiempo_real"]
+        detalle = f" (x{factor} tiempo real)" if factor is not None else ""
+        print(f"   {etapa_medida['etapa']}: {etapa_medida['segundos']}s{detalle}")
+    try:
+        medidor.guardar_json(ruta_json)
+        medidor.guardar_prometheus(os.getenv("METRICAS_PROMETHEUS", DIRECTORIO_PROMETHEUS_DEF))
+    except OSError as exc:
+        print(f"⚠️ No pude guardar las métricas: {exc}")
+
+
+__all__ = [
+    "MedidorEtapas",
+    "etapa",
+    "exportar_metricas",
+    "iniciar_medicion",
+    "medidor_actual",
+]
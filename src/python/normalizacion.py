@@ -0,0 +1,275 @@
+"""Normalización del texto transcrito en una sola pasada.
+
+Después de reducir los espacios, el texto se parte en palabras y se recorre
+una vez de izquierda a derecha con un autómata de pocos estados, sin
+retrocesos, así que el costo es lineal incluso con los bucles alucinados de
+Whisper:
+
+- Una muletilla repetida ``REPETICIONES_MULETILLA`` veces o más, separada
+  por espacios o una coma (``"no no no no no"``, ``"eh, eh, eh, eh, eh"``),
+  queda como una sola aparición. La puntuación o la coma que siga a la
+  última se conserva (``"No, no, no, no, no."`` queda ``"No."``).
+- Tres comas o más separadas sólo por espacios quedan como una.
+- Los espacios se reducen a uno y se recortan los extremos.
+
+Cada palabra distinta se clasifica una sola vez (qué partes son muletillas,
+comas u otra cosa) y las copias idénticas seguidas de una muletilla o una
+coma se cuentan de una vez con ``str.startswith``, de modo que un bucle de
+miles de ``"no"`` avanza el autómata en pocos pasos.
+
+Las muletillas son palabras sueltas, se comparan sin distinguir mayúsculas,
+deben ser palabras completas y se configuran con ``MULETILLAS_TRANSCRIPCION``
+(lista separada por comas).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+MULETILLAS_DEF = ("no", "sí", "ah", "eh", "mm", "um")
+REPETICIONES_DEF = int(os.getenv("REPETICIONES_MULETILLA", "5"))
+COMAS_DEF = 3
+# Palabras distintas cuya clase se recuerda antes de vaciar el caché
+LIMITE_CLASES = 100_000
+
+_PUNTUACION = ".?!;:"
+_PRIMER_TOKEN = re.compile(rf",|[^\s,{_PUNTUACION}¿¡]+")
+# Partes de una palabra: texto entre separadores, o un separador suelto
+_UNIDAD = re.compile(rf"[^,{_PUNTUACION}¿¡]+|.")
+
+_COMA = ","
+
+
+def _copias(texto: str, unidad: str, desde: int) -> int:
+    """Cuenta las copias seguidas de ``unidad`` en ``texto`` desde ``desde``.
+
+    Compara bloques que se duplican y luego se parten a la mitad, así que
+    recorre el texto con ``startswith`` (en C) y no palabra por palabra.
+    """
+
+    copias = 0
+    bloque = unidad
+    while texto.startswith(bloque, desde):
+        desde += len(bloque)
+        copias += len(bloque) // len(unidad)
+        bloque += bloque
+    while len(bloque) > len(unidad):
+        bloque = bloque[:len(bloque) // 2]
+        if texto.startswith(bloque, desde):
+            desde += len(bloque)
+            copias += len(bloque) // len(unidad)
+    return copias
+
+
+class _Clases(dict):
+    """Caché palabra → clase que calcula las que faltan."""
+
+    def __init__(self, clasificar) -> None:
+        super().__init__()
+        self._clasificar = clasificar
+
+    def __missing__(self, palabra: str):
+        clase = self[palabra] = self._clasificar(palabra)
+        return clase
+
+
+def _recorrer(
+    texto: str,
+    palabras: List[str],
+    clases: Iterator[Optional[Tuple[Tuple[int, int, Optional[str]], ...]]],
+    repeticiones: int,
+    minimo_comas: int,
+) -> List[Tuple[int, int, str]]:
+    """Recorre ``palabras`` (``texto`` partido por espacios) una sola vez.
+
+    ``clases`` trae las partes de cada palabra (ver
+    :meth:`Normalizador._clasificar`). Devuelve los reemplazos
+    ``(inicio, fin, texto)`` sobre ``texto``, en orden.
+    """
+
+    cambios: List[Tuple[int, int, str]] = []
+    # Racha de muletillas en curso: muletilla, texto de la primera, dónde
+    # empieza y termina, cuántas lleva y la coma que sigue a la última (-1: ninguna)
+    racha: Optional[str] = None
+    primera = ""
+    inicio = fin = cuenta = 0
+    coma = -1
+    # Serie de comas en curso
+    comas = inicio_comas = fin_comas = 0
+
+    def cerrar_racha() -> None:
+        nonlocal racha, coma, comas, inicio_comas, fin_comas
+        if cuenta >= repeticiones:
+            cambios.append((inicio, fin, primera))
+        racha = None
+        if coma >= 0:
+            # La coma que no separó dos muletillas puede abrir una serie de comas
+            comas, inicio_comas, fin_comas = 1, coma, coma + 1
+            coma = -1
+
+    def cerrar() -> None:
+        nonlocal comas
+        if racha is not None:
+            cerrar_racha()
+        if comas >= minimo_comas:
+            siguiente = texto[fin_comas:fin_comas + 1]
+            cambios.append((inicio_comas, fin_comas, ", " if siguiente and siguiente != " " else ","))
+        comas = 0
+
+    posicion = 0
+    anterior = None
+    pares = zip(palabras, clases)
+    for palabra, partes in pares:
+        if partes is None:
+            if racha is not None or comas:
+                cerrar()
+        else:
+            for inicio_parte, fin_parte, parte in partes:
+                if parte is None:
+                    cerrar()
+                elif parte == racha:
+                    cuenta += 1
+                    fin = posicion + fin_parte
+                    coma = -1
+                elif parte == _COMA:
+                    if racha is not None:
+                        if coma < 0:
+                            # Puede separar dos muletillas de la racha
+                            coma = posicion + inicio_parte
+                            continue
+                        cerrar_racha()
+                    if not comas:
+                        inicio_comas = posicion + inicio_parte
+                    comas += 1
+                    fin_comas = posicion + fin_parte
+                else:
+                    cerrar()
+                    racha = parte
+                    inicio, fin, cuenta = posicion + inicio_parte, posicion + fin_parte, 1
+                    primera = texto[inicio:fin]
+            if palabra == anterior and (
+                comas >= minimo_comas and partes == ((0, 1, _COMA),)
+                if racha is None
+                else cuenta >= repeticiones and (len(partes) == 1 or len(partes) == 2 and partes[1][2] == _COMA)
+            ):
+                # Bucle alucinado ("no no no", "eh, eh, eh", ", , ,") que ya se
+                # va a reemplazar: las copias idénticas que siguen avanzan el
+                # recorrido de una vez
+                copias = _copias(texto, palabra + " ", posicion + len(palabra) + 1)
+                if copias:
+                    next(islice(pares, copias - 1, None), None)
+                    avance = copias * (len(palabra) + 1)
+                    posicion += avance
+                    if racha is not None:
+                        cuenta += copias
+                        fin += avance
+                        if coma >= 0:
+                            coma += avance
+                    else:
+                        comas += copias
+                        fin_comas += avance
+        anterior = palabra
+        posicion += len(palabra) + 1
+    cerrar()
+    return cambios
+
+
+class Normalizador:
+    """Limpia muletillas repetidas, comas sobrantes y espacios."""
+
+    def __init__(
+        self,
+        muletillas: Iterable[str] = MULETILLAS_DEF,
+        repeticiones: int = REPETICIONES_DEF,
+        comas: int = COMAS_DEF,
+    ) -> None:
+        self.muletillas = frozenset(m.strip().casefold() for m in muletillas if m.strip())
+        self.repeticiones = max(repeticiones, 2)
+        self.comas = max(comas, 2)
+        self._clases = _Clases(self._clasificar)
+
+    def _clasificar(self, palabra: str) -> Optional[Tuple[Tuple[int, int, Optional[str]], ...]]:
+        """Parte ``palabra`` (sin espacios) para el recorrido.
+
+        Devuelve el inicio, el fin y la clase de cada parte: la muletilla en
+        minúsculas, ``","`` o ``None`` para cualquier otra cosa. Si ninguna
+        parte es muletilla ni coma devuelve ``None``.
+        """
+
+        partes: List[Tuple[int, int, Optional[str]]] = []
+        for unidad in _UNIDAD.finditer(palabra):
+            texto = unidad.group()
+            if texto == _COMA:
+                clase = _COMA
+            elif texto.casefold() in self.muletillas and palabra[unidad.end():unidad.end() + 1] not in ("¿", "¡"):
+                clase = texto.casefold()
+            else:
+                clase = None
+            if clase is None and partes and partes[-1][2] is None:
+                continue
+            partes.append((unidad.start(), unidad.end(), clase))
+        if all(clase is None for _inicio, _fin, clase in partes):
+            return None
+        return tuple(partes)
+
+    def normalizar(self, texto: str) -> str:
+        """Devuelve ``texto`` normalizado y sin espacios en los extremos."""
+
+        if texto.isprintable() and "  " not in texto:
+            # Sin saltos de línea ni espacios dobles basta con recortar los extremos
+            texto = texto.strip()
+        else:
+            texto = " ".join(texto.split())
+        if len(self._clases) > LIMITE_CLASES:
+            self._clases.clear()
+        palabras = texto.split(" ")
+        cambios = _recorrer(
+            texto,
+            palabras,
+            map(self._clases.__getitem__, palabras),
+            self.repeticiones,
+            self.comas,
+        )
+        piezas = []
+        anterior = 0
+        for inicio, fin, reemplazo in cambios:
+            piezas.append(texto[anterior:inicio])
+            piezas.append(reemplazo)
+            anterior = fin
+        piezas.append(texto[anterior:])
+        return "".join(piezas)
+
+    def puede_continuar(self, pieza: str) -> bool:
+        """Indica si ``pieza`` podría continuar una racha del texto anterior."""
+
+        primero = _PRIMER_TOKEN.search(pieza)
+        if primero is None:
+            return False
+        return primero.group() == "," or primero.group().casefold() in self.muletillas
+
+
+def _muletillas_configuradas() -> Tuple[str, ...]:
+    valor = os.getenv("MULETILLAS_TRANSCRIPCION")
+    if not valor:
+        return MULETILLAS_DEF
+    return tuple(m for m in valor.split(",") if m.strip())
+
+
+normalizador = Normalizador(_muletillas_configuradas())
+
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza ``texto`` con las muletillas configuradas."""
+
+    return normalizador.normalizar(texto)
+
+
+__all__ = [
+    "MULETILLAS_DEF",
+    "Normalizador",
+    "normalizador",
+    "normalizar_texto",
+]
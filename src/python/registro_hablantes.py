@@ -0,0 +1,367 @@
+"""Registro de hablantes en SQLite, seguro con varias transcripciones a la vez.
+
+Guarda en una sola base (``REGISTRO_HABLANTES``, por defecto
+``registro_hablantes.db``) lo que antes vivía en tres archivos JSON:
+
+- ``mapeo``: hablante local de la diarización (``SPEAKER_04`` o
+  ``reunion:SPEAKER_04``) → número de ``HABLANTE_N``.
+- ``nombres``: ``HABLANTE_N`` → nombre confirmado.
+- ``sugerencias``: ``HABLANTE_N`` → nombre sugerido por
+  :mod:`detectar_nombres`.
+- ``transcripciones`` y ``menciones``: índice de los nombres mencionados
+  junto a cada ``HABLANTE_N`` en cada transcripción ya analizada (por
+  hash de su contenido), con cuántas veces y en qué posiciones.
+- ``voces``: huellas de voz de cada ``HABLANTE_N`` que usa
+  :mod:`indice_hablantes` para reconocerlo en otras grabaciones.
+
+La base usa el modo WAL, así que las lecturas no bloquean a quien escribe,
+y los números nuevos se reparten dentro de una transacción ``IMMEDIATE``:
+dos transcripciones simultáneas nunca entregan el mismo ``HABLANTE_N`` ni
+pisan los cambios de la otra. Cada operación escribe todas sus filas en una
+sola transacción.
+
+Al crear la base se importan ``mapeo_hablantes_global.json``,
+``hablantes.json`` y ``sugerencias.json`` si existen.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from utilidades_nombres import cargar_json
+
+ARCHIVO_REGISTRO_DEF = os.getenv("REGISTRO_HABLANTES", "registro_hablantes.db")
+ARCHIVO_MAPEO_JSON = "mapeo_hablantes_global.json"
+ARCHIVO_NOMBRES_JSON = "hablantes.json"
+ARCHIVO_SUGERENCIAS_JSON = "sugerencias.json"
+ESPERA_BLOQUEO_S = 30.0
+LOTE_CONSULTA = 500
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mapeo (
+    local TEXT PRIMARY KEY,
+    numero INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mapeo_numero ON mapeo (numero);
+CREATE TABLE IF NOT EXISTS nombres (
+    hablante TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sugerencias (
+    hablante TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transcripciones (
+    huella TEXT PRIMARY KEY,
+    ruta TEXT NOT NULL,
+    indexada TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripciones_ruta ON transcripciones (ruta);
+CREATE TABLE IF NOT EXISTS menciones (
+    huella TEXT NOT NULL,
+    hablante TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    conteo INTEGER NOT NULL,
+    posiciones TEXT NOT NULL,
+    PRIMARY KEY (huella, hablante, nombre)
+);
+CREATE INDEX IF NOT EXISTS menciones_hablante ON menciones (hablante, nombre);
+CREATE TABLE IF NOT EXISTS voces (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hablante TEXT NOT NULL,
+    huella BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS voces_hablante ON voces (hablante, id);
+"""
+
+
+def hablante_global(numero: int) -> str:
+    """Devuelve la etiqueta ``HABLANTE_N`` del número ``numero``."""
+
+    return f"HABLANTE_{numero}"
+
+
+def numero_hablante(hablante: str) -> Optional[int]:
+    """Devuelve ``N`` de ``HABLANTE_N``, o ``None`` si no tiene esa forma."""
+
+    prefijo, _, numero = hablante.partition("_")
+    if prefijo != "HABLANTE" or not numero.isdigit():
+        return None
+    return int(numero)
+
+
+class RegistroHablantes:
+    """Mapeo de hablantes, nombres y sugerencias guardados en SQLite."""
+
+    def __init__(self, ruta: str = ARCHIVO_REGISTRO_DEF) -> None:
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta = ruta
+        # Las transacciones se abren a mano (``BEGIN IMMEDIATE``)
+        self._conexion = sqlite3.connect(ruta, timeout=ESPERA_BLOQUEO_S, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        with self._transaccion():
+            nueva = not self._conexion.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'mapeo'"
+            ).fetchone()
+            for sentencia in filter(str.strip, _ESQUEMA.split(";")):
+                self._conexion.execute(sentencia)
+            if nueva:
+                self._importar_json()
+
+    def __enter__(self) -> "RegistroHablantes":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+    @contextmanager
+    def _transaccion(self) -> Iterator[None]:
+        """``BEGIN IMMEDIATE`` … ``COMMIT``, o ``ROLLBACK`` si algo falla."""
+
+        self._conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conexion.execute("ROLLBACK")
+            raise
+        self._conexion.execute("COMMIT")
+
+    def _importar_json(self) -> None:
+        """Copia al registro los archivos JSON usados antes de la base."""
+
+        mapeo = cargar_json(ARCHIVO_MAPEO_JSON, {}) or {}
+        filas = [
+            (local, numero_hablante(hablante))
+            for local, hablante in mapeo.items()
+            if numero_hablante(hablante) is not None
+        ]
+        self._conexion.executemany("INSERT OR IGNORE INTO mapeo VALUES (?, ?)", filas)
+        for tabla, archivo in (("nombres", ARCHIVO_NOMBRES_JSON), ("sugerencias", ARCHIVO_SUGERENCIAS_JSON)):
+            datos = cargar_json(archivo, {}) or {}
+            self._conexion.executemany(
+                f"INSERT OR IGNORE INTO {tabla} VALUES (?, ?)",
+                [(hablante, nombre) for hablante, nombre in datos.items() if nombre],
+            )
+        if filas:
+            print(f"📥 Importé {len(filas)} hablantes de {ARCHIVO_MAPEO_JSON} a {self.ruta}")
+
+    def mapeo(self) -> Dict[str, str]:
+        """Devuelve el mapeo completo hablante local → ``HABLANTE_N``."""
+
+        filas = self._conexion.execute("SELECT local, numero FROM mapeo ORDER BY numero, local")
+        return {local: hablante_global(numero) for local, numero in filas}
+
+    def buscar(self, locales: Iterable[str]) -> Dict[str, str]:
+        """Devuelve el ``HABLANTE_N`` de los ``locales`` que ya están registrados."""
+
+        locales = list(dict.fromkeys(locales))
+        encontrados = {}
+        for inicio in range(0, len(locales), LOTE_CONSULTA):
+            lote = locales[inicio:inicio + LOTE_CONSULTA]
+            filas = self._conexion.execute(
+                f"SELECT local, numero FROM mapeo WHERE local IN ({', '.join('?' * len(lote))})", lote
+            )
+            encontrados.update((local, hablante_global(numero)) for local, numero in filas)
+        return encontrados
+
+    def asignar(
+        self, locales: Iterable[str], conocidos: Optional[Mapping[str, str]] = None
+    ) -> Tuple[Dict[str, str], List[str]]:
+        """Registra ``locales`` en una sola transacción.
+
+        Los locales que ya estaban registrados conservan su número, aunque
+        otro proceso los haya agregado hace un instante. Los de
+        ``conocidos`` se vinculan al ``HABLANTE_N`` indicado; el resto
+        recibe números nuevos, en orden.
+
+        Returns
+        -------
+        Tuple[Dict[str, str], List[str]]
+            ``HABLANTE_N`` de cada local y los locales que recibieron un
+            número nuevo.
+        """
+
+        conocidos = conocidos or {}
+        locales = list(dict.fromkeys(list(locales) + list(conocidos)))
+        nuevos = []
+        with self._transaccion():
+            asignados = self.buscar(locales)
+            siguiente = self._conexion.execute("SELECT COALESCE(MAX(numero), 0) + 1 FROM mapeo").fetchone()[0]
+            filas = []
+            for local in locales:
+                if local in asignados:
+                    continue
+                numero = numero_hablante(conocidos[local]) if local in conocidos else None
+                if numero is None:
+                    numero = siguiente
+                    siguiente += 1
+                    nuevos.append(local)
+                filas.append((local, numero))
+                asignados[local] = hablante_global(numero)
+            self._conexion.executemany("INSERT INTO mapeo VALUES (?, ?)", filas)
+        return asignados, nuevos
+
+    def locales_por_hablante(self) -> Dict[str, List[str]]:
+        """Devuelve los hablantes locales de cada ``HABLANTE_N``, en orden."""
+
+        agrupados: Dict[str, List[str]] = {}
+        for local, numero in self._conexion.execute("SELECT local, numero FROM mapeo ORDER BY numero, local"):
+            agrupados.setdefault(hablante_global(numero), []).append(local)
+        return agrupados
+
+    def nombres(self) -> Dict[str, str]:
+        """Devuelve los nombres confirmados de cada ``HABLANTE_N``."""
+
+        return dict(self._conexion.execute("SELECT hablante, nombre FROM nombres"))
+
+    def guardar_nombres(self, nombres: Mapping[str, str]) -> None:
+        """Agrega o reemplaza los ``nombres`` indicados en una sola transacción."""
+
+        with self._transaccion():
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO nombres VALUES (?, ?)", list(nombres.items())
+            )
+
+    def sugerencias(self) -> Dict[str, str]:
+        """Devuelve los nombres sugeridos de cada ``HABLANTE_N``."""
+
+        return dict(self._conexion.execute("SELECT hablante, nombre FROM sugerencias"))
+
+    def guardar_sugerencias(self, sugerencias: Mapping[str, str]) -> None:
+        """Agrega o reemplaza las ``sugerencias`` indicadas en una sola transacción."""
+
+        with self._transaccion():
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO sugerencias VALUES (?, ?)", list(sugerencias.items())
+            )
+
+    def transcripciones_indexadas(self, huellas: Iterable[str]) -> Set[str]:
+        """Devuelve cuáles de ``huellas`` ya están en el índice de menciones."""
+
+        huellas = list(dict.fromkeys(huellas))
+        indexadas = set()
+        for inicio in range(0, len(huellas), LOTE_CONSULTA):
+            lote = huellas[inicio:inicio + LOTE_CONSULTA]
+            filas = self._conexion.execute(
+                f"SELECT huella FROM transcripciones WHERE huella IN ({', '.join('?' * len(lote))})", lote
+            )
+            indexadas.update(huella for (huella,) in filas)
+        return indexadas
+
+    def guardar_menciones(
+        self, transcripciones: Mapping[str, Tuple[str, Mapping[str, Mapping[str, List[int]]]]]
+    ) -> None:
+        """Agrega al índice las menciones de cada transcripción, en una sola transacción.
+
+        ``transcripciones`` va de la huella del contenido a ``(ruta,
+        menciones)``, con ``menciones[hablante][nombre]`` = posiciones de
+        las intervenciones donde se nombró. Si la ruta ya estaba indexada
+        con otro contenido, sus menciones anteriores se reemplazan.
+        """
+
+        with self._transaccion():
+            for huella, (ruta, menciones) in transcripciones.items():
+                anteriores = [
+                    fila[0]
+                    for fila in self._conexion.execute(
+                        "SELECT huella FROM transcripciones WHERE ruta = ? AND huella != ?", (ruta, huella)
+                    )
+                ]
+                for anterior in anteriores:
+                    self._conexion.execute("DELETE FROM menciones WHERE huella = ?", (anterior,))
+                    self._conexion.execute("DELETE FROM transcripciones WHERE huella = ?", (anterior,))
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO transcripciones VALUES (?, ?, datetime('now'))", (huella, ruta)
+                )
+                self._conexion.execute("DELETE FROM menciones WHERE huella = ?", (huella,))
+                self._conexion.executemany(
+                    "INSERT INTO menciones VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (huella, hablante, nombre, len(posiciones), json.dumps(posiciones))
+                        for hablante, nombres in menciones.items()
+                        for nombre, posiciones in nombres.items()
+                    ],
+                )
+
+    def evidencia_nombres(self) -> Dict[str, List[Tuple[str, int, int]]]:
+        """Nombres mencionados junto a cada ``HABLANTE_N`` en todas las transcripciones.
+
+        Returns
+        -------
+        Dict[str, List[Tuple[str, int, int]]]
+            Para cada hablante, ``(nombre, transcripciones, menciones)``
+            de mayor a menor evidencia: primero en cuántas transcripciones
+            aparece y después cuántas veces en total.
+        """
+
+        evidencia: Dict[str, List[Tuple[str, int, int]]] = {}
+        filas = self._conexion.execute(
+            "SELECT hablante, nombre, COUNT(*) AS reuniones, SUM(conteo) AS total FROM menciones"
+            " GROUP BY hablante, nombre ORDER BY hablante, reuniones DESC, total DESC, nombre"
+        )
+        for hablante, nombre, reuniones, total in filas:
+            evidencia.setdefault(hablante, []).append((nombre, reuniones, total))
+        return evidencia
+
+    def voces(self) -> List[Tuple[str, bytes]]:
+        """Devuelve ``(HABLANTE_N, huella)`` de las voces guardadas, de la más antigua a la más nueva."""
+
+        return list(self._conexion.execute("SELECT hablante, huella FROM voces ORDER BY id"))
+
+    def guardar_voces(self, voces: Iterable[Tuple[str, bytes]], maximo_por_hablante: int) -> None:
+        """Agrega ``voces`` en una sola transacción.
+
+        Cada hablante conserva sus ``maximo_por_hablante`` huellas más
+        recientes. Como sólo se agregan filas, las voces que guarden otras
+        transcripciones al mismo tiempo no se pierden.
+        """
+
+        voces = list(voces)
+        with self._transaccion():
+            self._conexion.executemany("INSERT INTO voces (hablante, huella) VALUES (?, ?)", voces)
+            for hablante in dict.fromkeys(hablante for hablante, _huella in voces):
+                self._conexion.execute(
+                    "DELETE FROM voces WHERE hablante = ? AND id NOT IN"
+                    " (SELECT id FROM voces WHERE hablante = ? ORDER BY id DESC LIMIT ?)",
+                    (hablante, hablante, maximo_por_hablante),
+                )
+
+    def importar_voces(self, voces: Iterable[Tuple[str, bytes]]) -> bool:
+        """Copia ``voces`` al registro sólo si todavía no tiene ninguna.
+
+        Returns
+        -------
+        bool
+            ``True`` si se importaron.
+        """
+
+        with self._transaccion():
+            if self._conexion.execute("SELECT 1 FROM voces LIMIT 1").fetchone():
+                return False
+            self._conexion.executemany("INSERT INTO voces (hablante, huella) VALUES (?, ?)", list(voces))
+        return True
+
+    def limpiar(self) -> None:
+        """Borra el mapeo, los nombres, las sugerencias y los índices de menciones y voces."""
+
+        with self._transaccion():
+            for tabla in ("mapeo", "nombres", "sugerencias", "transcripciones", "menciones", "voces"):
+                self._conexion.execute(f"DELETE FROM {tabla}")
+
+
+__all__ = [
+    "ARCHIVO_REGISTRO_DEF",
+    "RegistroHablantes",
+    "hablante_global",
+    "numero_hablante",
+]
@@ -0,0 +1,311 @@
+"""Divide una reunión en partes cortadas en silencios, con un pequeño solape.
+
+Reemplaza la división en tres tercios iguales de ``preprocesar_audio.js``,
+que cortaba en medio de palabras y turnos de habla. Un detector de voz
+por energía (ventanas de 30 ms, umbral relativo al piso de ruido de la
+grabación) encuentra los silencios; cada corte se hace en el silencio más
+largo cercano a la duración objetivo de la parte. Cada parte incluye
+``solape`` segundos del audio vecino para no perder palabras en el
+borde.
+
+Junto a las partes se guarda ``<nombre>_partes.json`` con la ventana
+propia de cada parte. Al transcribir, :func:`ajustar_a_parte` lleva los
+tiempos al audio original y descarta las palabras que caen fuera de esa
+ventana, de modo que las transcripciones de las partes se unen por tiempo
+sin palabras repetidas en los solapes.
+
+Uso:
+  python src/python/segmentar_audio.py audio_procesado/reunion_limpio.wav --nombre reunion
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import re
+import sys
+import wave
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from audio_pcm import FRECUENCIA_MUESTREO, decodificar_a_disco
+from utilidades_nombres import cargar_json, guardar_json
+
+DURACION_PARTE_DEF = float(os.getenv("DURACION_PARTE", "600"))
+SOLAPE_DEF = float(os.getenv("SOLAPE_PARTE", "1.0"))
+SILENCIO_MINIMO_DEF = 0.3
+MARGEN_VOZ_DB = 10.0
+TOLERANCIA = 0.25
+MUESTRAS_POR_VENTANA = FRECUENCIA_MUESTREO * 30 // 1000
+SUFIJO_MANIFIESTO = "_partes.json"
+PATRON_PARTE = re.compile(r"_parte_\d+$")
+
+
+def energia_por_ventana(audio: np.ndarray, bloque: int = 1 << 22) -> np.ndarray:
+    """Devuelve la energía en dB de cada ventana de 30 ms de ``audio``.
+
+    Se calcula por bloques para que un ``np.memmap`` no se lea entero.
+    """
+
+    bloque -= bloque % MUESTRAS_POR_VENTANA
+    ventanas = len(audio) // MUESTRAS_POR_VENTANA
+    energia = np.empty(ventanas, dtype=np.float32)
+    for inicio in range(0, ventanas * MUESTRAS_POR_VENTANA, bloque):
+        trozo = np.asarray(audio[inicio:min(inicio + bloque, ventanas * MUESTRAS_POR_VENTANA)])
+        cuadrados = np.square(trozo.reshape(-1, MUESTRAS_POR_VENTANA), dtype=np.float32)
+        desde = inicio // MUESTRAS_POR_VENTANA
+        energia[desde:desde + len(cuadrados)] = 10 * np.log10(cuadrados.mean(axis=1) + 1e-10)
+    return energia
+
+
+def detectar_silencios(energia: np.ndarray, silencio_minimo: float = SILENCIO_MINIMO_DEF) -> np.ndarray:
+    """Devuelve los silencios como filas ``(ventana_inicio, ventana_fin)``.
+
+    Una ventana es silencio si su energía queda a menos de ``MARGEN_VOZ_DB``
+    del piso de ruido (percentil 5) de la grabación, y en todo caso por
+    debajo del punto medio entre ese piso y el nivel de la voz (percentil
+    95), para grabaciones con muy pocas pausas.
+    """
+
+    if not len(energia):
+        return np.empty((0, 2), dtype=np.int64)
+    piso, voz = np.percentile(energia, [5, 95])
+    silencio = energia < min(piso + MARGEN_VOZ_DB, (piso + voz) / 2)
+    bordes = np.diff(np.concatenate(([0], silencio.view(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)
+    minimo = int(silencio_minimo * 1000 / 30)
+    largos = fines - inicios >= max(minimo, 1)
+    return np.stack([inicios[largos], fines[largos]], axis=1)
+
+
+def elegir_cortes(
+    energia: np.ndarray,
+    silencios: np.ndarray,
+    duracion_parte: float,
+) -> List[float]:
+    """Elige los instantes de corte, en segundos, cerca de cada ``duracion_parte``.
+
+    Entre los silencios cuyo centro cae a ``±TOLERANCIA`` de la duración
+    objetivo se elige el más largo; si no hay ninguno se corta en la
+    ventana de menor energía de ese rango.
+    """
+
+    segundos_por_ventana = MUESTRAS_POR_VENTANA / FRECUENCIA_MUESTREO
+    total = len(energia)
+    objetivo = max(int(duracion_parte / segundos_por_ventana), 1)
+    centros = silencios.sum(axis=1) // 2
+    largos = silencios[:, 1] - silencios[:, 0]
+
+    cortes: List[float] = []
+    anterior = 0
+    while total - anterior > objetivo * (1 + TOLERANCIA):
+        desde = anterior + int(objetivo * (1 - TOLERANCIA))
+        hasta = anterior + int(objetivo * (1 + TOLERANCIA))
+        candidatos = np.flatnonzero((centros >= desde) & (centros < hasta))
+        if len(candidatos):
+            distancia = np.abs(centros[candidatos] - (anterior + objetivo))
+            mejor = candidatos[np.lexsort((distancia, -largos[candidatos]))[0]]
+            corte = int(centros[mejor])
+        else:
+            corte = desde + int(np.argmin(energia[desde:hasta]))
+        cortes.append(round(corte * segundos_por_ventana, 3))
+        anterior = corte
+    return cortes
+
+
+def _escribir_wav(ruta: str, audio: np.ndarray, bloque: int = 1 << 22) -> None:
+    """Escribe ``audio`` (``float32`` en ``[-1, 1)``) como WAV de 16 bits."""
+
+    with wave.open(ruta, "wb") as salida:
+        salida.setnchannels(1)
+        salida.setsampwidth(2)
+        salida.setframerate(FRECUENCIA_MUESTREO)
+        for inicio in range(0, len(audio), bloque):
+            trozo = np.asarray(audio[inicio:inicio + bloque]) * 32768.0
+            salida.writeframes(np.clip(np.rint(trozo), -32768, 32767).astype("<i2").tobytes())
+
+
+def ruta_manifiesto(ruta_parte: str) -> str:
+    """Devuelve el manifiesto que corresponde a una parte ``<nombre>_parte_N.wav``."""
+
+    base = os.path.splitext(os.path.basename(ruta_parte))[0]
+    return os.path.join(os.path.dirname(ruta_parte), PATRON_PARTE.sub("", base) + SUFIJO_MANIFIESTO)
+
+
+def segmentar(
+    audio_file: str,
+    directorio_salida: str,
+    nombre: Optional[str] = None,
+    duracion_parte: float = DURACION_PARTE_DEF,
+    solape: float = SOLAPE_DEF,
+    silencio_minimo: float = SILENCIO_MINIMO_DEF,
+) -> Dict[str, Any]:
+    """Divide ``audio_file`` en partes y devuelve el manifiesto guardado.
+
+    Las partes se llaman ``<nombre>_parte_NN.wav``, numeradas con ceros a
+    la izquierda para que se ordenen bien como texto; las partes de una
+    división anterior con el mismo ``nombre`` se borran.
+    """
+
+    nombre = nombre or os.path.splitext(os.path.basename(audio_file))[0]
+    os.makedirs(directorio_salida, exist_ok=True)
+
+    audio = decodificar_a_disco(audio_file)
+    duracion = len(audio) / FRECUENCIA_MUESTREO
+    energia = energia_por_ventana(audio)
+    cortes = elegir_cortes(energia, detectar_silencios(energia, silencio_minimo), duracion_parte)
+    limites = [0.0] + cortes + [duracion]
+
+    for anterior in glob.glob(os.path.join(glob.escape(directorio_salida), f"{glob.escape(nombre)}_parte_*.wav")):
+        os.remove(anterior)
+
+    ancho = max(2, len(str(len(limites) - 1)))
+    partes = []
+    for numero, (desde, hasta) in enumerate(zip(limites, limites[1:]), start=1):
+        inicio = max(desde - solape, 0.0)
+        fin = min(hasta + solape, duracion)
+        archivo = f"{nombre}_parte_{numero:0{ancho}d}.wav"
+        _escribir_wav(
+            os.path.join(directorio_salida, archivo),
+            audio[int(inicio * FRECUENCIA_MUESTREO):int(fin * FRECUENCIA_MUESTREO)],
+        )
+        partes.append(
+            {
+                "archivo": archivo,
+                "inicio": round(inicio, 3),
+                "fin": round(fin, 3),
+                "desde": round(desde, 3),
+                "hasta": round(hasta, 3),
+            }
+        )
+        print(f"✅ Parte {numero}: {archivo} ({desde / 60:.1f}min - {hasta / 60:.1f}min)")
+
+    manifiesto = {
+        "audio": audio_file,
+        "duracion": round(duracion, 3),
+        "solape": solape,
+        "partes": partes,
+    }
+    if not guardar_json(os.path.join(directorio_salida, nombre + SUFIJO_MANIFIESTO), manifiesto):
+        print("⚠️ No pude guardar el manifiesto de partes")
+    return manifiesto
+
+
+def buscar_parte(ruta_parte: str) -> Optional[Dict[str, Any]]:
+    """Devuelve la entrada del manifiesto de ``ruta_parte`` o ``None``."""
+
+    manifiesto = cargar_json(ruta_manifiesto(ruta_parte), None)
+    if not isinstance(manifiesto, dict):
+        return None
+    archivo = os.path.basename(ruta_parte)
+    return next((p for p in manifiesto.get("partes", []) if p.get("archivo") == archivo), None)
+
+
+def ajustar_a_parte(resultado: Any, parte: Dict[str, Any]) -> Dict[str, Any]:
+    """Lleva los tiempos de ``resultado`` al audio original y quita los solapes.
+
+    Se conservan las palabras que empiezan dentro de la ventana propia de la
+    parte (``desde`` ≤ inicio < ``hasta``); las que quedan fuera las
+    transcribe la parte vecina. Una palabra sin tiempo hereda el de la
+    anterior. Los segmentos sin palabras se conservan si su punto medio cae
+    en la ventana.
+    """
+
+    desplazamiento = parte["inicio"]
+    desde, hasta = parte["desde"], parte["hasta"]
+    segmentos = resultado.get("segments", []) if isinstance(resultado, dict) else resultado
+
+    ajustados = []
+    for seg in segmentos:
+        seg = dict(seg)
+        for clave in ("start", "end"):
+            if seg.get(clave) is not None:
+                seg[clave] = round(seg[clave] + desplazamiento, 3)
+        palabras = seg.get("words") or []
+        if not palabras:
+            inicio = seg.get("start") or desplazamiento
+            medio = (inicio + (seg.get("end") or inicio)) / 2
+            if desde <= medio < hasta:
+                ajustados.append(seg)
+            continue
+
+        propias = []
+        ultimo = seg.get("start") or desplazamiento
+        for palabra in palabras:
+            palabra = dict(palabra)
+            for clave in ("start", "end"):
+                if palabra.get(clave) is not None:
+                    palabra[clave] = round(palabra[clave] + desplazamiento, 3)
+            if palabra.get("start") is not None:
+                ultimo = palabra["start"]
+            if desde <= ultimo < hasta:
+                propias.append(palabra)
+        if not propias:
+            continue
+        if len(propias) < len(palabras):
+            seg["text"] = " " + " ".join(p.get("word", "").strip() for p in propias)
+            tiempos = [p["start"] for p in propias if p.get("start") is not None]
+            finales = [p["end"] for p in propias if p.get("end") is not None]
+            if tiempos:
+                seg["start"] = tiempos[0]
+            if finales:
+                seg["end"] = finales[-1]
+        seg["words"] = propias
+        ajustados.append(seg)
+    if isinstance(resultado, dict):
+        return {**resultado, "segments": ajustados}
+    return {"segments": ajustados}
+
+
+def parse_args() -> argparse.Namespace:
+    """Define y analiza los argumentos de la línea de comandos."""
+
+    parser = argparse.ArgumentParser(description="Divide un audio en partes cortadas en silencios")
+    parser.add_argument("audio_file", help="Audio a dividir")
+    parser.add_argument("--salida", default="audio_procesado", help="Carpeta donde guardar las partes")
+    parser.add_argument("--nombre", help="Nombre base de las partes (por defecto, el del audio)")
+    parser.add_argument(
+        "--duracion-parte",
+        type=float,
+        default=DURACION_PARTE_DEF,
+        help="Duración objetivo de cada parte, en segundos",
+    )
+    parser.add_argument(
+        "--solape",
+        type=float,
+        default=SOLAPE_DEF,
+        help="Segundos de audio vecino que incluye cada parte a cada lado",
+    )
+    parser.add_argument(
+        "--silencio-minimo",
+        type=float,
+        default=SILENCIO_MINIMO_DEF,
+        help="Duración mínima de un silencio para cortar en él, en segundos",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Punto de entrada principal del script."""
+
+    args = parse_args()
+    if not os.path.exists(args.audio_file):
+        print(f"❌ No encontré el archivo: {args.audio_file}")
+        sys.exit(1)
+    print(f"✂️  Dividiendo {args.audio_file} en partes de ~{args.duracion_parte / 60:.0f} minutos...")
+    manifiesto = segmentar(
+        args.audio_file,
+        args.salida,
+        args.nombre,
+        args.duracion_parte,
+        args.solape,
+        args.silencio_minimo,
+    )
+    print(f"📋 {len(manifiesto['partes'])} partes guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Segmentos alineados y diarizados guardados en un archivo columnar.
+
+Después de la alineación y la diarización, ``transcribir.py`` guarda los
+segmentos en ``<audio>_segmentos.npz``: un arreglo NumPy por columna
+(tiempos, puntajes, hablantes como IDs enteros y textos como un único
+bloque UTF-8 con sus desplazamientos). Con ese archivo la transcripción
+se puede volver a armar con los nombres actuales del registro de
+hablantes (``registro_hablantes.db``) sin cargar torch ni los modelos.
+
+Dos columnas son opcionales y no cambian ``VERSION_FORMATO``: la huella
+de voz de cada hablante (``voces``, ``cortes_voces`` y ``huellas``), si la
+diarización la entregó, y la huella del audio decodificado
+(``huella_audio``). Los archivos guardados antes de que existieran se
+cargan sin ``"speaker_embeddings"`` ni ``"huella_audio"``, igual que los
+de una transcripción sin diarización.
+
+Este módulo, como :mod:`formateador`, no depende de torch ni de whisperx.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VERSION_FORMATO = 1
+SUFIJO_SEGMENTOS = "_segmentos.npz"
+
+
+def ruta_segmentos(nombre_sin_extension: str) -> str:
+    """Devuelve la ruta del archivo de segmentos de una transcripción."""
+
+    return f"{nombre_sin_extension}{SUFIJO_SEGMENTOS}"
+
+
+def _a_flotante(valor: Any) -> float:
+    return float("nan") if valor is None else float(valor)
+
+
+def _de_flotante(valor: float) -> Optional[float]:
+    return None if np.isnan(valor) else valor
+
+
+def _codificar_textos(textos: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Junta ``textos`` en un bloque UTF-8 y devuelve el bloque y sus cortes."""
+
+    codificados = [texto.encode("utf-8") for texto in textos]
+    cortes = np.zeros(len(codificados) + 1, dtype=np.int64)
+    np.cumsum([len(texto) for texto in codificados], out=cortes[1:])
+    return np.frombuffer(b"".join(codificados), dtype=np.uint8), cortes
+
+
+def _decodificar_textos(bloque: np.ndarray, cortes: np.ndarray) -> List[str]:
+    datos = bloque.tobytes()
+    cortes = cortes.tolist()
+    return [datos[a:b].decode("utf-8") for a, b in zip(cortes, cortes[1:])]
+
+
+def _codificar_hablantes(hablantes: Sequence[Optional[str]]) -> Tuple[np.ndarray, List[str]]:
+    """Convierte los hablantes en IDs; el ID ``0`` es "sin hablante"."""
+
+    catalogo = [""]
+    indices = {"": 0}
+    ids = np.empty(len(hablantes), dtype=np.int32)
+    for i, hablante in enumerate(hablantes):
+        hablante = hablante or ""
+        if hablante not in indices:
+            indices[hablante] = len(catalogo)
+            catalogo.append(hablante)
+        ids[i] = indices[hablante]
+    return ids, catalogo
+
+
+def guardar_segmentos(resultado: Any, diarizado: bool, ruta: str) -> str:
+    """Guarda los segmentos de ``resultado`` en ``ruta`` en formato columnar.
+
+    ``diarizado`` indica si hubo separación de hablantes, que decide cómo
+    se formatea la transcripción al volver a armarla.
+    """
+
+    segmentos = resultado.get("segments", []) if isinstance(resultado, dict) else resultado
+    palabras = [palabra for seg in segmentos for palabra in seg.get("words") or []]
+
+    ids, catalogo = _codificar_hablantes(
+        [seg.get("speaker") for seg in segmentos] + [p.get("speaker") for p in palabras]
+    )
+
+    textos_segmentos, cortes_segmentos = _codificar_textos([seg.get("text", "") for seg in segmentos])
+    textos_palabras, cortes_palabras = _codificar_textos([p.get("word", "") for p in palabras])
+    hablantes, cortes_hablantes = _codificar_textos(catalogo)
+    palabras_por_segmento = np.zeros(len(segmentos) + 1, dtype=np.int64)
+    np.cumsum([len(seg.get("words") or []) for seg in segmentos], out=palabras_por_segmento[1:])
+
+    # Huellas de voz por hablante (opcionales; los archivos anteriores no las tienen)
+    huellas = (resultado.get("speaker_embeddings") if isinstance(resultado, dict) else None) or {}
+    voces, cortes_voces = _codificar_textos(list(huellas))
+    matriz_huellas = np.array(list(huellas.values()), dtype=np.float32)
+    if not huellas:
+        matriz_huellas = matriz_huellas.reshape(0, 0)
+
+    # Huella del audio decodificado (opcional): identifica la grabación en el registro
+    huella_audio = (resultado.get("huella_audio") if isinstance(resultado, dict) else None) or ""
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as handle:
+        np.savez_compressed(
+            handle,
+            voces=voces,
+            cortes_voces=cortes_voces,
+            huellas=matriz_huellas,
+            huella_audio=np.array(huella_audio),
+            version=np.int32(VERSION_FORMATO),
+            diarizado=np.bool_(diarizado),
+            hablantes=hablantes,
+            cortes_hablantes=cortes_hablantes,
+            inicio=np.array([_a_flotante(seg.get("start")) for seg in segmentos], dtype=np.float64),
+            fin=np.array([_a_flotante(seg.get("end")) for seg in segmentos], dtype=np.float64),
+            hablante=ids[:len(segmentos)],
+            texto=textos_segmentos,
+            cortes_texto=cortes_segmentos,
+            palabras_por_segmento=palabras_por_segmento,
+            palabra_inicio=np.array([_a_flotante(p.get("start")) for p in palabras], dtype=np.float64),
+            palabra_fin=np.array([_a_flotante(p.get("end")) for p in palabras], dtype=np.float64),
+            palabra_puntaje=np.array([_a_flotante(p.get("score")) for p in palabras], dtype=np.float32),
+            palabra_hablante=ids[len(segmentos):],
+            palabra=textos_palabras,
+            cortes_palabra=cortes_palabras,
+        )
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def cargar_segmentos(ruta: str) -> Tuple[Dict[str, Any], bool]:
+    """Lee un archivo de :func:`guardar_segmentos`.
+
+    Returns
+    -------
+    Tuple[dict, bool]
+        Resultado con la forma de WhisperX (``{"segments": [...]}`` y,
+        si se guardaron, ``"speaker_embeddings"`` y ``"huella_audio"``) y si
+        hubo separación de hablantes.
+    """
+
+    with np.load(ruta, allow_pickle=False) as datos:
+        version = int(datos["version"])
+        if version != VERSION_FORMATO:
+            raise ValueError(f"Versión de segmentos no soportada: {version}")
+        catalogo = _decodificar_textos(datos["hablantes"], datos["cortes_hablantes"])
+        textos = _decodificar_textos(datos["texto"], datos["cortes_texto"])
+        textos_palabras = _decodificar_textos(datos["palabra"], datos["cortes_palabra"])
+        inicio = datos["inicio"].tolist()
+        fin = datos["fin"].tolist()
+        hablante = datos["hablante"].tolist()
+        cortes = datos["palabras_por_segmento"].tolist()
+        palabra_inicio = datos["palabra_inicio"].tolist()
+        palabra_fin = datos["palabra_fin"].tolist()
+        palabra_puntaje = datos["palabra_puntaje"].tolist()
+        palabra_hablante = datos["palabra_hablante"].tolist()
+        diarizado = bool(datos["diarizado"])
+        huellas = {}
+        if "huellas" in datos.files:
+            voces = _decodificar_textos(datos["voces"], datos["cortes_voces"])
+            huellas = dict(zip(voces, datos["huellas"].tolist()))
+        huella_audio = str(datos["huella_audio"]) if "huella_audio" in datos.files else ""
+
+    palabras = []
+    for i, texto in enumerate(textos_palabras):
+        palabra: Dict[str, Any] = {"word": texto}
+        for clave, valores in (("start", palabra_inicio), ("end", palabra_fin), ("score", palabra_puntaje)):
+            valor = _de_flotante(valores[i])
+            if valor is not None:
+                palabra[clave] = valor
+        if palabra_hablante[i]:
+            palabra["speaker"] = catalogo[palabra_hablante[i]]
+        palabras.append(palabra)
+
+    segmentos = []
+    for i, texto in enumerate(textos):
+        segmento: Dict[str, Any] = {
+            "start": _de_flotante(inicio[i]),
+            "end": _de_flotante(fin[i]),
+            "text": texto,
+            "words": palabras[cortes[i]:cortes[i + 1]],
+        }
+        if hablante[i]:
+            segmento["speaker"] = catalogo[hablante[i]]
+        segmentos.append(segmento)
+    resultado: Dict[str, Any] = {"segments": segmentos}
+    if huellas:
+        resultado["speaker_embeddings"] = huellas
+    if huella_audio:
+        resultado["huella_audio"] = huella_audio
+    return resultado, diarizado
+
+
+__all__ = [
+    "SUFIJO_SEGMENTOS",
+    "cargar_segmentos",
+    "guardar_segmentos",
+    "ruta_segmentos",
+]
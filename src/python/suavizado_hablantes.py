@@ -0,0 +1,144 @@
+"""Suavizado de hablantes con mayorías por ventana vectorizadas en NumPy.
+
+Los hablantes se codifican como enteros (``0`` es el hablante desconocido)
+y los votos de cada ventana se obtienen con sumas acumuladas, de modo que
+el costo es lineal en la cantidad de segmentos.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DESCONOCIDO = "DESCONOCIDO"
+VENTANA_DEF = int(os.getenv("VENTANA_SUAVIZADO", "3"))
+HISTERESIS_DEF = int(os.getenv("HISTERESIS_SUAVIZADO", "0"))
+
+
+def codificar_hablantes(
+    etiquetas: Sequence[Optional[Hashable]], desconocido: Hashable = DESCONOCIDO
+) -> Tuple[np.ndarray, List[Hashable]]:
+    """Convierte ``etiquetas`` en IDs enteros en orden de aparición.
+
+    Devuelve el arreglo de IDs y el catálogo para decodificarlos; el ID
+    ``0`` corresponde a ``desconocido`` (también para etiquetas vacías).
+    """
+
+    catalogo: List[Hashable] = [desconocido]
+    indices = {desconocido: 0}
+    ids = np.empty(len(etiquetas), dtype=np.int32)
+    for i, etiqueta in enumerate(etiquetas):
+        if not etiqueta:
+            etiqueta = desconocido
+        id_hablante = indices.get(etiqueta)
+        if id_hablante is None:
+            id_hablante = indices[etiqueta] = len(catalogo)
+            catalogo.append(etiqueta)
+        ids[i] = id_hablante
+    return ids, catalogo
+
+
+def suavizar_ids(ids: np.ndarray, ventana: int = VENTANA_DEF, histeresis: int = HISTERESIS_DEF) -> np.ndarray:
+    """Corrige hablantes sueltos rodeados por otro hablante.
+
+    Un segmento cambia al hablante mayoritario de las ``ventana`` posiciones
+    anteriores cuando también es el mayoritario de las ``ventana``
+    posteriores, no es el desconocido y, en ambas ventanas, supera en más
+    de ``histeresis`` votos al hablante actual. Los votos se cuentan sobre
+    las etiquetas originales; los empates favorecen al ID menor.
+    """
+
+    cantidad = len(ids)
+    if cantidad < 3 or ventana < 1:
+        return ids.copy()
+
+    posiciones = np.arange(cantidad)
+    desde = np.maximum(posiciones - ventana, 0)
+    hasta = np.minimum(posiciones + 1 + ventana, cantidad)
+
+    mejor_anterior = np.zeros(cantidad, dtype=np.int32)
+    votos_anterior = np.full(cantidad, -1, dtype=np.int32)
+    mejor_posterior = np.zeros(cantidad, dtype=np.int32)
+    votos_posterior = np.full(cantidad, -1, dtype=np.int32)
+    propios_anterior = np.zeros(cantidad, dtype=np.int32)
+    propios_posterior = np.zeros(cantidad, dtype=np.int32)
+
+    acumulado = np.empty(cantidad + 1, dtype=np.int32)
+    acumulado[0] = 0
+    for id_hablante in range(int(ids.max()) + 1):
+        es_hablante = ids == id_hablante
+        np.cumsum(es_hablante, out=acumulado[1:])
+        anterior = acumulado[posiciones] - acumulado[desde]
+        posterior = acumulado[hasta] - acumulado[posiciones + 1]
+
+        supera = anterior > votos_anterior
+        mejor_anterior[supera] = id_hablante
+        votos_anterior[supera] = anterior[supera]
+        supera = posterior > votos_posterior
+        mejor_posterior[supera] = id_hablante
+        votos_posterior[supera] = posterior[supera]
+
+        propios_anterior[es_hablante] = anterior[es_hablante]
+        propios_posterior[es_hablante] = posterior[es_hablante]
+
+    cambia = (
+        (posiciones > 0)
+        & (posiciones < cantidad - 1)
+        & (ids != 0)
+        & (mejor_anterior == mejor_posterior)
+        & (mejor_anterior != 0)
+        & (mejor_anterior != ids)
+        & (votos_anterior - propios_anterior > histeresis)
+        & (votos_posterior - propios_posterior > histeresis)
+    )
+    return np.where(cambia, mejor_anterior, ids)
+
+
+def suavizar_hablantes(
+    etiquetas: Sequence[Optional[Hashable]],
+    ventana: int = VENTANA_DEF,
+    histeresis: int = HISTERESIS_DEF,
+    desconocido: Hashable = DESCONOCIDO,
+) -> List[Hashable]:
+    """Versión de :func:`suavizar_ids` que recibe y devuelve etiquetas."""
+
+    ids, catalogo = codificar_hablantes(etiquetas, desconocido)
+    suavizados = suavizar_ids(ids, ventana, histeresis)
+    return [catalogo[i] for i in suavizados.tolist()]
+
+
+def mayoria_por_grupo(
+    grupos: Sequence[Sequence[Optional[Hashable]]], desconocido: Hashable = DESCONOCIDO
+) -> List[Hashable]:
+    """Devuelve el hablante más votado de cada grupo en una sola pasada.
+
+    Se usa para decidir el hablante de cada segmento a partir de los
+    hablantes de sus palabras. Las etiquetas vacías no votan y los grupos
+    sin votos quedan como ``desconocido``.
+    """
+
+    longitudes = np.fromiter((len(grupo) for grupo in grupos), dtype=np.int64, count=len(grupos))
+    ids, catalogo = codificar_hablantes(
+        [etiqueta for grupo in grupos for etiqueta in grupo], desconocido
+    )
+    if not len(ids):
+        return [desconocido] * len(grupos)
+
+    indice_grupo = np.repeat(np.arange(len(grupos)), longitudes)
+    votos = np.bincount(
+        indice_grupo * len(catalogo) + ids, minlength=len(grupos) * len(catalogo)
+    ).reshape(len(grupos), len(catalogo))
+    votos[:, 0] = 0
+    ganadores = votos.argmax(axis=1)
+    ganadores[votos.max(axis=1) == 0] = 0
+    return [catalogo[i] for i in ganadores.tolist()]
+
+
+__all__ = [
+    "codificar_hablantes",
+    "mayoria_por_grupo",
+    "suavizar_hablantes",
+    "suavizar_ids",
+]
@@ -5,59 +5,74 @@
 import argparse
 import builtins
 import io
+import json
 import os
-import re
+import subprocess
 import sys
 import time
 import warnings
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
-
-from utilidades_nombres import cargar_json, guardar_json
-
-# Cargar variables de entorno desde .env
-try:
-    from dotenv import load_dotenv
-    # Buscar el archivo .env en múltiples ubicaciones posibles
-    possible_paths = [
-        Path(__file__).parent.parent.parent / '.env',  # Raíz del proyecto
-        Path.cwd() / '.env',  # Directorio actual
-        Path('/home/coordinador/actas-repfora/.env'),  # Ruta absoluta en producción
-    ]
-
-    loaded = False
-    for env_path in possible_paths:
-        if env_path.exists():
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Cargar variables de entorno desde el .env del proyecto o del directorio
+# actual, antes de importar los módulos que leen su configuración del entorno
+for env_path in (Path(__file__).resolve().parent.parent.parent / ".env", Path.cwd() / ".env"):
+    if env_path.exists():
+        try:
+            from dotenv import load_dotenv
+
             load_dotenv(env_path)
-            loaded = True
-            break
-
-    if not loaded:
-        load_dotenv()  # Intenta cargar desde variables de entorno del sistema
-except ImportError:
-    # dotenv no instalado, intentar leer directamente del archivo .env
-    for env_path in [Path(__file__).parent.parent.parent / '.env', Path('/home/coordinador/actas-repfora/.env')]:
-        if env_path.exists():
+        except ImportError:
+            # dotenv no instalado, leer directamente el archivo .env
             with open(env_path) as f:
                 for line in f:
                     line = line.strip()
                     if line and not line.startswith('#') and '=' in line:
                         key, value = line.split('=', 1)
                         os.environ[key.strip()] = value.strip()
-            break
-
-try:  # noqa: WPS440 - se desea informar errores al usuario final
-    import torch
-    import whisperx
-    from whisperx.diarize import DiarizationPipeline
-except ImportError as exc:  # pragma: no cover - se ejecuta antes de las pruebas
-    print(f"❌ Me faltan librerías: {exc}")
-    print("💡 Instala con: pip install whisperx")
-    sys.exit(1)
+        break
+
+import metricas  # noqa: E402
+from autoajuste import ARCHIVO_PERFIL_DEF, calibrar, cargar_perfil, guardar_perfil  # noqa: E402
+from audio_pcm import AUDIO_EN_DISCO_DEF, decodificar_a_disco, decodificar_audio  # noqa: E402
+from cache_transcripcion import cache_configurada, clave_cache, huella_audio  # noqa: E402
+from eventos import avanzar, emitir_evento, fijar_duracion_audio, iniciar_progreso  # noqa: E402
+from formateador import formatear_salida  # noqa: E402
+from lotes_whisper import transcribir_empaquetado  # noqa: E402
+from segmentar_audio import ajustar_a_parte, buscar_parte  # noqa: E402
+from segmentos_guardados import (  # noqa: E402
+    SUFIJO_SEGMENTOS,
+    VERSION_FORMATO,
+    cargar_segmentos,
+    guardar_segmentos,
+    ruta_segmentos,
+)
+from suavizado_hablantes import mayoria_por_grupo  # noqa: E402
+
+# torch, whisperx y pyannote tardan varios segundos en importarse: se cargan
+# con cargar_librerias() sólo cuando una etapa necesita un modelo, de modo que
+# --help, la validación, la caché y --render-only arrancan enseguida
+torch = None
+whisperx = None
+DiarizationPipeline = None
+
+# Etapas de arranque del proceso; se cargan en las métricas del trabajo en curso
+_etapas_arranque: List[Tuple[str, float]] = []
 
 
 TAMANO_LOTE_DEF = 8
+# Archivos que se transcriben juntos en el modo por lotes (y que están en memoria a la vez)
+ARCHIVOS_POR_LOTE_DEF = int(os.getenv("LOTE_ARCHIVOS", "8"))
+EXTENSIONES_AUDIO = {".wav", ".mp3", ".m4a", ".ogg", ".flac", ".webm", ".mp4", ".opus", ".aac"}
+DIARIZACION_PARALELA_DEF = os.getenv("DIARIZACION_PARALELA", "").lower() in ("1", "true", "si", "sí")
+MODELO_WHISPER = "large"
+MODELO_DIARIZACION = os.getenv("MODELO_DIARIZACION", "pyannote/speaker-diarization-3.1")
+# Cantidad de hablantes esperada; sin valor la estima pyannote
+MIN_HABLANTES = int(os.getenv("MIN_HABLANTES") or 0) or None
+MAX_HABLANTES = int(os.getenv("MAX_HABLANTES") or 0) or None
+IDIOMA = "es"
 TIPO_COMPUTO_DEF = "float16"
 TIPOS_PERMITIDOS = {
     "float16",
@@ -68,33 +83,58 @@ TIPOS_PERMITIDOS = {
 }
 
 
-progreso = 0
+# Modelos ya cargados, reutilizados entre trabajos en el modo --serve
+_modelos: Dict[Tuple[Any, ...], Any] = {}
+# Hilos de CPU del perfil calibrado (None = los de CTranslate2 y torch)
+_hilos_cpu: Optional[int] = None
+
+
+def _duracion_audio(audio_file: str) -> Optional[float]:
+    """Obtiene la duración del audio con ffprobe (``None`` si no se puede)."""
+
+    try:
+        salida = subprocess.run(
+            [
+                "ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+                "-of", "csv=p=0", audio_file,
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30,
+            check=True,
+        ).stdout
+        return round(float(salida.strip()), 2)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
 
 
-def avanzar(paso: int) -> None:
-    """Incrementa y muestra el avance del proceso."""
+def _fin_de_segmentos(resultado: dict) -> float:
+    """Devuelve el instante final del último segmento de ``resultado``."""
 
-    global progreso
-    progreso += paso
-    print(progreso, flush=True)
+    segmentos = resultado.get("segments", []) if isinstance(resultado, dict) else resultado
+    return max((seg.get("end") or 0 for seg in segmentos), default=0.0)
 
 
 def parse_args() -> argparse.Namespace:
     """Define y analiza los argumentos de la línea de comandos."""
 
     parser = argparse.ArgumentParser(description="Script de transcripción para el SENA")
-    parser.add_argument("audio_file", help="Archivo de audio a transcribir")
+    parser.add_argument(
+        "audio_file",
+        nargs="*",
+        help="Archivos de audio (o directorios) a transcribir; con varios se transcriben por lotes",
+    )
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=int(os.getenv("BATCH_SIZE", TAMANO_LOTE_DEF)),
-        help="Tamaño del lote para la transcripción",
+        default=int(os.getenv("BATCH_SIZE")) if os.getenv("BATCH_SIZE") else None,
+        help=f"Tamaño del lote para la transcripción (por defecto el del perfil calibrado o {TAMANO_LOTE_DEF})",
     )
     parser.add_argument(
         "--compute-type",
-        default=os.getenv("COMPUTE_TYPE", TIPO_COMPUTO_DEF),
+        default=os.getenv("COMPUTE_TYPE") or None,
         choices=TIPOS_PERMITIDOS,
-        help="Tipo de cómputo a utilizar",
+        help="Tipo de cómputo a utilizar (por defecto el del perfil calibrado)",
     )
     parser.add_argument(
         "--device",
@@ -106,16 +146,103 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Modo silencioso",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=os.getenv("TRANSCRIPCION_STREAM", "").lower() in ("1", "true", "si", "sí"),
+        help="Emite cada segmento terminado como evento @@SEGMENTO (JSON por línea)",
+    )
+    parser.add_argument(
+        "--audio-mmap",
+        action="store_true",
+        default=AUDIO_EN_DISCO_DEF,
+        help="Decodifica el audio a un archivo PCM en disco (DIRECTORIO_PCM) y lo mapea en memoria",
+    )
+    parser.add_argument(
+        "--diarizacion-paralela",
+        action="store_true",
+        default=DIARIZACION_PARALELA_DEF,
+        help="Diariza en un hilo aparte mientras Whisper transcribe",
+    )
+    parser.add_argument(
+        "--archivos-por-lote",
+        type=int,
+        default=ARCHIVOS_POR_LOTE_DEF,
+        help="Con varios audios, cuántos se transcriben juntos compartiendo los lotes de la GPU",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Mantiene los modelos cargados y atiende trabajos JSON por stdin",
+    )
+    parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help=f"Calibra lote, compute_type e hilos con el audio indicado y los guarda en {ARCHIVO_PERFIL_DEF}",
+    )
+    parser.add_argument(
+        "--render-only",
+        action="store_true",
+        help="Rearma la transcripción desde <audio>_segmentos.npz con los nombres actuales, sin cargar modelos",
+    )
+    args = parser.parse_args()
+    if not args.serve and not args.audio_file:
+        parser.error("se requiere audio_file salvo en modo --serve")
+    if args.serve and args.render_only:
+        parser.error("--render-only no se puede combinar con --serve")
+    if args.autotune and (args.serve or args.render_only):
+        parser.error("--autotune no se puede combinar con --serve ni con --render-only")
+    if args.archivos_por_lote < 1:
+        parser.error("--archivos-por-lote debe ser al menos 1")
+    return args
+
+
+def expandir_audios(rutas: List[str]) -> List[str]:
+    """Reemplaza cada directorio de ``rutas`` por sus archivos de audio, en orden."""
+
+    audios = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            audios.extend(
+                str(archivo)
+                for archivo in sorted(Path(ruta).iterdir())
+                if archivo.is_file() and archivo.suffix.lower() in EXTENSIONES_AUDIO
+            )
+        else:
+            audios.append(ruta)
+    return audios
 
 
-def setup_environment(args: argparse.Namespace) -> Tuple[Optional[str], str]:
-    """Configura variables de entorno y selecciona el dispositivo."""
+def _silenciar_si_corresponde(args: argparse.Namespace) -> None:
+    """Desactiva ``print`` con ``--quiet`` o ``QUIET_MODE``."""
 
     quiet_env = os.getenv("QUIET_MODE", "").lower() not in ("", "0", "false", "no")
     if args.quiet or quiet_env:
         builtins.print = lambda *a, **k: None  # noqa: WPS121
 
+
+def detectar_dispositivo() -> str:
+    """Devuelve ``cuda`` si hay una GPU visible, sin importar torch si se puede.
+
+    CTranslate2 (el motor de faster-whisper) responde lo mismo en una
+    fracción del tiempo; sólo si no está instalado se pregunta a torch.
+    """
+
+    if os.getenv("CUDA_VISIBLE_DEVICES") in ("", "-1"):
+        return "cpu"
+    try:
+        import ctranslate2
+    except ImportError:
+        cargar_librerias()
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
+def setup_environment(args: argparse.Namespace) -> Tuple[Optional[str], str]:
+    """Configura variables de entorno y selecciona el dispositivo."""
+
+    _silenciar_si_corresponde(args)
+
     token_hf = os.getenv("HF_TOKEN")
     if not token_hf:
         print("⚠️  Variable HF_TOKEN no configurada; la diarización no se ejecutará.")
@@ -127,7 +254,7 @@ def setup_environment(args: argparse.Namespace) -> Tuple[Optional[str], str]:
     else:
         print(f"✅ HF_TOKEN configurado correctamente (termina en ...{token_hf[-4:]})")
 
-    device = args.device or ("cuda" if torch.cuda.is_available() else "cpu")
+    device = args.device or detectar_dispositivo()
 
     os.environ["PYTHONIOENCODING"] = "utf-8"
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
@@ -144,91 +271,309 @@ def _ajustar_tipo_computo(device: str, compute_type: str) -> str:
 
     En CPU, `float16` suele provocar errores como:
     ``ValueError: Requested float16 compute type, but the target device or backend do not support efficient float16 computation.``
-    En ese caso forzamos a `float32` para que el modelo cargue correctamente.
+    En ese caso usamos `int8`, que en CPU es bastante más rápido que `float32`.
     """
 
     if device == "cpu" and "float16" in compute_type:
-        print("⚠️  El dispositivo CPU no soporta float16; usando float32.")
-        return "float32"
+        print("⚠️  El dispositivo CPU no soporta float16; usando int8.")
+        return "int8"
     return compute_type
 
 
+def aplicar_perfil(args: argparse.Namespace, device: str) -> None:
+    """Completa lote, ``compute_type`` e hilos con el perfil de ``--autotune``.
+
+    Los valores indicados con argumentos o variables de entorno tienen
+    prioridad; sin perfil se usan los valores por defecto de siempre.
+    """
+
+    global _hilos_cpu  # noqa: WPS420
+    perfil = cargar_perfil(device) or {}
+    if perfil:
+        print(
+            f"⚙️ Usando el perfil calibrado ({ARCHIVO_PERFIL_DEF}): lote {perfil.get('batch_size')}, "
+            f"{perfil.get('compute_type')}, hilos {perfil.get('hilos') or 'automáticos'}"
+        )
+    if args.batch_size is None:
+        args.batch_size = perfil.get("batch_size") or TAMANO_LOTE_DEF
+    if args.compute_type is None:
+        args.compute_type = perfil.get("compute_type") or (
+            TIPO_COMPUTO_DEF if device == "cuda" else "int8"
+        )
+    _hilos_cpu = perfil.get("hilos") if device == "cpu" else None
+    if _hilos_cpu and torch is not None:
+        torch.set_num_threads(_hilos_cpu)
+
+
+def autoajustar(audio_file: str, device: str) -> Dict[str, Any]:
+    """Calibra este equipo con ``audio_file`` y guarda el perfil."""
+
+    print(f"🧪 Calibrando {device} con {audio_file}; cada combinación recarga el modelo...")
+    audio = decodificar_audio(audio_file)
+    cargar_librerias()
+
+    def cargar(compute_type: str, hilos: Optional[int]):
+        opciones = {"threads": hilos} if hilos else {}
+        return whisperx.load_model(MODELO_WHISPER, device, compute_type=compute_type, **opciones)
+
+    perfil = calibrar(audio, device, cargar, IDIOMA)
+    if guardar_perfil(device, perfil):
+        print(f"💾 Perfil guardado en {ARCHIVO_PERFIL_DEF}")
+    else:
+        print(f"⚠️ No pude guardar el perfil en {ARCHIVO_PERFIL_DEF}")
+    print(
+        f"✅ Lote {perfil['batch_size']}, {perfil['compute_type']}, "
+        f"hilos {perfil['hilos'] or 'automáticos'}: {perfil['velocidad']}x tiempo real"
+    )
+    return perfil
+
+
+def cargar_librerias() -> None:
+    """Importa torch, whisperx y pyannote la primera vez que hacen falta."""
+
+    global torch, whisperx, DiarizationPipeline  # noqa: WPS420
+    if whisperx is not None:
+        return
+    inicio = time.perf_counter()
+    try:  # noqa: WPS440 - se desea informar errores al usuario final
+        import torch as _torch
+        import whisperx as _whisperx
+        from whisperx.diarize import DiarizationPipeline as _DiarizationPipeline
+    except ImportError as exc:
+        print(f"❌ Me faltan librerías: {exc}")
+        print("💡 Instala con: pip install whisperx")
+        sys.exit(1)
+    torch, whisperx, DiarizationPipeline = _torch, _whisperx, _DiarizationPipeline
+    _etapas_arranque.append(("importacion", time.perf_counter() - inicio))
+    if _hilos_cpu:
+        torch.set_num_threads(_hilos_cpu)
+
+
+def _registrar_arranque(medidor: metricas.MedidorEtapas) -> None:
+    """Pasa a ``medidor`` las etapas de arranque pendientes (importación, entorno)."""
+
+    while _etapas_arranque:
+        medidor.registrar(*_etapas_arranque.pop(0))
+
+
+def _modelo_en_cache(clave: Tuple[Any, ...], cargador: Callable[[], Any]) -> Any:
+    """Devuelve el modelo guardado en ``clave`` o lo carga con ``cargador``."""
+
+    if clave not in _modelos:
+        cargar_librerias()
+        _modelos[clave] = cargador()
+    return _modelos[clave]
+
+
+def cargar_modelo_whisper(device: str, compute_type: str, hilos: Optional[int] = None):
+    """Carga (una sola vez por proceso) el modelo WhisperX.
+
+    ``hilos`` fija los hilos de CPU de CTranslate2 (por defecto los del
+    perfil calibrado); sólo se aplica en la primera carga del modelo.
+    """
+
+    hilos = hilos or _hilos_cpu
+    opciones = {"threads": hilos} if hilos else {}
+
+    def cargar():
+        print("🤖 Cargando el modelo WhisperX...")
+        print(" Esto puede tardar un poco la primera vez...")
+        if device == "cuda":
+            torch.backends.cudnn.benchmark = True
+            torch.set_float32_matmul_precision("high")
+        try:
+            modelo = whisperx.load_model(MODELO_WHISPER, device, compute_type=compute_type, **opciones)
+        except ValueError as exc:
+            if "float16" in compute_type and device != "cuda":
+                print(f"⚠️  {exc}")
+                print("🔄 Reintentando con compute_type=float32...")
+                modelo = whisperx.load_model("medium", device, compute_type="float32", **opciones)
+            else:
+                raise
+        print("✅ Modelo cargado correctamente")
+        return modelo
+
+    return _modelo_en_cache(("whisper", device, compute_type), cargar)
+
+
+def cargar_modelo_alineacion(device: str):
+    """Carga (una sola vez por proceso) el modelo de alineación en español."""
+
+    return _modelo_en_cache(
+        ("alineacion", device),
+        lambda: whisperx.load_align_model(language_code=IDIOMA, device=device),
+    )
+
+
+def cargar_pipeline_diarizacion(token_hf: str, device: str):
+    """Crea (una sola vez por proceso) el pipeline de diarización."""
+
+    return _modelo_en_cache(
+        ("diarizacion", MODELO_DIARIZACION, device),
+        lambda: DiarizationPipeline(
+            model_name=MODELO_DIARIZACION, use_auth_token=token_hf, device=device
+        ),
+    )
+
+
+def liberar_modelos() -> None:
+    """Descarta los modelos cargados y libera la memoria de la GPU."""
+
+    _modelos.clear()
+    if torch is None:
+        return
+    try:
+        torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
 def ejecutar_transcripcion(
     audio_file: str,
     device: str,
     batch_size: int,
     compute_type: str,
+    audio=None,
+    al_transcribir_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
 ):
-    """Realiza la transcripción y la alineación de palabras."""
+    """Realiza la transcripción y la alineación de palabras.
 
-    print(f"📁 ¡Perfecto! Encontré el archivo: {audio_file}")
-    print("🤖 Cargando el modelo WhisperX...")
-    print(" Esto puede tardar un poco la primera vez...")
+    Si se indica ``audio`` (la forma de onda ya decodificada), se usa en
+    lugar de volver a leer ``audio_file``. ``al_transcribir_segmento`` se
+    llama con cada segmento en cuanto Whisper lo transcribe, todavía sin
+    alinear ni hablante.
+    """
 
-    if device == "cuda":
-        torch.backends.cudnn.benchmark = True
-        torch.set_float32_matmul_precision("high")
+    print(f"📁 ¡Perfecto! Encontré el archivo: {audio_file}")
+    fuente = audio_file if audio is None else audio
 
     compute_type_ajustado = _ajustar_tipo_computo(device, compute_type)
-
-    try:
-        modelo_whisper = whisperx.load_model("large", device, compute_type=compute_type_ajustado)
-    except ValueError as exc:
-        if "float16" in compute_type_ajustado and device != "cuda":
-            print(f"⚠️  {exc}")
-            print("🔄 Reintentando con compute_type=float32...")
-            modelo_whisper = whisperx.load_model("medium", device, compute_type="float32")
-        else:
-            raise
-    print("✅ Modelo cargado correctamente")
-    avanzar(10)
+    with metricas.etapa("carga_modelo_whisper"):
+        modelo_whisper = cargar_modelo_whisper(device, compute_type_ajustado)
+    avanzar(10, "carga_modelo")
 
     print(f"🎙️ Comenzando transcripción de: {audio_file}")
+    with metricas.etapa("transcripcion"):
+        try:
+            if al_transcribir_segmento is not None:
+                resultado = _transcribir_en_vivo(
+                    modelo_whisper, fuente, batch_size, al_transcribir_segmento
+                )
+            else:
+                resultado = _transcribir_completo(modelo_whisper, fuente, batch_size)
+        except Exception as exc:  # noqa: WPS440
+            print(f"❌ Error durante la transcripción: {exc}")
+            sys.exit(1)
+
+    audio_transcrito = _fin_de_segmentos(resultado)
+    avanzar(20, "transcripcion", audio_transcrito)
+    return modelo_whisper, alinear(resultado, fuente, device)
+
+
+def _transcribir_en_vivo(modelo_whisper, fuente: Any, batch_size: int, al_transcribir_segmento) -> dict:
+    """Transcribe ``fuente`` avisando cada segmento apenas sale de su lote."""
+
+    if isinstance(fuente, str):
+        # Sin la forma de onda no se pueden armar los lotes a mano
+        resultado = _transcribir_completo(modelo_whisper, fuente, batch_size)
+        for segmento in resultado.get("segments", []):
+            al_transcribir_segmento(segmento)
+        return resultado
+    _indice, resultado = next(
+        transcribir_empaquetado(
+            modelo_whisper,
+            [fuente],
+            batch_size,
+            IDIOMA,
+            lambda _indice, segmento: al_transcribir_segmento(segmento),
+        )
+    )
+    print("✅ Transcripción completada")
+    return resultado
+
+
+def _transcribir_completo(modelo_whisper, fuente: Any, batch_size: int) -> dict:
+    """Transcribe ``fuente`` de una vez, bajando de parámetros si WhisperX no los acepta."""
+
     try:
+        resultado = modelo_whisper.transcribe(
+            fuente,
+            language=IDIOMA,
+            batch_size=batch_size,
+            condition_on_previous_text=False,
+            no_speech_threshold=0.6,
+            logprob_threshold=-1.0,
+            compression_ratio_threshold=2.4,
+            temperature=0.0,
+        )
+        print("✅ Transcripción avanzada completada")
+    except TypeError as err:
+        print(f"⚠️ Parámetros avanzados no funcionaron: {err}")
+        print("🔄 Intentando con parámetros básicos...")
         try:
             resultado = modelo_whisper.transcribe(
-                audio_file,
-                language="es",
-                batch_size=batch_size,
-                condition_on_previous_text=False,
-                no_speech_threshold=0.6,
-                logprob_threshold=-1.0,
-                compression_ratio_threshold=2.4,
-                temperature=0.0,
+                fuente, language=IDIOMA, batch_size=batch_size
             )
-            print("✅ Transcripción avanzada completada")
-        except TypeError as err:
-            print(f"⚠️ Parámetros avanzados no funcionaron: {err}")
-            print("🔄 Intentando con parámetros básicos...")
-            try:
-                resultado = modelo_whisper.transcribe(
-                    audio_file, language="es", batch_size=batch_size
-                )
-                print("✅ Transcripción básica completada")
-            except TypeError:
-                resultado = modelo_whisper.transcribe(audio_file, language="es")
-                print("✅ Transcripción mínima completada")
-    except Exception as exc:  # noqa: WPS440
-        print(f"❌ Error durante la transcripción: {exc}")
-        sys.exit(1)
+            print("✅ Transcripción básica completada")
+        except TypeError:
+            resultado = modelo_whisper.transcribe(fuente, language=IDIOMA)
+            print("✅ Transcripción mínima completada")
+    return resultado
+
 
-    avanzar(10)
+def alinear(resultado: dict, fuente: Any, device: str) -> dict:
+    """Alinea las palabras de ``resultado``; si falla, lo devuelve sin alinear."""
 
     print("🔤 Alineando palabras para mayor precisión...")
     try:
-        modelo_alineacion, metadatos = whisperx.load_align_model(
-            language_code="es", device=device
-        )
-        resultado_alineado = whisperx.align(
-            resultado["segments"], modelo_alineacion, metadatos, audio_file, device
-        )
+        with metricas.etapa("carga_alineacion"):
+            modelo_alineacion, metadatos = cargar_modelo_alineacion(device)
+        with metricas.etapa("alineacion"):
+            resultado_alineado = whisperx.align(
+                resultado["segments"], modelo_alineacion, metadatos, fuente, device
+            )
         print("✅ Alineación completada correctamente")
     except Exception as exc:  # noqa: WPS440
         print(f"⚠️ Problemas con la alineación: {exc}")
         print("🔄 Continuando sin alineación precisa...")
         resultado_alineado = resultado
-        avanzar(10)
-    return modelo_whisper, resultado_alineado
+    avanzar(10, "alineacion", _fin_de_segmentos(resultado))
+    return resultado_alineado
+
+
+def diarizar(fuente: Any, device: str, token_hf: str):
+    """Ejecuta el pipeline de diarización sobre ``fuente`` (ruta o forma de onda).
+
+    Sólo necesita el audio, así que puede correr mientras Whisper
+    transcribe. Devuelve ``(segmentos, huellas)``, con la huella de voz de
+    cada hablante (o ``None`` si la versión de WhisperX no las entrega), o
+    ``None`` si la diarización falla.
+    """
+
+    print("👥 Aplicando separación de hablantes...")
+    try:
+        with metricas.etapa("carga_diarizacion"):
+            pipeline = cargar_pipeline_diarizacion(token_hf, device)
+        print(f"🖥️ Diarización usando dispositivo: {device}")
+        with metricas.etapa("diarizacion"):
+            if device == "cuda":
+                # Stream propio para no serializarse detrás de Whisper en la GPU
+                with torch.cuda.stream(torch.cuda.Stream()):
+                    return _diarizar_con_huellas(pipeline, fuente)
+            return _diarizar_con_huellas(pipeline, fuente)
+    except Exception as exc:  # noqa: WPS440
+        print(f"⚠️ Problemas con la diarización: {exc}")
+        print("🔄 Continuando sin separación de hablantes...")
+        return None
+
+
+def _diarizar_con_huellas(pipeline, fuente: Any):
+    hablantes = {"min_speakers": MIN_HABLANTES, "max_speakers": MAX_HABLANTES}
+    try:
+        return pipeline(fuente, return_embeddings=True, **hablantes)
+    except TypeError:
+        # Versiones de WhisperX sin huellas de voz
+        return pipeline(fuente, **hablantes), None
 
 
 def ejecutar_diarizacion(
@@ -236,280 +581,303 @@ def ejecutar_diarizacion(
     audio_file: str,
     device: str,
     token_hf: Optional[str],
+    audio=None,
+    diarizacion_en_curso: Optional[Future] = None,
 ):
-    """Aplica la diarización para separar hablantes."""
+    """Aplica la diarización para separar hablantes.
+
+    Como en :func:`ejecutar_transcripcion`, ``audio`` evita volver a
+    decodificar ``audio_file``. Si la diarización ya se lanzó en paralelo,
+    ``diarizacion_en_curso`` es su futuro y aquí sólo se espera y se
+    combina con las palabras. Las huellas de voz quedan en
+    ``resultado_alineado["speaker_embeddings"]``, como en WhisperX.
+    """
 
     segmentos_hablantes = None
+    huellas = None
     if token_hf:
-        print("👥 Aplicando separación de hablantes...")
+        if diarizacion_en_curso is not None:
+            diarizacion = diarizacion_en_curso.result()
+        else:
+            diarizacion = diarizar(audio_file if audio is None else audio, device, token_hf)
+        if diarizacion is not None:
+            segmentos_hablantes, huellas = diarizacion
+    if segmentos_hablantes is not None:
         try:
-            pipeline = DiarizationPipeline(use_auth_token=token_hf, device=device)
-            print(f"🖥️ Diarización usando dispositivo: {device}")
-            segmentos_hablantes = pipeline(audio_file)
-            resultado_alineado = whisperx.assign_word_speakers(
-                segmentos_hablantes, resultado_alineado
-            )
-            for segment in resultado_alineado.get("segments", []):
-                speakers = [
-                    word.get("speaker")
-                    for word in segment.get("words", [])
-                    if word.get("speaker")
-                ]
-                segment["speaker"] = (
-                    max(set(speakers), key=speakers.count)
-                    if speakers
-                    else "DESCONOCIDO"
+            with metricas.etapa("asignacion_hablantes"):
+                resultado_alineado = whisperx.assign_word_speakers(
+                    segmentos_hablantes, resultado_alineado
+                )
+                segmentos = resultado_alineado.get("segments", [])
+                hablantes = mayoria_por_grupo(
+                    [[word.get("speaker") for word in seg.get("words", [])] for seg in segmentos]
                 )
+                for segment, speaker in zip(segmentos, hablantes):
+                    segment["speaker"] = speaker
+                if huellas:
+                    resultado_alineado["speaker_embeddings"] = {
+                        hablante: [float(valor) for valor in huella]
+                        for hablante, huella in huellas.items()
+                    }
             print("✅ Separación de hablantes completada")
         except Exception as exc:  # noqa: WPS440
             print(f"⚠️ Problemas con la diarización: {exc}")
             print("🔄 Continuando sin separación de hablantes...")
-    else:
+    elif not token_hf:
         print("⚠️  Se omitirá la diarización porque HF_TOKEN no está configurado.")
         print("💡  Establece la variable de entorno HF_TOKEN para habilitar la separación de hablantes.")
-        avanzar(10)
-        print("75", flush=True)
+    avanzar(15, "diarizacion")
 
     return resultado_alineado, segmentos_hablantes
 
-def formatear_salida(
-    resultado_alineado: dict,
-    segmentos_hablantes: Optional[dict],
-    nombre_sin_extension: str,
+
+def _decodificar(audio_file: str, audio_en_disco: bool):
+    """Decodifica ``audio_file`` una vez; ``None`` si ffmpeg no pudo."""
+
+    with metricas.etapa("decodificacion"):
+        try:
+            return decodificar_a_disco(audio_file) if audio_en_disco else decodificar_audio(audio_file)
+        except (OSError, RuntimeError) as exc:
+            print(f"⚠️ {exc}")
+            return None
+
+
+def transcribir_y_diarizar(
+    audio_file: str,
+    device: str,
+    batch_size: int,
+    compute_type: str,
+    token_hf: Optional[str],
+    cache=None,
+    audio_en_disco: bool = False,
+    diarizacion_paralela: bool = False,
+    al_transcribir_segmento: Optional[Callable[[Dict[str, Any]], None]] = None,
 ):
-    """Procesa el resultado y guarda la transcripción en disco."""
-
-    archivo_nombres = "hablantes.json"
-    if not os.path.exists(archivo_nombres):
-        print(f"ℹ️ No encontré {archivo_nombres}, crearé uno nuevo")
-    mapeo_nombres = cargar_json(archivo_nombres, {})
-
-    archivo_mapeo_global = "mapeo_hablantes_global.json"
-    if not os.path.exists(archivo_mapeo_global):
-        print("ℹ️ Creando nuevo sistema de mapeo de hablantes")
-    hablantes_globales = cargar_json(archivo_mapeo_global, {})
-    contador_global = (
-        max(
-            [
-                int(h.split("_")[1])
-                for h in hablantes_globales.values()
-                if h.startswith("HABLANTE_")
-            ],
-            default=0,
+    """Transcribe, alinea y diariza ``audio_file``, o lo toma de ``cache``.
+
+    El audio se decodifica una sola vez y la misma forma de onda se usa
+    para la huella, la transcripción, la alineación y la diarización. Con
+    ``audio_en_disco`` esa forma de onda es un ``np.memmap`` sobre un
+    archivo local, para reuniones largas. Con ``diarizacion_paralela`` la
+    diarización corre en un hilo mientras Whisper transcribe y alinea, y
+    ambos resultados se juntan al asignar hablantes. Sólo se guardan en la
+    caché los resultados completos: si la diarización se pidió y falló, el
+    audio se vuelve a procesar la próxima vez. ``al_transcribir_segmento``
+    recibe los segmentos provisionales de Whisper (ver
+    :func:`ejecutar_transcripcion`).
+    """
+
+    audio = _decodificar(audio_file, audio_en_disco)
+    if audio is None:
+        print("🔄 Cada etapa leerá el archivo por su cuenta...")
+    huella = _huella_del_audio(audio)
+    clave, guardado = _buscar_en_cache(cache, huella, compute_type, token_hf)
+    if guardado is not None:
+        return guardado
+
+    fuente = audio_file if audio is None else audio
+    cargar_librerias()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarizacion") as hilo:
+        diarizacion_en_curso = None
+        if diarizacion_paralela and token_hf:
+            print("🔀 Diarizando en paralelo con la transcripción...")
+            diarizacion_en_curso = hilo.submit(diarizar, fuente, device, token_hf)
+        _modelo_whisper, resultado = ejecutar_transcripcion(
+            audio_file, device, batch_size, compute_type, audio, al_transcribir_segmento
+        )
+        resultado, segmentos_hablantes = ejecutar_diarizacion(
+            resultado, audio_file, device, token_hf, audio, diarizacion_en_curso
         )
-        + 1
+    if huella:
+        resultado["huella_audio"] = huella
+    _guardar_en_cache(cache, clave, resultado, segmentos_hablantes, token_hf)
+    return resultado, segmentos_hablantes
+
+
+def _huella_del_audio(audio) -> Optional[str]:
+    """Devuelve la huella del audio decodificado, o ``None`` si no se decodificó.
+
+    Es la clave de la caché y también la de la grabación en el registro de
+    hablantes, así que dos reuniones con el mismo nombre de archivo no se
+    confunden.
+    """
+
+    if audio is None:
+        return None
+    with metricas.etapa("huella_audio"):
+        return huella_audio(audio)
+
+
+def _buscar_en_cache(cache, huella: Optional[str], compute_type: str, token_hf: Optional[str]):
+    """Devuelve la clave de ``huella`` en ``cache`` y el resultado guardado, si hay.
+
+    La clave es la huella del audio decodificado junto con el modelo, el
+    ``compute_type``, el idioma y la configuración de la diarización
+    (modelo de pyannote y cantidad de hablantes), o ``None`` si no se pidió.
+    """
+
+    if cache is None or huella is None:
+        return None, None
+    clave = clave_cache(
+        huella,
+        {
+            "modelo": MODELO_WHISPER,
+            "compute_type": compute_type,
+            "idioma": IDIOMA,
+            "diarizacion": {
+                "modelo": MODELO_DIARIZACION,
+                "min_hablantes": MIN_HABLANTES,
+                "max_hablantes": MAX_HABLANTES,
+            }
+            if token_hf
+            else None,
+            "formato": VERSION_FORMATO,
+        },
     )
+    with metricas.etapa("lectura_cache"):
+        guardado = cache.obtener(clave)
+    if guardado is None:
+        return clave, None
+    resultado, diarizado = guardado
+    resultado["huella_audio"] = huella
+    avanzar(55, "cache", _fin_de_segmentos(resultado))
+    # formatear_salida sólo mira si hubo diarización, no su contenido
+    return clave, (resultado, {} if diarizado else None)
+
+
+def _guardar_en_cache(cache, clave, resultado, segmentos_hablantes, token_hf: Optional[str]) -> None:
+    """Guarda ``resultado`` si está completo: si la diarización falló, no."""
 
-    def asignar_hablante_global(speaker_local: str) -> str:
-        nonlocal contador_global, hablantes_globales
-        if not speaker_local or speaker_local == "DESCONOCIDO":
-            return "DESCONOCIDO"
-        if speaker_local in hablantes_globales:
-            return hablantes_globales[speaker_local]
-        nuevo_hablante = f"HABLANTE_{contador_global}"
-        hablantes_globales[speaker_local] = nuevo_hablante
-        contador_global += 1
-        print(f"🆕 Nuevo hablante detectado: {speaker_local} → {nuevo_hablante}")
-        if not guardar_json(archivo_mapeo_global, hablantes_globales):
-            print("⚠️ No pude guardar el mapeo")
-        return nuevo_hablante
-
-    def obtener_nombre_final(hablante_global: str) -> str:
-        if not hablante_global or hablante_global == "DESCONOCIDO":
-            return "HABLANTE DESCONOCIDO"
-        if hablante_global in mapeo_nombres:
-            return mapeo_nombres[hablante_global]
+    if clave and (not token_hf or segmentos_hablantes is not None):
         try:
-            if "_" in hablante_global:
-                numero = hablante_global.split("_")[1]
-                return f"HABLANTE {numero}"
-            return f"HABLANTE {hablante_global}"
-        except (IndexError, ValueError):
-            return f"HABLANTE {hablante_global}"
-
-    def limpiar_texto_repetitivo(texto: str) -> str:
-        texto = re.sub(r"\b(no|sí|ah|eh|mm|um)\s*(?:\1\s*){4,}", r"\1 ", texto, flags=re.IGNORECASE)
-        texto = re.sub(r"(?:no,?\s*){5,}", "no ", texto, flags=re.IGNORECASE)
-        texto = re.sub(r",\s*,\s*,+", ", ", texto)
-        texto = re.sub(r"\s+", " ", texto)
-        return texto.strip()
-
-    def formatear_texto_final(texto_final: str) -> str:
-        print("🎨 Aplicando formato final al texto...")
-        patron = r"(INTERVIENE HABLANTE \w+:)"
-        partes = re.split(patron, texto_final)
-        texto_formateado = ""
-        i = 0
-        while i < len(partes):
-            parte = partes[i].strip()
-            if parte.startswith("INTERVIENE HABLANTE"):
-                if i + 1 < len(partes):
-                    texto_intervencion = partes[i + 1].strip()
-                    texto_intervencion = re.sub(r"\s+", " ", texto_intervencion)
-                    texto_intervencion = texto_intervencion.strip()
-                    if texto_formateado:
-                        texto_formateado += "\n\n"
-                    texto_formateado += f"{parte} {texto_intervencion}"
-                    i += 2
-                else:
-                    i += 1
-            else:
-                if parte and not parte.startswith("---"):
-                    if texto_formateado and not parte.startswith("INTERVIENE"):
-                        texto_formateado += " " + parte
-                elif parte.startswith("---"):
-                    texto_formateado += f"\n\n{parte}\n\n"
-                i += 1
-        return texto_formateado.strip()
-
-    def procesar_segmentos_con_hablantes(resultado_proc: dict) -> str:
-        segmentos = (
-            resultado_proc["segments"] if isinstance(resultado_proc, dict) else resultado_proc
-        )
-        print(f"🎯 Procesando {len(segmentos)} segmentos de audio...")
-        segmentos_procesados = []
-        for i, seg in enumerate(segmentos):
-            tiempo_inicio = seg.get("start", 0)
-            texto_segmento = seg.get("text", "").strip()
-            if not texto_segmento:
-                continue
-            texto_segmento = re.sub(r"\s+", " ", texto_segmento.strip())
-            hablante_local = seg.get("speaker") or "DESCONOCIDO"
-            if hablante_local != "DESCONOCIDO":
-                hablante_global = asignar_hablante_global(hablante_local)
-            else:
-                hablante_global = "DESCONOCIDO"
-            segmentos_procesados.append(
+            cache.guardar(clave, resultado, segmentos_hablantes is not None)
+        except OSError as exc:
+            print(f"⚠️ No pude guardar en la caché: {exc}")
+
+
+def emitir_segmento(segmento: Dict[str, Any]) -> None:
+    """Publica un segmento terminado como evento ``@@SEGMENTO``."""
+
+    emitir_evento("SEGMENTO", segmento)
+
+
+def emisor_provisional(audio_file: str) -> Callable[[Dict[str, Any]], None]:
+    """Devuelve la función que publica los segmentos de Whisper como provisionales.
+
+    Salen como ``@@SEGMENTO`` con ``"provisional": true`` y sin hablante, en
+    los tiempos del audio original si ``audio_file`` es una parte. Los
+    segmentos definitivos, con hablante, llegan después desde el formateo
+    y los reemplazan.
+    """
+
+    parte = buscar_parte(audio_file)
+    desplazamiento = parte["inicio"] if parte is not None else 0.0
+
+    def emitir(segmento: Dict[str, Any]) -> None:
+        texto = (segmento.get("text") or "").strip()
+        if texto:
+            emitir_segmento(
                 {
-                    "indice": i,
-                    "tiempo": tiempo_inicio,
-                    "hablante": hablante_global,
-                    "texto": texto_segmento,
+                    "inicio": round((segmento.get("start") or 0.0) + desplazamiento, 3),
+                    "fin": round((segmento.get("end") or 0.0) + desplazamiento, 3),
+                    "hablante": None,
+                    "texto": texto,
+                    "provisional": True,
                 }
             )
 
-        for i in range(len(segmentos_procesados)):
-            seg_actual = segmentos_procesados[i]
-            contexto_anterior = []
-            contexto_posterior = []
-            for j in range(max(0, i - 3), i):
-                contexto_anterior.append(segmentos_procesados[j]["hablante"])
-            for j in range(i + 1, min(len(segmentos_procesados), i + 4)):
-                contexto_posterior.append(segmentos_procesados[j]["hablante"])
-            if contexto_anterior and contexto_posterior and seg_actual["hablante"] != "DESCONOCIDO":
-                hablante_anterior = max(set(contexto_anterior), key=contexto_anterior.count)
-                hablante_posterior = max(set(contexto_posterior), key=contexto_posterior.count)
-                if (
-                    hablante_anterior == hablante_posterior
-                    and seg_actual["hablante"] != hablante_anterior
-                    and hablante_anterior != "DESCONOCIDO"
-                ):
-                    seg_actual["hablante"] = hablante_anterior
-
-        grupos = []
-        grupo_actual = None
-        for seg in segmentos_procesados:
-            if grupo_actual is None:
-                grupo_actual = {
-                    "hablante": seg["hablante"],
-                    "textos": [seg["texto"]],
-                    "tiempo_inicio": seg["tiempo"],
-                    "cantidad_segmentos": 1,
-                }
-            elif seg["hablante"] == grupo_actual["hablante"]:
-                grupo_actual["textos"].append(seg["texto"])
-                grupo_actual["cantidad_segmentos"] += 1
-            else:
-                grupos.append(grupo_actual)
-                grupo_actual = {
-                    "hablante": seg["hablante"],
-                    "textos": [seg["texto"]],
-                    "tiempo_inicio": seg["tiempo"],
-                    "cantidad_segmentos": 1,
-                }
-        if grupo_actual:
-            grupos.append(grupo_actual)
-
-        texto_final = ""
-        for grupo in grupos:
-            nombre_para_mostrar = obtener_nombre_final(grupo["hablante"])
-            texto_del_grupo = " ".join(grupo["textos"])
-            texto_del_grupo = limpiar_texto_repetitivo(texto_del_grupo)
-            if len(texto_del_grupo) > 3:
-                texto_final += f"INTERVIENE {nombre_para_mostrar}: {texto_del_grupo} "
-        if not texto_final.strip():
-            print("⚠️ No se pudo asignar hablantes, usando método de respaldo...")
-            texto_final = "INTERVIENE HABLANTE DESCONOCIDO: "
-            for seg in segmentos:
-                texto_seg = seg.get("text", "").strip()
-                if texto_seg:
-                    texto_final += texto_seg + " "
-        return texto_final.strip()
+    return emitir
 
-    if segmentos_hablantes is not None:
-        texto_transcrito_final = procesar_segmentos_con_hablantes(resultado_alineado)
-    else:
-        print("📝 Sin separación de hablantes, procesando como hablante único...")
-        texto_transcrito_final = "INTERVIENE HABLANTE DESCONOCIDO: "
-        segmentos = (
-            resultado_alineado["segments"] if isinstance(resultado_alineado, dict) else resultado_alineado
-        )
-        for seg in segmentos:
-            texto_seg = seg.get("text", "").strip()
-            if texto_seg:
-                texto_seg = limpiar_texto_repetitivo(texto_seg)
-                if texto_seg.strip():
-                    texto_transcrito_final += texto_seg + " "
 
-    texto_transcrito_final = limpiar_texto_repetitivo(texto_transcrito_final)
-    texto_transcrito_final = formatear_texto_final(texto_transcrito_final)
-    avanzar(10)
+def guardar_y_formatear(
+    audio_file: str,
+    resultado: dict,
+    segmentos_hablantes: Optional[dict],
+    transmitir: bool = False,
+) -> Tuple[str, int]:
+    """Guarda los segmentos de ``audio_file`` y escribe su transcripción."""
 
-    archivo_salida = f"{nombre_sin_extension}_transcripcion.txt"
-    with open(archivo_salida, "w", encoding="utf-8") as handle:
-        handle.write(texto_transcrito_final)        
+    nombre_sin_extension = audio_file.rsplit(".", 1)[0]
+    parte = buscar_parte(audio_file)
+    if parte is not None:
+        # Parte de segmentar_audio.py: tiempos del audio original y sin solapes
+        resultado = ajustar_a_parte(resultado, parte)
+    with metricas.etapa("guardado_segmentos"):
+        try:
+            guardar_segmentos(
+                resultado, segmentos_hablantes is not None, ruta_segmentos(nombre_sin_extension)
+            )
+        except OSError as exc:
+            print(f"⚠️ No pude guardar los segmentos: {exc}")
+    with metricas.etapa("formato"):
+        return formatear_salida(
+            resultado,
+            segmentos_hablantes,
+            nombre_sin_extension,
+            emitir_segmento if transmitir else None,
+        )
 
-    avanzar(10)
-    return texto_transcrito_final, archivo_salida
 
-def main() -> None:
-    """Punto de entrada principal del script."""
-
-    args = parse_args()
-    token_hf, device = setup_environment(args)
-    avanzar(10)
+def procesar_audio(
+    audio_file: str,
+    device: str,
+    batch_size: int,
+    compute_type: Optional[str],
+    token_hf: Optional[str],
+    transmitir: bool = False,
+    audio_en_disco: bool = False,
+    diarizacion_paralela: bool = False,
+) -> Tuple[str, int]:
+    """Transcribe, diariza y formatea ``audio_file``.
+
+    Con ``transmitir`` cada segmento se emite como evento ``@@SEGMENTO``
+    dos veces: provisional, sin hablante, en cuanto Whisper lo transcribe,
+    y definitivo, con su hablante, mientras se arma la transcripción. Con
+    ``audio_en_disco`` el audio decodificado se mapea desde disco en lugar
+    de mantenerse en memoria y con ``diarizacion_paralela`` la diarización
+    corre a la vez que la transcripción.
+
+    Returns
+    -------
+    Tuple[str, int]
+        Ruta del archivo generado y cantidad de intervenciones.
+    """
 
-    audio_file = args.audio_file
     if not os.path.exists(audio_file):
         print(f"❌ No encontré el archivo: {audio_file}")
         print("💡 Verifica que el nombre y la ruta estén correctos")
         sys.exit(1)
 
     nombre_sin_extension = audio_file.rsplit(".", 1)[0]
-    avanzar(10)
-
-    compute_type = args.compute_type or (
-        "float16" if device == "cuda" else "int8"
+    duracion_audio = _duracion_audio(audio_file)
+    fijar_duracion_audio(duracion_audio)
+    medidor = metricas.iniciar_medicion(audio_file, duracion_audio)
+    _registrar_arranque(medidor)
+    avanzar(10, "validacion")
+
+    # La clave de la caché usa el compute_type que realmente se ejecuta,
+    # igual que en el modo por lotes
+    compute_type = _ajustar_tipo_computo(
+        device, compute_type or ("float16" if device == "cuda" else "int8")
     )
 
     tiempo_inicio = time.time()
-    modelo_whisper, resultado = ejecutar_transcripcion(
-        audio_file, device, args.batch_size, compute_type
-    )
-    resultado, segmentos_hablantes = ejecutar_diarizacion(
-        resultado, audio_file, device, token_hf
+    resultado, segmentos_hablantes = transcribir_y_diarizar(
+        audio_file,
+        device,
+        batch_size,
+        compute_type,
+        token_hf,
+        cache_configurada(),
+        audio_en_disco,
+        diarizacion_paralela,
+        emisor_provisional(audio_file) if transmitir else None,
     )
-    texto_transcrito_final, archivo_salida = formatear_salida(
-        resultado, segmentos_hablantes, nombre_sin_extension
+    archivo_salida, intervenciones = guardar_y_formatear(
+        audio_file, resultado, segmentos_hablantes, transmitir
     )
-    print("90", flush=True)
-
-    try:
-        del modelo_whisper
-        torch.cuda.empty_cache()
-    except Exception:
-        pass
-    avanzar(10)
+    _registrar_arranque(medidor)
+    metricas.exportar_metricas(medidor, f"{nombre_sin_extension}_metricas.json")
 
     tiempo_final = time.time()
     tiempo_total_segundos = round(tiempo_final - tiempo_inicio, 2)
@@ -517,13 +885,259 @@ def main() -> None:
     print("✅ ¡Transcripción y separación de hablantes completadas!")
     print(f"⏱️ Tiempo total: {tiempo_total_minutos} minutos")
     print(f"📄 Texto guardado en: {archivo_salida}")
-    intervenciones = [
-        linea for linea in texto_transcrito_final.split("\n") if linea.strip().startswith("INTERVIENE")
-    ]
-    print(f"👥 Total de intervenciones detectadas: {len(intervenciones)}")
-    avanzar(10)
+    print(f"👥 Total de intervenciones detectadas: {intervenciones}")
+    avanzar(10, "fin")
+    return archivo_salida, intervenciones
+
+
+def procesar_lote(
+    audio_files: List[str],
+    device: str,
+    batch_size: int,
+    compute_type: Optional[str],
+    token_hf: Optional[str],
+    audio_en_disco: bool = False,
+    diarizacion_paralela: bool = False,
+    archivos_por_lote: int = ARCHIVOS_POR_LOTE_DEF,
+) -> List[Tuple[str, str, int]]:
+    """Transcribe varios audios cargando los modelos una sola vez.
+
+    Los audios se toman de a ``archivos_por_lote``. Dentro de cada grupo las
+    ventanas de voz de todos los archivos se reparten en lotes de
+    ``batch_size`` llenos (ver :mod:`lotes_whisper`), y cada archivo se
+    alinea, diariza y escribe en cuanto termina su última ventana. Los que
+    están en la caché se escriben sin pasar por Whisper y los que no se
+    pueden leer se saltan.
+
+    Returns
+    -------
+    List[Tuple[str, str, int]]
+        Audio, archivo generado y cantidad de intervenciones de cada
+        archivo transcrito.
+    """
+
+    faltantes = [audio_file for audio_file in audio_files if not os.path.exists(audio_file)]
+    for audio_file in faltantes:
+        print(f"⚠️ No encontré el archivo, lo salto: {audio_file}")
+    audio_files = [audio_file for audio_file in audio_files if audio_file not in faltantes]
+    if not audio_files:
+        print("❌ No hay audios para transcribir")
+        sys.exit(1)
+
+    compute_type = _ajustar_tipo_computo(
+        device, compute_type or ("float16" if device == "cuda" else "int8")
+    )
+    cache = cache_configurada()
+    tiempo_inicio = time.time()
+    duraciones = [_duracion_audio(audio_file) for audio_file in audio_files]
+    medidor = metricas.iniciar_medicion(
+        f"lote de {len(audio_files)} audios", sum(duracion or 0 for duracion in duraciones) or None
+    )
+    _registrar_arranque(medidor)
+    print(f"📚 Transcribiendo {len(audio_files)} audios en grupos de {archivos_por_lote}")
+
+    generados = []
+    for inicio in range(0, len(audio_files), archivos_por_lote):
+        grupo = audio_files[inicio:inicio + archivos_por_lote]
+        pendientes = []
+        for audio_file in grupo:
+            audio = _decodificar(audio_file, audio_en_disco)
+            if audio is None:
+                print(f"⚠️ Salto {audio_file}: no pude decodificarlo")
+                continue
+            huella = _huella_del_audio(audio)
+            clave, guardado = _buscar_en_cache(cache, huella, compute_type, token_hf)
+            if guardado is not None:
+                generados.append((audio_file, *guardar_y_formatear(audio_file, *guardado)))
+                continue
+            pendientes.append((audio_file, audio, clave, huella))
+        if not pendientes:
+            continue
+
+        # Los modelos se cargan recién cuando un audio no está en la caché
+        with metricas.etapa("carga_modelo_whisper"):
+            modelo_whisper = cargar_modelo_whisper(device, compute_type)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarizacion") as hilo:
+            # En paralelo, la diarización de todo el grupo avanza mientras Whisper transcribe
+            diarizaciones = [
+                hilo.submit(diarizar, audio, device, token_hf)
+                if diarizacion_paralela and token_hf
+                else None
+                for _audio_file, audio, _clave, _huella in pendientes
+            ]
+            terminados = transcribir_empaquetado(
+                modelo_whisper, [audio for _audio_file, audio, _clave, _huella in pendientes], batch_size, IDIOMA
+            )
+            # El tiempo de Whisper se mide aparte: entre archivo y archivo se alinea y diariza
+            segundos_whisper = 0.0
+            while True:
+                inicio_whisper = time.perf_counter()
+                terminado = next(terminados, None)
+                segundos_whisper += time.perf_counter() - inicio_whisper
+                if terminado is None:
+                    break
+                indice, resultado = terminado
+                audio_file, audio, clave, huella = pendientes[indice]
+                print(f"✅ Transcrito: {audio_file}")
+                resultado = alinear(resultado, audio, device)
+                resultado, segmentos_hablantes = ejecutar_diarizacion(
+                    resultado, audio_file, device, token_hf, audio, diarizaciones[indice]
+                )
+                resultado["huella_audio"] = huella
+                _guardar_en_cache(cache, clave, resultado, segmentos_hablantes, token_hf)
+                generados.append((audio_file, *guardar_y_formatear(audio_file, resultado, segmentos_hablantes)))
+            medidor.registrar("transcripcion", segundos_whisper)
+
+    carpeta = os.path.dirname(audio_files[0])
+    _registrar_arranque(medidor)
+    metricas.exportar_metricas(medidor, os.path.join(carpeta, "lote_metricas.json"))
+    minutos = round((time.time() - tiempo_inicio) / 60, 2)
+    print(f"✅ Lote completado: {len(generados)} de {len(audio_files)} audios en {minutos} minutos")
+    for audio_file, archivo_salida, intervenciones in generados:
+        print(f"📄 {archivo_salida} ({intervenciones} intervenciones)")
+    return generados
+
+
+def renderizar_segmentos(ruta: str) -> Tuple[str, int]:
+    """Rearma la transcripción desde los segmentos guardados, sin modelos.
+
+    ``ruta`` puede ser el audio original o su ``_segmentos.npz``. Los
+    hablantes se traducen con el mapeo y los nombres actuales del registro
+    de hablantes.
+    """
+
+    if ruta.endswith(SUFIJO_SEGMENTOS):
+        nombre_sin_extension = ruta[: -len(SUFIJO_SEGMENTOS)]
+    else:
+        nombre_sin_extension = ruta.rsplit(".", 1)[0]
+    archivo_segmentos = ruta_segmentos(nombre_sin_extension)
+    if not os.path.exists(archivo_segmentos):
+        print(f"❌ No encontré los segmentos guardados: {archivo_segmentos}")
+        print("💡 Transcribe el audio una vez para generarlos")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    resultado, diarizado = cargar_segmentos(archivo_segmentos)
+    archivo_salida, intervenciones = formatear_salida(
+        resultado, {} if diarizado else None, nombre_sin_extension
+    )
+    print(f"📄 Texto rearmado en {time.perf_counter() - inicio:.2f}s: {archivo_salida}")
+    print(f"👥 Total de intervenciones: {intervenciones}")
+    return archivo_salida, intervenciones
+
+
+def servir(args: argparse.Namespace, token_hf: Optional[str], device: str) -> None:
+    """Atiende trabajos por stdin reutilizando los modelos ya cargados.
+
+    Cada línea de entrada es un objeto JSON con ``id`` y ``audio_file``
+    (y opcionalmente ``batch_size``, ``compute_type``, ``stream``,
+    ``audio_mmap`` y ``diarizacion_paralela``). Al terminar cada
+    trabajo se emite un evento ``@@FIN`` con el resultado.
+    """
+
+    compute_type = _ajustar_tipo_computo(
+        device, args.compute_type or ("float16" if device == "cuda" else "int8")
+    )
+    print("🔥 Precargando modelos para el trabajador persistente...")
+    cargar_modelo_whisper(device, compute_type)
+    try:
+        cargar_modelo_alineacion(device)
+        if token_hf:
+            cargar_pipeline_diarizacion(token_hf, device)
+    except Exception as exc:  # noqa: WPS440 - se reintentará en cada trabajo
+        print(f"⚠️ No pude precargar todos los modelos: {exc}")
+    emitir_evento("LISTO", {"device": device, "compute_type": compute_type})
+
+    entrada = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    for linea in entrada:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            trabajo = json.loads(linea)
+        except json.JSONDecodeError as exc:
+            emitir_evento("FIN", {"id": None, "ok": False, "error": f"JSON no válido: {exc}"})
+            continue
+
+        iniciar_progreso(porcentaje=10)
+        id_trabajo = trabajo.get("id")
+        try:
+            archivo_salida, _intervenciones = procesar_audio(
+                trabajo["audio_file"],
+                device,
+                int(trabajo.get("batch_size") or args.batch_size),
+                trabajo.get("compute_type") or args.compute_type,
+                token_hf,
+                bool(trabajo.get("stream", args.stream)),
+                bool(trabajo.get("audio_mmap", args.audio_mmap)),
+                bool(trabajo.get("diarizacion_paralela", args.diarizacion_paralela)),
+            )
+            emitir_evento("FIN", {"id": id_trabajo, "ok": True, "archivo": archivo_salida})
+        except SystemExit:
+            emitir_evento("FIN", {"id": id_trabajo, "ok": False, "error": "El trabajo terminó con errores"})
+        except Exception as exc:  # noqa: WPS440 - el trabajador no debe caerse
+            emitir_evento("FIN", {"id": id_trabajo, "ok": False, "error": str(exc)})
+
+
+def main() -> None:
+    """Punto de entrada principal del script."""
+
+    args = parse_args()
+    audio_files = expandir_audios(args.audio_file)
+    if args.audio_file and not audio_files:
+        print(f"❌ No encontré audios en: {', '.join(args.audio_file)}")
+        sys.exit(1)
+    if len(audio_files) == 1 and not args.render_only and not os.path.exists(audio_files[0]):
+        # Antes de preparar el entorno: un error de tipeo no debe esperar a nada
+        print(f"❌ No encontré el archivo: {audio_files[0]}")
+        print("💡 Verifica que el nombre y la ruta estén correctos")
+        sys.exit(1)
+    if args.render_only:
+        _silenciar_si_corresponde(args)
+        for audio_file in audio_files:
+            renderizar_segmentos(audio_file)
+        return
+
+    inicio_entorno = time.perf_counter()
+    token_hf, device = setup_environment(args)
+    _etapas_arranque.append(("entorno", time.perf_counter() - inicio_entorno))
+    avanzar(10, "entorno")
+
+    if args.autotune:
+        autoajustar(audio_files[0], device)
+        return
+    aplicar_perfil(args, device)
+
+    if args.serve:
+        servir(args, token_hf, device)
+        liberar_modelos()
+        return
+
+    if len(args.audio_file) == 1 and audio_files == args.audio_file:
+        procesar_audio(
+            audio_files[0],
+            device,
+            args.batch_size,
+            args.compute_type,
+            token_hf,
+            args.stream,
+            args.audio_mmap,
+            args.diarizacion_paralela,
+        )
+    else:
+        procesar_lote(
+            audio_files,
+            device,
+            args.batch_size,
+            args.compute_type,
+            token_hf,
+            args.audio_mmap,
+            args.diarizacion_paralela,
+            args.archivos_por_lote,
+        )
+    liberar_modelos()
     print("\n🎉 ¡Proceso completado! Este fue mi aporte al proyecto del SENA.")
 
 
-if __name__ == "__main__":  
+if __name__ == "__main__":
     main()
@@ -0,0 +1,278 @@
+"""Transcribe en paralelo las partes de una reunión con un pool de procesos.
+
+Cada proceso del pool recibe su propio presupuesto de hilos de CPU (y,
+cuando hay varias GPU, su propio dispositivo CUDA), carga los modelos una
+sola vez y los reutiliza para todas las partes que le toquen. La
+transcripción y la diarización corren en paralelo; el formateo se hace en
+este proceso, en el orden de las partes, para que la asignación de
+``HABLANTE_N`` sea determinista. Las partes creadas por
+``segmentar_audio.py`` se llevan a los tiempos del audio original y se
+les quitan los solapes antes de formatearlas.
+
+Uso:
+  python src/python/transcribir_partes.py audio_procesado/reunion_parte_*.wav --procesos 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+TAMANO_LOTE_DEF = 8
+
+# Recurso (dispositivo, núcleos) asignado a este proceso del pool
+_recurso: Dict[str, Any] = {}
+
+
+def parse_args() -> argparse.Namespace:
+    """Define y analiza los argumentos de la línea de comandos."""
+
+    from transcribir import TIPOS_PERMITIDOS
+
+    parser = argparse.ArgumentParser(description="Transcripción paralela de partes de audio")
+    parser.add_argument("partes", nargs="+", help="Archivos de audio de cada parte, en orden")
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=int(os.getenv("PROCESOS_TRANSCRIPCION", "0")),
+        help="Cantidad máxima de partes a transcribir a la vez (0 = automático)",
+    )
+    parser.add_argument(
+        "--dispositivos",
+        default=os.getenv("DISPOSITIVOS_TRANSCRIPCION"),
+        help="GPUs a repartir entre los procesos (ej. '0,1') o 'cpu'",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=int(os.getenv("BATCH_SIZE")) if os.getenv("BATCH_SIZE") else None,
+        help=f"Tamaño del lote para la transcripción (por defecto el del perfil calibrado o {TAMANO_LOTE_DEF})",
+    )
+    parser.add_argument(
+        "--compute-type",
+        default=os.getenv("COMPUTE_TYPE") or None,
+        choices=sorted(TIPOS_PERMITIDOS),
+        help="Tipo de cómputo a utilizar (por defecto el del perfil calibrado)",
+    )
+    parser.add_argument(
+        "--salida",
+        help="Archivo donde guardar la transcripción combinada de todas las partes",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Modo silencioso")
+    args = parser.parse_args()
+    # argparse no valida el valor por defecto tomado de COMPUTE_TYPE; se revisa
+    # aquí para no fallar recién dentro de cada proceso del pool
+    if args.compute_type is not None and args.compute_type not in TIPOS_PERMITIDOS:
+        parser.error(
+            f"COMPUTE_TYPE no válido: {args.compute_type!r} (opciones: {', '.join(sorted(TIPOS_PERMITIDOS))})"
+        )
+    return args
+
+
+def detectar_gpus() -> List[str]:
+    """Devuelve los índices de GPU visibles sin importar torch."""
+
+    visibles = os.getenv("CUDA_VISIBLE_DEVICES")
+    if visibles is not None:
+        return [g.strip() for g in visibles.split(",") if g.strip() and g.strip() != "-1"]
+    try:
+        salida = subprocess.run(
+            ["nvidia-smi", "-L"], capture_output=True, text=True, timeout=10, check=True
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return [str(i) for i, linea in enumerate(salida.splitlines()) if linea.startswith("GPU ")]
+
+
+def planificar_recursos(procesos: int, gpus: List[str]) -> List[Dict[str, Any]]:
+    """Reparte dispositivos y núcleos de CPU entre ``procesos`` trabajadores."""
+
+    if hasattr(os, "sched_getaffinity"):
+        nucleos = sorted(os.sched_getaffinity(0))
+    else:  # pragma: no cover - Windows/macOS
+        nucleos = list(range(os.cpu_count() or 1))
+    por_proceso = max(1, len(nucleos) // procesos)
+
+    recursos = []
+    for i in range(procesos):
+        inicio = (i * por_proceso) % len(nucleos)
+        propios = nucleos[inicio:inicio + por_proceso] or nucleos
+        recursos.append(
+            {
+                "device": "cuda" if gpus else "cpu",
+                "gpu": gpus[i % len(gpus)] if gpus else None,
+                "nucleos": propios,
+                "hilos": len(propios),
+            }
+        )
+    return recursos
+
+
+def _inicializar_trabajador(cola_recursos, quiet: bool) -> None:
+    """Fija el dispositivo y los hilos del proceso antes de cargar modelos."""
+
+    recurso = cola_recursos.get()
+    _recurso.update(recurso)
+    hilos = str(recurso["hilos"])
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = hilos
+    if recurso["gpu"] is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = recurso["gpu"]
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, recurso["nucleos"])
+        except OSError:
+            pass
+
+    import transcribir
+
+    transcribir.cargar_librerias()
+    transcribir.torch.set_num_threads(recurso["hilos"])
+    inicio_entorno = time.perf_counter()
+    token_hf, device = transcribir.setup_environment(
+        argparse.Namespace(quiet=quiet, device=recurso["device"])
+    )
+    transcribir._etapas_arranque.append(("entorno", time.perf_counter() - inicio_entorno))
+    _recurso.update({"token_hf": token_hf, "device": device})
+
+
+def _transcribir_parte(
+    ruta: str, batch_size: Optional[int], compute_type: Optional[str]
+) -> Tuple[dict, Any, float, Any]:
+    """Transcribe y diariza ``ruta`` dentro de un proceso del pool."""
+
+    import metricas
+    import transcribir
+    from audio_pcm import AUDIO_EN_DISCO_DEF
+    from autoajuste import cargar_perfil
+    from cache_transcripcion import cache_configurada
+
+    inicio = time.time()
+    medidor = metricas.iniciar_medicion(ruta, transcribir._duracion_audio(ruta))
+    while transcribir._etapas_arranque:
+        medidor.registrar(*transcribir._etapas_arranque.pop(0))
+    device = _recurso["device"]
+    # Los hilos los reparte el pool; del perfil calibrado sólo se toman lote y compute_type
+    perfil = cargar_perfil(device) or {}
+    batch_size = batch_size or perfil.get("batch_size") or TAMANO_LOTE_DEF
+    compute_type = compute_type or perfil.get("compute_type") or ("float16" if device == "cuda" else "int8")
+    compute_type = transcribir._ajustar_tipo_computo(device, compute_type)
+    with metricas.etapa("carga_modelo_whisper"):
+        transcribir.cargar_modelo_whisper(device, compute_type, hilos=_recurso["hilos"])
+    resultado, segmentos_hablantes = transcribir.transcribir_y_diarizar(
+        ruta,
+        device,
+        batch_size,
+        compute_type,
+        _recurso["token_hf"],
+        cache_configurada(),
+        AUDIO_EN_DISCO_DEF,
+        transcribir.DIARIZACION_PARALELA_DEF,
+    )
+    return resultado, segmentos_hablantes, time.time() - inicio, medidor
+
+
+def transcribir_en_paralelo(
+    partes: List[str],
+    procesos: int,
+    gpus: List[str],
+    batch_size: Optional[int],
+    compute_type: Optional[str],
+    quiet: bool = False,
+) -> List[Tuple[str, int]]:
+    """Transcribe ``partes`` en paralelo y las formatea en orden.
+
+    Returns
+    -------
+    List[Tuple[str, int]]
+        Archivo de salida y cantidad de intervenciones de cada parte, en el
+        mismo orden de ``partes``.
+    """
+
+    contexto = multiprocessing.get_context("spawn")
+    cola_recursos = contexto.Queue()
+    for recurso in planificar_recursos(procesos, gpus):
+        cola_recursos.put(recurso)
+
+    with ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=contexto,
+        initializer=_inicializar_trabajador,
+        initargs=(cola_recursos, quiet),
+    ) as pool:
+        futuros = [
+            pool.submit(_transcribir_parte, ruta, batch_size, compute_type)
+            for ruta in partes
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    import metricas
+    import transcribir
+    from segmentar_audio import ajustar_a_parte, buscar_parte
+
+    salidas = []
+    for ruta, (resultado, segmentos_hablantes, duracion, medidor) in zip(partes, resultados):
+        print(f"✅ {os.path.basename(ruta)} transcrita en {duracion:.1f}s")
+        nombre_sin_extension = ruta.rsplit(".", 1)[0]
+        parte = buscar_parte(ruta)
+        if parte is not None:
+            resultado = ajustar_a_parte(resultado, parte)
+        with medidor.etapa("guardado_segmentos"):
+            try:
+                transcribir.guardar_segmentos(
+                    resultado,
+                    segmentos_hablantes is not None,
+                    transcribir.ruta_segmentos(nombre_sin_extension),
+                )
+            except OSError as exc:
+                print(f"⚠️ No pude guardar los segmentos de {ruta}: {exc}")
+        with medidor.etapa("formato"):
+            salidas.append(
+                transcribir.formatear_salida(resultado, segmentos_hablantes, nombre_sin_extension)
+            )
+        metricas.exportar_metricas(medidor, f"{nombre_sin_extension}_metricas.json")
+    return salidas
+
+
+def main() -> None:
+    """Punto de entrada principal del script."""
+
+    args = parse_args()
+    faltantes = [ruta for ruta in args.partes if not os.path.exists(ruta)]
+    if faltantes:
+        print(f"❌ No encontré los archivos: {', '.join(faltantes)}")
+        sys.exit(1)
+
+    if args.dispositivos:
+        gpus = [] if args.dispositivos == "cpu" else args.dispositivos.split(",")
+    else:
+        gpus = detectar_gpus()
+    procesos = args.procesos or (len(gpus) if gpus else max(1, (os.cpu_count() or 1) // 4))
+    procesos = max(1, min(procesos, len(args.partes)))
+
+    print(f"🚀 Transcribiendo {len(args.partes)} partes con {procesos} procesos en paralelo")
+    inicio = time.time()
+    salidas = transcribir_en_paralelo(
+        args.partes, procesos, gpus, args.batch_size, args.compute_type, args.quiet
+    )
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as handle:
+            for indice, (archivo, _intervenciones) in enumerate(salidas):
+                if indice:
+                    handle.write("\n\n")
+                with open(archivo, encoding="utf-8") as parte:
+                    shutil.copyfileobj(parte, handle)
+        print(f"📄 Transcripción combinada guardada en: {args.salida}")
+    print(f"⏱️ Tiempo total: {round((time.time() - inicio) / 60, 2)} minutos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFile } = require('child_process');
+
+// Cola persistente de transcripciones con admisión según la memoria libre.
+// Cada trabajo carga Whisper y pyannote; si se lanzan todos a la vez, la
+// RAM o la VRAM se agotan. La cola se guarda en disco para que los trabajos
+// en espera (y los que estaban en proceso) se retomen tras un reinicio.
+
+const STORAGE_PATH = path.resolve(__dirname, 'colaTrabajos.json');
+
+function enteroDeEntorno(nombre, porDefecto) {
+  const valor = parseInt(process.env[nombre], 10);
+  return Number.isNaN(valor) ? porDefecto : valor;
+}
+
+const TRABAJOS_SIMULTANEOS = Math.max(1, enteroDeEntorno('TRABAJOS_SIMULTANEOS', 1));
+// Memoria que se espera que ocupe cada trabajo; 0 desactiva la comprobación
+const RAM_POR_TRABAJO_MB = enteroDeEntorno('RAM_POR_TRABAJO_MB', 4096);
+const VRAM_POR_TRABAJO_MB = enteroDeEntorno('VRAM_POR_TRABAJO_MB', 6144);
+const INTERVALO_ADMISION_MS = enteroDeEntorno('INTERVALO_ADMISION_MS', 5000);
+
+// Mientras un trabajo está en estas etapas todavía no cargó sus modelos,
+// así que la memoria libre que se mide no lo refleja: se le reserva la suya.
+// transcribir.py emite 'validacion' antes de cargar Whisper y 'carga_modelo'
+// justo después; la reserva se suelta recién en 'transcripcion' (o 'cache').
+const ETAPAS_DE_ARRANQUE = new Set(['inicio', 'entorno', 'validacion', 'carga_modelo']);
+
+// Devuelve la VRAM libre de la GPU con más espacio (MiB), o null si no hay nvidia-smi.
+function medirVramLibre() {
+  return new Promise(resolver => {
+    execFile(
+      'nvidia-smi',
+      ['--query-gpu=memory.free', '--format=csv,noheader,nounits'],
+      { timeout: 5000 },
+      (error, stdout) => {
+        if (error) return resolver(null);
+        const libres = stdout.split('\n').map(linea => parseInt(linea, 10)).filter(valor => !Number.isNaN(valor));
+        resolver(libres.length ? Math.max(...libres) : null);
+      }
+    );
+  });
+}
+
+class ColaTrabajos {
+  // `ejecutar(trabajo, alAvanzar)` procesa un trabajo y devuelve una promesa;
+  // `alCambiarPosicion(id, posicion, total)` avisa la posición de cada trabajo en espera.
+  constructor(ejecutar, opciones = {}) {
+    this.ejecutar = ejecutar;
+    this.alCambiarPosicion = opciones.alCambiarPosicion || (() => {});
+    this.rutaAlmacen = opciones.rutaAlmacen || STORAGE_PATH;
+    this.simultaneos = opciones.simultaneos || TRABAJOS_SIMULTANEOS;
+    this.ramPorTrabajoMb = opciones.ramPorTrabajoMb ?? RAM_POR_TRABAJO_MB;
+    this.vramPorTrabajoMb = opciones.vramPorTrabajoMb ?? VRAM_POR_TRABAJO_MB;
+    this.medirRecursos = opciones.medirRecursos || (() => this.medirRecursosDelSistema());
+    this.enEspera = [];
+    this.enProceso = new Map();
+    this.hayGpu = true;
+    this.revisando = false;
+    this.reintento = null;
+  }
+
+  // Retoma los trabajos guardados; los que estaban en proceso vuelven al frente.
+  cargar() {
+    let guardados = [];
+    try {
+      guardados = JSON.parse(fs.readFileSync(this.rutaAlmacen, 'utf8'));
+    } catch {
+      guardados = [];
+    }
+    this.enEspera = guardados
+      .filter(trabajo => trabajo && trabajo.ruta && fs.existsSync(trabajo.ruta))
+      .map(({ estado, ...trabajo }) => trabajo);
+    this.guardar();
+    if (this.enEspera.length) {
+      console.log(`📋 Retomando ${this.enEspera.length} trabajos de transcripción en cola`);
+    }
+    this.avisarPosiciones();
+    this.admitir();
+    return this.enEspera.length;
+  }
+
+  guardar() {
+    const trabajos = [
+      ...[...this.enProceso.values()].map(({ trabajo }) => ({ ...trabajo, estado: 'en_proceso' })),
+      ...this.enEspera.map(trabajo => ({ ...trabajo, estado: 'en_cola' }))
+    ];
+    try {
+      fs.writeFileSync(this.rutaAlmacen, JSON.stringify(trabajos, null, 2));
+    } catch (error) {
+      console.error('⚠️  No pude guardar la cola de trabajos:', error.message);
+    }
+  }
+
+  agregar(trabajo) {
+    this.enEspera.push(trabajo);
+    this.guardar();
+    this.avisarPosiciones();
+    this.admitir();
+  }
+
+  // 1 = el siguiente en entrar, 0 = ya en proceso, null = desconocido
+  posicion(id) {
+    if (this.enProceso.has(id)) return 0;
+    const indice = this.enEspera.findIndex(trabajo => trabajo.id === id);
+    return indice === -1 ? null : indice + 1;
+  }
+
+  avisarPosiciones() {
+    this.enEspera.forEach((trabajo, indice) => this.alCambiarPosicion(trabajo.id, indice + 1, this.enEspera.length));
+  }
+
+  async medirRecursosDelSistema() {
+    const ramLibreMb = os.freemem() / 2 ** 20;
+    const vramLibreMb = this.hayGpu && this.vramPorTrabajoMb > 0 ? await medirVramLibre() : null;
+    if (vramLibreMb === null) this.hayGpu = false;
+    return { ramLibreMb, vramLibreMb };
+  }
+
+  hayLugar({ ramLibreMb, vramLibreMb }) {
+    // Los trabajos que aún cargan modelos ocuparán su parte en breve
+    const arrancando = [...this.enProceso.values()].filter(estado => estado.arrancando).length;
+    const ramNecesaria = this.ramPorTrabajoMb * (1 + arrancando);
+    const vramNecesaria = this.vramPorTrabajoMb * (1 + arrancando);
+    if (ramLibreMb < ramNecesaria) return false;
+    return vramLibreMb === null || vramLibreMb === undefined || vramLibreMb >= vramNecesaria;
+  }
+
+  async admitir() {
+    if (this.revisando) return;
+    this.revisando = true;
+    clearTimeout(this.reintento);
+    this.reintento = null;
+    try {
+      while (this.enEspera.length && this.enProceso.size < this.simultaneos) {
+        if (this.enProceso.size) {
+          const recursos = await this.medirRecursos();
+          if (!this.hayLugar(recursos)) {
+            // Se vuelve a intentar cuando termine un trabajo o pase el intervalo
+            this.reintento = setTimeout(() => this.admitir(), INTERVALO_ADMISION_MS);
+            this.reintento.unref && this.reintento.unref();
+            break;
+          }
+        }
+        // Sin trabajos en proceso siempre se admite uno, para no esperar para siempre
+        this.iniciar(this.enEspera.shift());
+      }
+    } finally {
+      this.revisando = false;
+    }
+  }
+
+  iniciar(trabajo) {
+    const estado = { trabajo, arrancando: true };
+    this.enProceso.set(trabajo.id, estado);
+    this.guardar();
+    this.avisarPosiciones();
+    console.log(`▶️  Iniciando trabajo ${trabajo.id} (${this.enProceso.size}/${this.simultaneos} en proceso, ${this.enEspera.length} en cola)`);
+
+    const alAvanzar = etapa => {
+      if (estado.arrancando && etapa && !ETAPAS_DE_ARRANQUE.has(etapa)) {
+        estado.arrancando = false;
+        this.admitir();
+      }
+    };
+    Promise.resolve()
+      .then(() => this.ejecutar(trabajo, alAvanzar))
+      .catch(error => console.error(`❌ Trabajo ${trabajo.id} falló:`, error.message))
+      .finally(() => {
+        this.enProceso.delete(trabajo.id);
+        this.guardar();
+        this.admitir();
+      });
+  }
+}
+
+module.exports = { ColaTrabajos, TRABAJOS_SIMULTANEOS };
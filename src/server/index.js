@@ -5,10 +5,12 @@ const multer = require('multer');
 const archiver = require('archiver');
 const { randomUUID } = require('crypto');
 const { scheduleDeletion, runStartupPurge, TTL } = require('./tempFileManager');
+const { ColaTrabajos } = require('./colaTrabajos');
 
 try { require('dotenv').config(); } catch {}
 
 const { transcribirUnSoloArchivo } = require('../js/transcribir');
+const { estimarSegundosRestantes } = require('../js/eventos_python');
 
 const API_BASE_PATH = process.env.API_BASE_PATH || '/api';
 const app = express();
@@ -79,7 +81,73 @@ router.get('/progreso/:id', (req, res) => {
   res.flushHeaders && res.flushHeaders();
   conexiones.set(id, res);
   req.on('close', () => conexiones.delete(id));
+  const posicion = colaTrabajos.posicion(id);
+  if (posicion) {
+    enviar(id, { etapa: 'en_cola', posicion, total: colaTrabajos.enEspera.length, progreso: 0 });
+  }
+});
+
+// Envía un evento SSE al cliente del trabajo `id`, si está conectado
+function enviar(id, payload) {
+  const cliente = conexiones.get(id);
+  if (cliente) {
+    cliente.write(`data: ${JSON.stringify(payload)}\n\n`);
+  }
+}
+
+function finalizar(id) {
+  const cliente = conexiones.get(id);
+  if (cliente) {
+    cliente.end();
+    conexiones.delete(id);
+  }
+}
+
+async function procesarTrabajo({ id, ruta, nombre }, alAvanzar) {
+  console.log('Llamando a transcribirUnSoloArchivo con:', ruta);
+  try {
+    const resultado = await transcribirUnSoloArchivo(
+      ruta,
+      (progreso) => {
+        alAvanzar(progreso.etapa);
+        if (progreso.transcurrido !== undefined) {
+          console.log(`⏱️ [${id}] ${progreso.etapa}: ${progreso.porcentaje}% en ${progreso.transcurrido}s (RTF ${progreso.factor_tiempo_real ?? '-'})`);
+        }
+        enviar(id, {
+          progreso: progreso.porcentaje,
+          etapa: progreso.etapa,
+          eta: estimarSegundosRestantes(progreso),
+        });
+      },
+      (segmento) => enviar(id, { segmento })
+    );
+    if (!resultado || typeof resultado !== 'object' || !resultado.transcripcion) {
+      throw new Error('transcribirUnSoloArchivo no devolvió una ruta de transcripción');
+    }
+    archivosGenerados.set(id, resultado.rutasRelativas, {
+      nombre,
+      fecha: Date.now(),
+    });
+    const primeraRuta = Object.values(resultado.rutasRelativas).find(Boolean);
+    if (primeraRuta) {
+      const dir = path.dirname(path.resolve(__dirname, '..', '..', primeraRuta));
+      scheduleDeletion(dir, () => archivosGenerados.delete(id));
+    }
+    // El texto ya llegó segmento a segmento; aquí sólo aviso que terminó
+    enviar(id, { final: true, id });
+  } catch (err) {
+    console.error('Error en transcripción:', err);
+    enviar(id, { error: err.message });
+  } finally {
+    finalizar(id);
+  }
+}
+
+// Los trabajos esperan su turno aquí; la cola sobrevive a los reinicios
+const colaTrabajos = new ColaTrabajos(procesarTrabajo, {
+  alCambiarPosicion: (id, posicion, total) => enviar(id, { etapa: 'en_cola', posicion, total, progreso: 0 }),
 });
+colaTrabajos.cargar();
 
 router.post('/transcribir', upload.single('audio'), async (req, res) => {
   try {
@@ -95,51 +163,13 @@ router.post('/transcribir', upload.single('audio'), async (req, res) => {
     };
     res.json({ id, archivos: rutasDescarga });
 
-    const rutaAbsoluta = path.resolve(req.file.path);
     scheduleDeletion(req.file.path);
-    console.log('Llamando a transcribirUnSoloArchivo con:', rutaAbsoluta);
-
-    const enviar = (payload) => {
-      const cliente = conexiones.get(id);
-      if (cliente) {
-        cliente.write(`data: ${JSON.stringify(payload)}\n\n`);
-      }
-    };
-
-    const finalizar = () => {
-      const cliente = conexiones.get(id);
-      if (cliente) {
-        cliente.end();
-        conexiones.delete(id);
-      }
-    };
-
-      setImmediate(async () => {
-        try {
-          const resultado = await transcribirUnSoloArchivo(rutaAbsoluta, (msg) => {
-            enviar({ progreso: msg });
-          });
-          if (!resultado || typeof resultado !== 'object' || !resultado.transcripcion) {
-            throw new Error('transcribirUnSoloArchivo no devolvió una ruta de transcripción');
-          }
-          archivosGenerados.set(id, resultado.rutasRelativas, {
-            nombre: req.file.originalname || id,
-            fecha: Date.now(),
-          });
-          const primeraRuta = Object.values(resultado.rutasRelativas).find(Boolean);
-          if (primeraRuta) {
-            const dir = path.dirname(path.resolve(__dirname, '..', '..', primeraRuta));
-            scheduleDeletion(dir, () => archivosGenerados.delete(id));
-          }
-          const contenido = fs.readFileSync(resultado.transcripcion, 'utf-8');
-          enviar({ final: contenido, id });
-        } catch (err) {
-          console.error('Error en transcripción:', err);
-          enviar({ error: err.message });
-        } finally {
-          finalizar();
-        }
-      });
+    colaTrabajos.agregar({
+      id,
+      ruta: path.resolve(req.file.path),
+      nombre: req.file.originalname || id,
+      fecha: Date.now(),
+    });
   } catch (error) {
     console.error(`Error en ${API_BASE_PATH}/transcribir:`, error);
     return res.status(500).json({ error: error.message });
@@ -0,0 +1,64 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { ColaTrabajos } = require('../src/server/colaTrabajos');
+
+// Orden en que llegan las etapas de un trabajo: 'inicio' lo manda el
+// servidor y el resto transcribir.py (entorno → validación → carga de
+// Whisper → transcripción ...).
+const ETAPAS_REALES = ['inicio', 'entorno', 'validacion', 'carga_modelo', 'transcripcion', 'alineacion', 'diarizacion'];
+
+const esperarAdmision = () => new Promise(resolver => setImmediate(resolver));
+
+function crearCola(ramLibreMb) {
+  const directorio = fs.mkdtempSync(path.join(os.tmpdir(), 'cola-'));
+  const iniciados = [];
+  const cola = new ColaTrabajos(
+    (trabajo, alAvanzar) => new Promise(resolver => iniciados.push({ trabajo, alAvanzar, resolver })),
+    {
+      rutaAlmacen: path.join(directorio, 'cola.json'),
+      simultaneos: 2,
+      ramPorTrabajoMb: 1000,
+      vramPorTrabajoMb: 0,
+      medirRecursos: async () => ({ ramLibreMb, vramLibreMb: null })
+    }
+  );
+  return { cola, iniciados };
+}
+
+test('la memoria queda reservada hasta que el trabajo empieza a transcribir', async () => {
+  // Alcanza para un trabajo más, pero no para dos que carguen modelos a la vez
+  const { cola, iniciados } = crearCola(1500);
+  cola.agregar({ id: 'a', ruta: 'a.wav' });
+  cola.agregar({ id: 'b', ruta: 'b.wav' });
+  await esperarAdmision();
+  assert.deepStrictEqual(iniciados.map(i => i.trabajo.id), ['a']);
+
+  for (const etapa of ETAPAS_REALES.slice(0, ETAPAS_REALES.indexOf('transcripcion'))) {
+    iniciados[0].alAvanzar(etapa);
+    await esperarAdmision();
+    assert.strictEqual(iniciados.length, 1, `'b' entró con 'a' todavía en '${etapa}'`);
+  }
+
+  iniciados[0].alAvanzar('transcripcion');
+  await esperarAdmision();
+  assert.deepStrictEqual(iniciados.map(i => i.trabajo.id), ['a', 'b']);
+
+  iniciados.forEach(({ resolver }) => resolver());
+  clearTimeout(cola.reintento);
+});
+
+test('un resultado de la caché también suelta la reserva', async () => {
+  const { cola, iniciados } = crearCola(1500);
+  cola.agregar({ id: 'a', ruta: 'a.wav' });
+  cola.agregar({ id: 'b', ruta: 'b.wav' });
+  await esperarAdmision();
+  ['inicio', 'entorno', 'validacion', 'cache'].forEach(etapa => iniciados[0].alAvanzar(etapa));
+  await esperarAdmision();
+  assert.deepStrictEqual(iniciados.map(i => i.trabajo.id), ['a', 'b']);
+
+  iniciados.forEach(({ resolver }) => resolver());
+  clearTimeout(cola.reintento);
+});
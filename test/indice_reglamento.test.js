@@ -0,0 +1,39 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const path = require('path');
+const { spawnSync } = require('child_process');
+const { crearNormalizador, NORMALIZACION_DEF } = require('../src/js/indice_reglamento');
+
+const SCRIPTS = path.join(__dirname, '..', 'scripts');
+const TEXTO = 'El Aprendiz presentó las evidencias; la instructora aceptó las actividades pendientes del COMITÉ.';
+
+// Ejecuta código en Python con scripts/extraer_reglamento.py importable.
+function python(codigo) {
+  const comandoPython = process.env.PYTHON_CMD || 'python3';
+  const salida = spawnSync(comandoPython, ['-c', codigo], {
+    cwd: SCRIPTS,
+    encoding: 'utf-8',
+    env: { ...process.env, PYTHONIOENCODING: 'utf-8' },
+  });
+  if (salida.error) return null;
+  assert.strictEqual(salida.status, 0, salida.stderr);
+  return JSON.parse(salida.stdout);
+}
+
+test('la normalización por defecto coincide con extraer_reglamento.py', (t) => {
+  const normalizacion = python(
+    'import json, extraer_reglamento as e; print(json.dumps({'
+    + '"longitud_minima": e.LONGITUD_MINIMA, "raiz_minima": e.RAIZ_MINIMA, '
+    + '"palabras_vacias": e.PALABRAS_VACIAS, "sufijos": e.SUFIJOS}))'
+  );
+  if (normalizacion === null) return t.skip('Python no está disponible');
+  assert.deepStrictEqual(NORMALIZACION_DEF, normalizacion);
+});
+
+test('crearNormalizador da los mismos términos que normalizar_tokens', (t) => {
+  const terminos = python(
+    `import json, extraer_reglamento as e; print(json.dumps(e.normalizar_tokens(${JSON.stringify(TEXTO)})))`
+  );
+  if (terminos === null) return t.skip('Python no está disponible');
+  assert.deepStrictEqual(crearNormalizador()(TEXTO), terminos);
+});
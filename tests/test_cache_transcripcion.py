@@ -0,0 +1,52 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_transcripcion import ARCHIVO_ESTADISTICAS, CacheTranscripciones
+
+RESULTADO = {"segments": [{"start": 0.0, "end": 1.0, "text": " hola", "words": []}]}
+
+
+def _contadores(directorio):
+    with sqlite3.connect(os.path.join(directorio, ARCHIVO_ESTADISTICAS)) as conexion:
+        return dict(conexion.execute("SELECT campo, valor FROM contadores"))
+
+
+def test_desaloja_las_entradas_menos_usadas(tmp_path):
+    cache = CacheTranscripciones(str(tmp_path))
+    for numero, clave in enumerate(["vieja", "usada", "nueva"]):
+        cache.guardar(clave, RESULTADO, False)
+        os.utime(cache._ruta(clave), (1000 + numero, 1000 + numero))
+    tamano = os.path.getsize(cache._ruta("vieja"))
+
+    # Un acierto renueva la entrada
+    assert cache.obtener("usada") == (RESULTADO, False)
+    cache.limite_bytes = 2 * tamano + tamano // 2
+
+    assert cache.desalojar() == 1
+    assert sorted(os.listdir(tmp_path)) == ["estadisticas.db", "nueva.npz", "usada.npz"]
+    cache.limite_bytes = tamano
+    assert cache.desalojar() == 1
+    assert not os.path.exists(cache._ruta("nueva"))
+
+
+def test_cuenta_aciertos_y_fallos(tmp_path):
+    cache = CacheTranscripciones(str(tmp_path))
+    cache.guardar("clave", RESULTADO, True)
+
+    assert cache.obtener("otra") is None
+    assert cache.obtener("clave") == (RESULTADO, True)
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+    assert _contadores(str(tmp_path)) == {"aciertos": 1, "fallos": 1}
+
+
+def test_conteos_simultaneos_no_se_pierden(tmp_path):
+    directorio = str(tmp_path)
+
+    def fallar(_):
+        CacheTranscripciones(directorio).obtener("inexistente")
+
+    with ThreadPoolExecutor(8) as hilos:
+        list(hilos.map(fallar, range(40)))
+
+    assert _contadores(directorio) == {"aciertos": 0, "fallos": 40}
@@ -0,0 +1,36 @@
+import json
+
+from registro_hablantes import RegistroHablantes
+
+
+def _escribir(ruta, datos):
+    ruta.write_text(json.dumps(datos), encoding="utf-8")
+
+
+def test_importa_los_json_al_crear_la_base(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _escribir(tmp_path / "mapeo_hablantes_global.json", {
+        "SPEAKER_00": "HABLANTE_1",
+        "reunion:SPEAKER_01": "HABLANTE_2",
+        "SPEAKER_09": "otro",
+    })
+    _escribir(tmp_path / "hablantes.json", {"HABLANTE_1": "Ana", "HABLANTE_2": ""})
+    _escribir(tmp_path / "sugerencias.json", {"HABLANTE_2": "Luis"})
+
+    with RegistroHablantes("registro.db") as registro:
+        assert registro.mapeo() == {"SPEAKER_00": "HABLANTE_1", "reunion:SPEAKER_01": "HABLANTE_2"}
+        assert registro.nombres() == {"HABLANTE_1": "Ana"}
+        assert registro.sugerencias() == {"HABLANTE_2": "Luis"}
+
+    # Los JSON sólo se importan una vez
+    _escribir(tmp_path / "hablantes.json", {"HABLANTE_1": "Otra"})
+    with RegistroHablantes("registro.db") as registro:
+        assert registro.nombres() == {"HABLANTE_1": "Ana"}
+
+
+def test_sin_json_empieza_vacio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with RegistroHablantes(str(tmp_path / "datos" / "registro.db")) as registro:
+        assert registro.mapeo() == {}
+        assert registro.nombres() == {}
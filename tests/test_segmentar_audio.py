@@ -0,0 +1,85 @@
+import numpy as np
+
+from segmentar_audio import ajustar_a_parte, elegir_cortes
+
+# Parte que empieza en el segundo 10 del original y es dueña de [11, 20)
+PARTE = {"archivo": "reunion_parte_2.wav", "inicio": 10.0, "desde": 11.0, "hasta": 20.0}
+
+
+def test_elegir_cortes_prefiere_el_silencio_mas_largo():
+    # Ventanas de 30 ms: 3 s son 100 ventanas y la tolerancia es [75, 125)
+    energia = np.ones(250)
+    energia[200] = 0.0
+    silencios = np.array([[90, 96], [105, 125]])
+
+    cortes = elegir_cortes(energia, silencios, duracion_parte=3.0)
+
+    # El primero en el silencio más largo; el segundo, sin silencios, en la
+    # ventana de menor energía
+    assert cortes == [3.45, 6.0]
+
+
+def test_elegir_cortes_no_corta_audio_corto():
+    assert elegir_cortes(np.ones(100), np.empty((0, 2), dtype=int), duracion_parte=3.0) == []
+
+
+def test_ajustar_a_parte_quita_palabras_de_los_solapes():
+    resultado = {
+        "language": "es",
+        "segments": [
+            {
+                "start": 0.4,
+                "end": 10.5,
+                "text": " antes sí propia sin tiempo última después",
+                "words": [
+                    {"word": "antes", "start": 0.4, "end": 0.8},
+                    {"word": "sí", "start": 1.5, "end": 1.7},
+                    {"word": "sin"},
+                    {"word": "última", "start": 9.5, "end": 9.9},
+                    {"word": "después", "start": 10.2, "end": 10.5},
+                ],
+            }
+        ],
+    }
+
+    ajustado = ajustar_a_parte(resultado, PARTE)
+
+    assert ajustado["language"] == "es"
+    [segmento] = ajustado["segments"]
+    # "sin" no tiene tiempo y hereda el de "sí", que está dentro de la ventana
+    assert [p["word"] for p in segmento["words"]] == ["sí", "sin", "última"]
+    assert segmento["text"] == " sí sin última"
+    assert segmento["start"] == 11.5
+    assert segmento["end"] == 19.9
+    assert segmento["words"][0] == {"word": "sí", "start": 11.5, "end": 11.7}
+
+
+def test_ajustar_a_parte_hereda_el_tiempo_anterior_a_la_ventana():
+    resultado = {
+        "segments": [
+            {
+                "start": 0.2,
+                "end": 1.4,
+                "text": " hola mundo",
+                "words": [{"word": "hola", "start": 0.2, "end": 0.5}, {"word": "mundo"}],
+            }
+        ]
+    }
+
+    # "mundo" hereda el inicio de "hola" (10.2), que pertenece a la parte anterior
+    assert ajustar_a_parte(resultado, PARTE)["segments"] == []
+
+
+def test_ajustar_a_parte_segmentos_sin_palabras_por_punto_medio():
+    segmentos = [
+        # Puntos medios 10.9, 11.3 y 20.2 en el original
+        {"start": 0.0, "end": 1.8, "text": " anterior"},
+        {"start": 0.0, "end": 2.6, "text": " dentro", "words": []},
+        {"start": 9.8, "end": 10.6, "text": " siguiente"},
+    ]
+
+    ajustado = ajustar_a_parte(segmentos, PARTE)
+
+    assert [s["text"] for s in ajustado["segments"]] == [" dentro"]
+    assert ajustado["segments"][0]["start"] == 10.0
+    assert ajustado["segments"][0]["end"] == 12.6
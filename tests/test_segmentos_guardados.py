@@ -0,0 +1,47 @@
+import numpy as np
+
+from segmentos_guardados import cargar_segmentos, guardar_segmentos, ruta_segmentos
+
+
+def test_ida_y_vuelta(tmp_path):
+    resultado = {
+        "segments": [
+            {
+                "start": 0.5,
+                "end": 1.5,
+                "text": " ¿Sí, señor?",
+                "speaker": "SPEAKER_01",
+                "words": [
+                    {"word": "¿Sí,", "start": 0.5, "end": 0.9, "score": 0.5, "speaker": "SPEAKER_01"},
+                    {"word": "señor?"},
+                ],
+            },
+            {"start": None, "end": 2.0, "text": " sin hablante", "words": []},
+        ],
+        "speaker_embeddings": {"SPEAKER_01": [0.25, -1.0, 2.0]},
+        "huella_audio": "abc123",
+    }
+
+    ruta = guardar_segmentos(resultado, True, ruta_segmentos(str(tmp_path / "reunion")))
+    cargado, diarizado = cargar_segmentos(ruta)
+
+    assert ruta.endswith("reunion_segmentos.npz")
+    assert diarizado is True
+    assert cargado == resultado
+
+
+def test_archivos_sin_huellas_cargan_sin_ellas(tmp_path):
+    ruta = str(tmp_path / "reunion_segmentos.npz")
+    guardar_segmentos([{"start": 0.0, "end": 1.0, "text": " hola"}], False, ruta)
+
+    # Igual que un archivo de una versión sin huellas de voz ni del audio
+    with np.load(ruta) as datos:
+        columnas = {nombre: datos[nombre] for nombre in datos.files}
+    for nombre in ("voces", "cortes_voces", "huellas", "huella_audio"):
+        del columnas[nombre]
+    np.savez_compressed(ruta, **columnas)
+
+    cargado, diarizado = cargar_segmentos(ruta)
+
+    assert diarizado is False
+    assert cargado == {"segments": [{"start": 0.0, "end": 1.0, "text": " hola", "words": []}]}
@@ -0,0 +1,41 @@
+import numpy as np
+
+from suavizado_hablantes import DESCONOCIDO, codificar_hablantes, mayoria_por_grupo, suavizar_hablantes, suavizar_ids
+
+
+def test_codificar_hablantes_en_orden_de_aparicion():
+    ids, catalogo = codificar_hablantes(["B", None, "A", "B", ""])
+
+    assert ids.tolist() == [1, 0, 2, 1, 0]
+    assert catalogo == [DESCONOCIDO, "B", "A"]
+
+
+def test_suavizar_corrige_hablante_suelto():
+    assert suavizar_hablantes(["A", "A", "B", "A", "A"], ventana=2) == ["A", "A", "A", "A", "A"]
+
+
+def test_suavizar_respeta_extremos_y_desconocidos():
+    assert suavizar_hablantes(["B", "A", "A", "A", "B"], ventana=2) == ["B", "A", "A", "A", "B"]
+    assert suavizar_hablantes(["A", "A", None, "A", "A"], ventana=2) == ["A", "A", DESCONOCIDO, "A", "A"]
+    # El desconocido nunca gana la mayoría
+    assert suavizar_hablantes([None, None, "B", None, None], ventana=2) == [
+        DESCONOCIDO, DESCONOCIDO, "B", DESCONOCIDO, DESCONOCIDO
+    ]
+
+
+def test_suavizar_exige_mayoria_en_ambos_lados():
+    assert suavizar_hablantes(["A", "A", "B", "C", "C"], ventana=2) == ["A", "A", "B", "C", "C"]
+
+
+def test_histeresis_exige_mas_votos():
+    ids = np.array([1, 1, 2, 1, 2, 1, 1], dtype=np.int32)
+
+    assert suavizar_ids(ids, ventana=3, histeresis=0).tolist() == [1, 1, 1, 1, 1, 1, 1]
+    assert suavizar_ids(ids, ventana=3, histeresis=1).tolist() == ids.tolist()
+
+
+def test_mayoria_por_grupo():
+    grupos = [["A", "B", "B"], [None, None], [], ["C", None]]
+
+    assert mayoria_por_grupo(grupos) == ["B", DESCONOCIDO, DESCONOCIDO, "C"]
+    assert mayoria_por_grupo([[], [None]]) == [DESCONOCIDO, DESCONOCIDO]